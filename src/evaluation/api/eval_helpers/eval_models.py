@@ -58,6 +58,23 @@ class ScoreAggregator(RecommendationBaseModel):
     parsing_failure: int = 0
     unexpected_subsections: set[str] = Field(default_factory=set)
     tokens_by_agent: list[dict[str, Any]] = Field(default_factory=list)
+    intent_records: int = 0
+    intent_fast_path: int = 0
+    intent_predictions: int = 0
+    intent_agreements: int = 0
+
+    def summarize_intent(self, chat_response: "ChatResponse") -> None:
+        if not chat_response.intent_source:
+            return
+        self.intent_records += 1
+        # intents decided by the local classifier or the combined orchestration mode skipped the intent agent
+        if chat_response.intent_source != "llm":
+            self.intent_fast_path += 1
+        # with INTENT_FAST_PATH=shadow the intent agent decides and the local prediction is kept to compare
+        elif chat_response.predicted_intent is not None:
+            self.intent_predictions += 1
+            if chat_response.predicted_intent == chat_response.intent:
+                self.intent_agreements += 1
 
     def summarize_token_counts(self, tokens_update: list[dict[str, Any]]) -> None:
         for token in tokens_update:
@@ -130,6 +147,18 @@ class EvalResults(RecommendationBaseModel):
             return self.total_success / self.total_records
         return 0.0
 
+    @property
+    def intent_skip_rate(self) -> float:
+        if self.total_score.intent_records > 0:
+            return self.total_score.intent_fast_path / self.total_score.intent_records
+        return 0.0
+
+    @property
+    def intent_agreement(self) -> float:
+        if self.total_score.intent_predictions > 0:
+            return self.total_score.intent_agreements / self.total_score.intent_predictions
+        return 0.0
+
     @property
     def micro_precision(self) -> float:
         return precision_score(self.total_score.y_true, self.total_score.y_pred, average='micro')
@@ -149,6 +178,9 @@ class ChatResponse(RecommendationBaseModel):
     time_to_completion: float = 0.0
     error: Optional[Exception] = None
     context: Optional[list[dict[str, Any]]] = None
+    intent: Optional[str] = None
+    intent_source: Optional[str] = None
+    predicted_intent: Optional[str] = None
 
 
 class ParsedResponse(RecommendationBaseModel):
@@ -64,6 +64,9 @@ async def get_streamed_response(message: str, ask_licensing_chat_endpoint: str,
                             chat_response.response_text += chat_completion_delta.delta.content
                         if chat_completion_delta.context:
                             chat_response.context = chat_completion_delta.context["token_usage"]
+                            chat_response.intent = chat_completion_delta.context.get("intent")
+                            chat_response.intent_source = chat_completion_delta.context.get("intent_source")
+                            chat_response.predicted_intent = chat_completion_delta.context.get("predicted_intent")
                 except ValidationError:
                     chat_error_response = AIChatErrorResponse.model_validate_json(delta)
                     raise Exception(f"API call failed with error: {chat_error_response.error.message}")
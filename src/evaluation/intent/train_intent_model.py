@@ -0,0 +1,75 @@
+"""
+Trains the optional linear model of the intent fast path from the evaluation ground truth.
+
+The ground truth narratives are all reportability questions, so the off-topic prompts in
+ground_truth/intent_negatives.csv are used as the other class. A share of both is held out to report how often the
+fast path would skip the intent agent and how often it would wrongly classify an off-topic prompt.
+
+Usage:
+    python train_intent_model.py --output ../../web_api/.cache/intent_model.json
+
+Set INTENT_MODEL_PATH to the output file to use the model in the chat service.
+"""
+import argparse
+import glob
+import os
+import sys
+
+GROUND_TRUTH_DIR = os.path.join(os.path.dirname(__file__), "..", "ground_truth")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "web_api", "chat_service")))
+
+from util.intent_classifier import IntentClassifier, read_messages, train_intent_model  # noqa: E402
+
+
+def _split(messages: list[str], holdout: float) -> tuple[list[str], list[str]]:
+    # every n-th message is held out, so the split is the same on every run
+    step = max(2, round(1 / holdout)) if holdout > 0 else 0
+    if not step:
+        return messages, []
+    return (
+        [message for index, message in enumerate(messages) if index % step],
+        [message for index, message in enumerate(messages) if not index % step],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--positives", nargs="+", default=glob.glob(os.path.join(GROUND_TRUTH_DIR, "ground_truth_*.csv"))
+    )
+    parser.add_argument("--negatives", nargs="+", default=[os.path.join(GROUND_TRUTH_DIR, "intent_negatives.csv")])
+    parser.add_argument("--output", default="intent_model.json")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--epochs", type=int, default=10)
+    args = parser.parse_args()
+
+    # the ground truth files share narratives
+    positives = list(dict.fromkeys(read_messages(args.positives)))
+    negatives = list(dict.fromkeys(read_messages(args.negatives)))
+    train_positives, test_positives = _split(positives, args.holdout)
+    train_negatives, test_negatives = _split(negatives, args.holdout)
+
+    # repeat the off-topic prompts so both classes carry similar weight
+    repeats = max(1, len(train_positives) // max(1, len(train_negatives)))
+    texts = train_positives + train_negatives * repeats
+    labels = [True] * len(train_positives) + [False] * len(train_negatives) * repeats
+    model = train_intent_model(texts, labels, epochs=args.epochs)
+    model.save(args.output)
+
+    for name, classifier in (
+            ("lexicon", IntentClassifier(threshold=args.threshold, model=None)),
+            ("lexicon and model", IntentClassifier(threshold=args.threshold, model=model)),
+    ):
+        skipped = sum(1 for text in test_positives if classifier.classify(text).intent is not None)
+        misclassified = sum(1 for text in test_negatives if classifier.classify(text).intent is not None)
+        print(
+            f"{name}: skip rate {skipped / max(1, len(test_positives)):.1%} of {len(test_positives)} held out "
+            f"narratives, {misclassified} of {len(test_negatives)} held out off-topic prompts classified as "
+            f"reportability"
+        )
+    print(f"Model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
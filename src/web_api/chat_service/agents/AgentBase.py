@@ -1,26 +1,51 @@
+import logging
+import os
+
 from abc import ABC, abstractmethod
-from opentelemetry import trace
-from semantic_kernel.agents import Agent, ChatCompletionAgent
+from opentelemetry import metrics, trace
+from semantic_kernel.agents import Agent
 from semantic_kernel.agents.agent import AgentResponseItem
-from semantic_kernel.contents import StreamingChatMessageContent
-from semantic_kernel.functions import KernelArguments
+from semantic_kernel.contents import ChatMessageContent, StreamingChatMessageContent
+from semantic_kernel.filters import AutoFunctionInvocationContext, FilterTypes
+from semantic_kernel.functions import FunctionResult, KernelArguments
 from semantic_kernel.kernel import Kernel
 from semantic_kernel.services.ai_service_client_base import AIServiceClientBase
-from typing import AsyncIterator, List, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Tuple
 
+from .AgentTemplate import AgentTemplate
+from constants import ChatServiceConstants, EnvironmentVariables
 from functions.SearchPlugins import SearchPluginsBase
 from models import ReportabilityContext, TokenUsage
 from services import ReportabilityServices
 from state import StateBase
+from util import HistoryManager
+from util.history_manager import DEFAULT_HISTORY_MAX_TOKENS
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+tool_calls_refused_counter = meter.create_counter(
+    "request_budget.tool_calls_refused",
+    description="Tool calls not run because the request budget was exhausted, by agent and by exhausted limit.",
+)
+
+# Returned to the model instead of the tool result, so it answers with what it has found so far
+BUDGET_EXHAUSTED_TOOL_RESULT = (
+    "The budget of this request is exhausted and no more tools can be used. Answer now with the information "
+    "gathered so far and say that the answer may be incomplete."
+)
 
 
 class AgentBase(ABC):
     """Abstract base class for streaming agents acting on a ResportabilityContext."""
     """The plugin definitions and services are defined in the subclasses."""
+    _templates: Dict[Tuple, AgentTemplate] = {}
     _plugin_defs: List[Tuple[SearchPluginsBase, str]]
     _services: List[AIServiceClientBase]
     _trace_name: str
     display_name: str
+    # environment variable and default of the prompt token budget for the chat history sent to the agent
+    _history_max_tokens_variable: EnvironmentVariables = EnvironmentVariables.HISTORY_MAX_TOKENS
+    _default_history_max_tokens: int = DEFAULT_HISTORY_MAX_TOKENS
 
     def __init__(
             self,
@@ -42,23 +67,76 @@ class AgentBase(ABC):
         self._services = services if services is not None else []
         self._services.append(ReportabilityServices.get_chat_completion_service())
         self._agent = None
+        self._prompt_tokens_saved = 0
+        self._tool_calls_refused = 0
+
+    @property
+    def trace_name(self) -> str:
+        """The name used for the agent in traces and token usage."""
+        return self._trace_name
+
+    def _get_template(self) -> AgentTemplate:
+        """Returns the template shared by every instance of this agent class, building it on first use.
+
+        Returns:
+            AgentTemplate: The cached template for the agent class and its plugin definitions.
+        """
+        key = (type(self), tuple((type(plugin), plugin_name) for plugin, plugin_name in self._plugin_defs))
+        template = AgentBase._templates.get(key)
+        if template is None:
+            template = AgentTemplate(self._plugin_defs, self._get_instructions(), self._trace_name)
+            AgentBase._templates[key] = template
+        return template
 
     def _get_kernel(self) -> Kernel:
         """Returns the Kernel instance for the agent.
 
+        The plugin functions are bound to this agent's plugin instances using the cached template metadata.
+
         Returns:
             Kernel: The kernel instance.
         """
+        template = self._get_template()
         kernel = Kernel()
 
         for service in self._services:
             kernel.add_service(service)
 
         for plugin_def in self._plugin_defs:
-            kernel.add_plugin(plugin_def[0], plugin_def[1])
+            kernel.add_plugin(template.bind_plugin(plugin_def[1], plugin_def[0]))
+
+        kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, self._enforce_budget)
 
         return kernel
 
+    async def _enforce_budget(
+            self,
+            context: AutoFunctionInvocationContext,
+            next: Callable[[AutoFunctionInvocationContext], Awaitable[None]]
+    ) -> None:
+        """Runs a tool call requested by the model only while the request is within its budget.
+
+        Once the budget is exhausted the model is told to answer with what it has. If it asks for a tool again, the
+        function calling loop is ended.
+
+        Args:
+            context (AutoFunctionInvocationContext): The tool call.
+            next (Callable[[AutoFunctionInvocationContext], Awaitable[None]]): Runs the tool call.
+        """
+        budget = self._state.get_state().budget
+        budget.add_tool_call()
+        reason = budget.exceeded()
+        if reason is None:
+            await next(context)
+            return
+
+        logger.warning(f"Request budget exhausted ({reason}), {self._trace_name} may not call {context.function.name}.")
+        tool_calls_refused_counter.add(1, {"agent_name": self._trace_name, "reason": reason})
+        context.function_result = FunctionResult(function=context.function.metadata, value=BUDGET_EXHAUSTED_TOOL_RESULT)
+        if self._tool_calls_refused:
+            context.terminate = True
+        self._tool_calls_refused += 1
+
     @abstractmethod
     def _get_instructions(self) -> str:
         """Returns the instructions for the agent.
@@ -96,15 +174,25 @@ class AgentBase(ABC):
 
         kernel = self._get_kernel()
 
-        self._agent = ChatCompletionAgent(
-            kernel=kernel,
-            instructions=self._get_instructions(),
-            arguments=self._get_kernel_arguments(kernel),
-            name=self._trace_name
-        )
+        self._agent = self._get_template().create_agent(kernel, self._get_kernel_arguments(kernel))
 
         return self._agent
 
+    async def _get_history_messages(self) -> List[ChatMessageContent]:
+        """Returns the chat history to send to the agent, fitted into the agent's prompt token budget.
+
+        The estimated tokens this saves are reported with the next token usage tracked for the agent.
+
+        Returns:
+            List[ChatMessageContent]: The messages to send.
+        """
+        history_manager = HistoryManager(max_tokens=int(
+            os.getenv(self._history_max_tokens_variable.value, self._default_history_max_tokens)
+        ))
+        window = await history_manager.get_window(self._state.get_state(), self._trace_name)
+        self._prompt_tokens_saved = window.tokens_saved
+        return window.messages
+
     def track_token_usage(self, response: AgentResponseItem) -> None:
         """Tracks token usage from the agent response.
 
@@ -117,12 +205,17 @@ class AgentBase(ABC):
             token_usage: TokenUsage = TokenUsage(
                 agent_name=self._trace_name,
                 prompt_tokens=usage.prompt_tokens,
-                completion_tokens=usage.completion_tokens
+                completion_tokens=usage.completion_tokens,
+                prompt_tokens_saved=self._prompt_tokens_saved
             )
+            # the history is sent once per call, so its savings are only counted with the first usage reported
+            self._prompt_tokens_saved = 0
             state.token_usage.append(token_usage)
+            state.budget.add_token_usage(usage.prompt_tokens, usage.completion_tokens)
             # Add token usage to current trace span
             span = trace.get_current_span()
             if span is not None:
                 span.set_attribute("agent_name", self._trace_name)
                 span.set_attribute("prompt_tokens", usage.prompt_tokens)
                 span.set_attribute("completion_tokens", usage.completion_tokens)
+                span.set_attribute("prompt_tokens_saved", token_usage.prompt_tokens_saved)
@@ -0,0 +1,65 @@
+import uuid
+
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.functions import KernelArguments, KernelFunctionFromMethod, KernelPlugin
+from semantic_kernel.kernel import Kernel
+from typing import Any, List, Tuple
+
+
+class AgentTemplate:
+    """
+    Reusable per-agent-class template for building request scoped agents.
+
+    Reflecting over `kernel_function` decorators, building the function parameter schemas and parsing the agent
+    instructions are done once when the template is created. Each request then binds the cached function metadata
+    to its own plugin instances and copies the prototype agent, which avoids repeating that work on every request.
+    """
+
+    def __init__(self, plugin_defs: List[Tuple[Any, str]], instructions: str, name: str) -> None:
+        """
+        Builds the plugin function metadata and the prototype agent.
+
+        Args:
+            plugin_defs (List[Tuple[Any, str]]): Plugin instances and names used to reflect the plugin functions.
+            instructions (str): The instructions for the agent.
+            name (str): The name of the agent.
+        """
+        self._plugin_functions: dict[str, list[KernelFunctionFromMethod]] = {}
+        for plugin_instance, plugin_name in plugin_defs:
+            plugin = KernelPlugin.from_object(plugin_name=plugin_name, plugin_instance=plugin_instance)
+            self._plugin_functions[plugin_name] = list(plugin.functions.values())
+
+        self._agent = ChatCompletionAgent(kernel=Kernel(), instructions=instructions, name=name)
+
+    def bind_plugin(self, plugin_name: str, plugin_instance: Any) -> KernelPlugin:
+        """
+        Creates a KernelPlugin whose functions call into the given plugin instance.
+
+        Args:
+            plugin_name (str): The name the plugin was registered with when the template was built.
+            plugin_instance (Any): The request scoped plugin instance.
+
+        Returns:
+            KernelPlugin: A plugin reusing the cached function metadata.
+        """
+        functions: dict[str, KernelFunctionFromMethod] = {}
+        for function in self._plugin_functions[plugin_name]:
+            method = getattr(plugin_instance, function.method.__name__)
+            functions[function.name] = function.model_copy(update={
+                "method": method,
+                "stream_method": method if function.stream_method is not None else None,
+            })
+        return KernelPlugin.model_construct(name=plugin_name, description=None, functions=functions)
+
+    def create_agent(self, kernel: Kernel, arguments: KernelArguments = None) -> ChatCompletionAgent:
+        """
+        Copies the prototype agent onto a request scoped kernel.
+
+        Args:
+            kernel (Kernel): The kernel holding the request scoped services and plugins.
+            arguments (KernelArguments, optional): The default kernel arguments for the agent.
+
+        Returns:
+            ChatCompletionAgent: The agent for the current request.
+        """
+        return self._agent.model_copy(update={"id": str(uuid.uuid4()), "kernel": kernel, "arguments": arguments})
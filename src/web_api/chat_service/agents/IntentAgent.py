@@ -1,3 +1,7 @@
+import logging
+import os
+
+from opentelemetry import metrics
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
 from semantic_kernel.agents.agent import AgentResponseItem
 from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
@@ -6,14 +10,34 @@ from semantic_kernel.functions import KernelArguments
 from typing import AsyncIterable
 
 from .AgentBase import AgentBase
-from constants import ChatServiceConstants
+from constants import ChatServiceConstants, EnvironmentVariables
 from functions import ContextPlugin
-from models import ReportabilityContext
+from models import AIChatRole, ReportabilityContext
 from state import StateBase
 from prompts.AgentsPrompt import AgentsPrompt
+from util import IntentClassifier
+from util.history_manager import DEFAULT_HISTORY_INTENT_MAX_TOKENS
+from util.intent_classifier import INTENT_SOURCE_LLM
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+fast_path_counter = meter.create_counter(
+    "intent.fast_path",
+    description="Messages classified by the local intent classifier, by fast path mode, outcome and source.",
+)
+
+# off: the intent agent decides every intent, shadow: the classifier runs alongside the intent agent so their
+# agreement can be measured, on: confident classifications skip the intent agent
+FAST_PATH_OFF = "off"
+FAST_PATH_SHADOW = "shadow"
+FAST_PATH_ON = "on"
 
 
 class IntentAgent(AgentBase):
+    # classifying the intent needs the recent turns, not the documents cited earlier
+    _history_max_tokens_variable = EnvironmentVariables.HISTORY_INTENT_MAX_TOKENS
+    _default_history_max_tokens = DEFAULT_HISTORY_INTENT_MAX_TOKENS
+
     def __init__(self, state: StateBase[ReportabilityContext]) -> None:
         """Initializes the agent with a ReportabilityContext.
 
@@ -31,10 +55,19 @@ class IntentAgent(AgentBase):
         return AgentsPrompt.IntentAgentPrompt
 
     async def invoke_stream(self) -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
-        """Asynchronously constructs a prompt and leverages an AI agent to determine user intent."""
+        """Asynchronously constructs a prompt and leverages an AI agent to determine user intent.
+
+        Depending on the INTENT_FAST_PATH environment variable, the last user message is first classified locally.
+        When the fast path is on and the classifier is confident, the intent is set without calling the AI agent and
+        nothing is streamed.
+        """
+        state: ReportabilityContext = self._state.get_state()
+        if self._classify_locally(state):
+            return _no_responses()
+        state.intent_source = INTENT_SOURCE_LLM
+
         # Construct a prompt for making a recommendation
         agent: ChatCompletionAgent = self._get_agent()
-        state: ReportabilityContext = self._state.get_state()
         thread: ChatHistoryAgentThread = state.get_agent_thread()
         execution_settings: PromptExecutionSettings = agent.kernel.get_prompt_execution_settings_from_service_id(
             service_id=ChatServiceConstants.CHAT_SERVICE_ID.value
@@ -44,5 +77,44 @@ class IntentAgent(AgentBase):
         return agent.invoke_stream(
             arguments=KernelArguments(settings=execution_settings),
             thread=thread,
-            messages=state.message_history,
+            messages=await self._get_history_messages(),
         )
+
+    def _classify_locally(self, state: ReportabilityContext) -> bool:
+        """Classifies the last user message with the local classifier.
+
+        Args:
+            state (ReportabilityContext): The state of the request. The prediction is stored in it.
+
+        Returns:
+            bool: True if the intent was set and the AI agent can be skipped.
+        """
+        mode = os.getenv(EnvironmentVariables.INTENT_FAST_PATH.value, FAST_PATH_OFF).lower()
+        if mode not in (FAST_PATH_SHADOW, FAST_PATH_ON):
+            return False
+        user_messages = [
+            message for message in state.message_history.messages if message.role.value == AIChatRole.USER.value
+        ]
+        if not user_messages:
+            return False
+
+        try:
+            prediction = IntentClassifier().classify(user_messages[-1].content)
+        except Exception as e:
+            logger.warning(f"Local intent classification failed, using the intent agent: {e}")
+            return False
+        state.predicted_intent = prediction.intent
+        outcome = "classified" if prediction.intent is not None else "deferred"
+        fast_path_counter.add(1, {"mode": mode, "outcome": outcome, "source": prediction.source})
+        if mode != FAST_PATH_ON or prediction.intent is None:
+            return False
+
+        logger.debug(f"Intent {prediction.intent} classified locally with probability {prediction.probability:.3f}")
+        state.intent = prediction.intent
+        state.intent_source = prediction.source
+        return True
+
+
+async def _no_responses() -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
+    for response in ():
+        yield response
@@ -11,11 +11,13 @@ from typing import AsyncIterable, Iterable, List, Tuple, Type
 
 from .AgentBase import AgentBase
 from constants import ChatServiceConstants
+from functions import ContextPlugin
 from functions.SearchPlugins import SearchPluginsBase
-from models import ReportabilityContext
+from models import Intent, ReportabilityContext
 from state import StateBase
 from prompts.AgentsPrompt import AgentsPrompt
 from util import get_agent_response_item
+from util.intent_classifier import INTENT_SOURCE_COMBINED
 
 logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
 
@@ -28,11 +30,25 @@ class KnowledgeAgentBase(AgentBase, ABC):
             display_name: str,
             trace_name: str,
             state: StateBase[ReportabilityContext],
-            plugin_defs: List[Tuple[SearchPluginsBase, str]] = None
+            plugin_defs: List[Tuple[SearchPluginsBase, str]] = None,
+            detect_intent: bool = False
     ) -> None:
-        """Initializes the agent with a state object."""
+        """Initializes the agent with a state object.
+
+        Args:
+            detect_intent (bool, optional): Whether the agent also sets the intent of the request through the
+                ContextPlugin, in the same completion that searches the documents. Defaults to False.
+        """
+        self._detect_intent = detect_intent
+        if detect_intent:
+            plugin_defs = list(plugin_defs or []) + [(ContextPlugin(state.get_state()), "ContextPlugin")]
         super().__init__(display_name=display_name, trace_name=trace_name, state=state, plugin_defs=plugin_defs)
 
+    @property
+    def detects_intent(self) -> bool:
+        """Whether the agent sets the intent of the request."""
+        return self._detect_intent
+
     @abstractmethod
     def get_knowledge_specific_instructions(self) -> str:
         """Returns the instructions for the agent."""
@@ -44,7 +60,10 @@ class KnowledgeAgentBase(AgentBase, ABC):
         pass
 
     def _get_instructions(self) -> str:
-        return self.get_knowledge_specific_instructions() + " " + AgentsPrompt.KnowledgeAgentPrompt
+        instructions = self.get_knowledge_specific_instructions() + " " + AgentsPrompt.KnowledgeAgentPrompt
+        if self._detect_intent:
+            instructions += " " + AgentsPrompt.KnowledgeAgentIntentPrompt
+        return instructions
 
     def _mark_cited_document(self, state: ReportabilityContext, response: AgentResponseItem[ChatMessageContent]):
         logger.debug(f"Parsing response from the Knowledge agent {response}.")
@@ -53,33 +72,30 @@ class KnowledgeAgentBase(AgentBase, ABC):
             raise ValueError("Response is not a list of document identifiers.")
         if not all(isinstance(doc_id, str) for doc_id in document_ids):
             raise ValueError("All document identifiers must be strings.")
-        for result in state.plugin_results:
-            if result.id in document_ids:
-                result.cited = True
+        state.mark_plugin_results_cited(document_ids)
 
     def _yield_reviewed_documents(
         self, state: ReportabilityContext, thread: ChatHistoryAgentThread
     ) -> Iterable[AgentResponseItem[StreamingChatMessageContent]]:
         doc_model = self.get_reviewed_doc_model()
-        for document in state.plugin_results:
-            if isinstance(document, doc_model):
-                yield get_agent_response_item(
-                    (
-                        f"\nReviewed [{document.get_display_value()}]"
-                        f"({document.get_document_url()}). \n"
-                    ),
-                    thread,
-                    flush=True,
-                    yield_to_user=True,
-                    add_to_chat_history=False
-                )
+        for document in state.get_plugin_results(doc_model):
+            yield get_agent_response_item(
+                (
+                    f"\nReviewed [{document.get_display_value()}]"
+                    f"({document.get_document_url()}). \n"
+                ),
+                thread,
+                flush=True,
+                yield_to_user=True,
+                add_to_chat_history=False
+            )
 
     def _yield_cited_documents(
         self, state: ReportabilityContext, thread: ChatHistoryAgentThread
     ) -> Iterable[AgentResponseItem[StreamingChatMessageContent]]:
         doc_model = self.get_reviewed_doc_model()
-        for document in state.plugin_results:
-            if isinstance(document, doc_model) and document.cited:
+        for document in state.get_plugin_results(doc_model):
+            if document.cited:
                 yield get_agent_response_item(
                     (
                         f"\nCiting [{document.get_display_value()}]"
@@ -96,7 +112,8 @@ class KnowledgeAgentBase(AgentBase, ABC):
                     flush=False,
                     yield_to_user=False,
                     add_to_chat_history=True,
-                    combine_before_adding_to_history=False
+                    combine_before_adding_to_history=False,
+                    document_reference=f"{document.get_display_value()} (id: {document.id})"
                 )
 
     async def invoke_stream(self) -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
@@ -112,9 +129,14 @@ class KnowledgeAgentBase(AgentBase, ABC):
         async for response in agent.invoke(
             arguments=KernelArguments(settings=execution_settings),
             thread=thread,
-            messages=state.message_history
+            messages=await self._get_history_messages()
         ):
             self.track_token_usage(response)
+            if self._detect_intent and state.intent:
+                state.intent_source = INTENT_SOURCE_COMBINED
+                # nothing was searched for an invalid request, the orchestrator takes it from here
+                if state.intent == Intent.INVALID:
+                    return
             self._mark_cited_document(state, response)
             for item in self._yield_reviewed_documents(state, thread):
                 yield item
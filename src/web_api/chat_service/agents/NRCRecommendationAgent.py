@@ -1,3 +1,5 @@
+import os
+
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
 from semantic_kernel.agents.agent import AgentResponseItem
 from semantic_kernel.contents import StreamingChatMessageContent
@@ -7,9 +9,11 @@ from semantic_kernel.kernel import Kernel
 from typing import AsyncIterable
 
 from .AgentBase import AgentBase
-from constants import ChatServiceConstants
+from constants import ChatServiceConstants, EnvironmentVariables
 from models import ReportabilityContext
-from functions import TSNaivePlugin, UFSARNaivePlugin, NuregPlugin, ReportabilityManualPlugin
+from functions import (
+    ContextPlugin, MultiIndexSearchPlugin, TSNaivePlugin, UFSARNaivePlugin, NuregPlugin, ReportabilityManualPlugin
+)
 from state import StateBase
 from prompts.AgentsPrompt import AgentsPrompt
 
@@ -29,28 +33,44 @@ class NRCRecommendationAgent(AgentBase):
             specific regulatory subsections. If insufficient information is available, the agent notifies
             the user. The method emits a RECOMMENDATION_READY event with the streaming response.
     """
-    def __init__(self, state: StateBase[ReportabilityContext]) -> None:
+    def __init__(self, state: StateBase[ReportabilityContext], detect_intent: bool = False) -> None:
         """Initializes the agent with a ReportabilityContext.
 
+        The agent searches the indexes either through one search function per index or, when
+        NRC_RECOMMENDATION_SEARCH_ALL is "true", through the single search_all function. Only one set is registered,
+        since offering both gives the model overlapping tools that return the same documents.
+
         Args:
             context (ReportabilityContext): The context for agent operations.
+            detect_intent (bool, optional): Whether the agent also sets the intent of the request through the
+                ContextPlugin. Defaults to False.
         """
-        super().__init__(
-            state=state,
-            display_name="NRC Recommendation Agent",
-            trace_name="NRCRecommendationAgent",
-            plugin_defs=[
+        self._detect_intent = detect_intent
+        plugin_defs = [(ContextPlugin(state.get_state()), "ContextPlugin")] if detect_intent else []
+        if os.getenv(EnvironmentVariables.NRC_RECOMMENDATION_SEARCH_ALL.value, "false").lower() == "true":
+            plugin_defs.append(
+                (MultiIndexSearchPlugin(state.get_state(), auto_populate_document_lists=True), "MultiIndexSearchPlugin")
+            )
+        else:
+            plugin_defs += [
                 (NuregPlugin(state.get_state(), auto_populate_document_lists=True), "NuregPlugin"),
                 (
                     ReportabilityManualPlugin(state.get_state(), auto_populate_document_lists=True),
                     "ReportabilityManualPlugin"
                 ),
                 (TSNaivePlugin(state.get_state(), auto_populate_document_lists=True), "TSNaivePlugin"),
-                (UFSARNaivePlugin(state.get_state(), auto_populate_document_lists=True), "UFSARNaivePlugin")
+                (UFSARNaivePlugin(state.get_state(), auto_populate_document_lists=True), "UFSARNaivePlugin"),
             ]
+        super().__init__(
+            state=state,
+            display_name="NRC Recommendation Agent",
+            trace_name="NRCRecommendationAgent",
+            plugin_defs=plugin_defs
         )
 
     def _get_instructions(self) -> str:
+        if self._detect_intent:
+            return AgentsPrompt.NRCRecommendationAgentPrompt + AgentsPrompt.NRCRecommendationAgentIntentPrompt
         return AgentsPrompt.NRCRecommendationAgentPrompt
 
     def _get_kernel_arguments(self, kernel: Kernel) -> KernelArguments:
@@ -78,5 +98,5 @@ class NRCRecommendationAgent(AgentBase):
         return agent.invoke_stream(
             thread=thread,
             arguments=KernelArguments(settings=req_settings),
-            messages=state.message_history,
+            messages=await self._get_history_messages(),
         )
@@ -9,17 +9,19 @@ from prompts.AgentsPrompt import AgentsPrompt
 
 class NuregAgent(KnowledgeAgentBase):
     """Agent for interacting with the Reportability Manual."""
-    def __init__(self, state: StateBase[ReportabilityContext]) -> None:
+    def __init__(self, state: StateBase[ReportabilityContext], detect_intent: bool = False) -> None:
         """Initializes the agent with a state object.
 
         Args:
             state (StateBase[ReportabilityContext]): The state for agent operations.
+            detect_intent (bool, optional): Whether the agent also sets the intent of the request. Defaults to False.
         """
         super().__init__(
             display_name="NUREG 1022 Knowledge Agent",
             trace_name="NuregKnowledgeAgent",
             state=state,
-            plugin_defs=[(NuregPlugin(state.get_state()), "NuregPlugin")]
+            plugin_defs=[(NuregPlugin(state.get_state()), "NuregPlugin")],
+            detect_intent=detect_intent
         )
 
     def get_knowledge_specific_instructions(self) -> str:
@@ -56,7 +56,7 @@ class RecommendationAgent(AgentBase):
         async for response in agent.invoke_stream(
             arguments=KernelArguments(settings=execution_settings),
             thread=thread,
-            messages=state.message_history
+            messages=await self._get_history_messages()
         ):
             self.track_token_usage(response)
             yield get_agent_response_item(
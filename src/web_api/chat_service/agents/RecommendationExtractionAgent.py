@@ -9,7 +9,7 @@ from typing import AsyncIterable
 
 from .AgentBase import AgentBase
 from constants import ChatServiceConstants
-from models import ReportabilityContext
+from models import Recommendation, ReportabilityContext
 from state import StateBase
 from prompts.AgentsPrompt import AgentsPrompt
 
@@ -41,6 +41,10 @@ class RecommendationExtractionAgent(AgentBase):
             raise ValueError("Agent response content is not valid JSON.")
         if not isinstance(recommendations, list):
             raise ValueError("Agent response content is not a list.")
+        try:
+            recommendations = [Recommendation.model_validate(recommendation) for recommendation in recommendations]
+        except Exception:
+            raise ValueError("Agent response content is not a list of recommendations.")
         state.recommendations.extend(recommendations)
 
     async def invoke_stream(self) -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
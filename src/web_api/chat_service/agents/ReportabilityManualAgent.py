@@ -9,17 +9,19 @@ from prompts.AgentsPrompt import AgentsPrompt
 
 class ReportabilityManualAgent(KnowledgeAgentBase):
     """Agent for interacting with the Reportability Manual."""
-    def __init__(self, state: StateBase[ReportabilityContext]) -> None:
+    def __init__(self, state: StateBase[ReportabilityContext], detect_intent: bool = False) -> None:
         """Initializes the agent with a state object.
 
         Args:
             state (StateBase[ReportabilityContext]): The state for agent operations.
+            detect_intent (bool, optional): Whether the agent also sets the intent of the request. Defaults to False.
         """
         super().__init__(
             display_name="Reportability Manual Knowledge Agent",
             trace_name="ReportabilityManualKnowledgeAgent",
             state=state,
-            plugin_defs=[(ReportabilityManualPlugin(state.get_state()), "ReportabilityManualPlugin")]
+            plugin_defs=[(ReportabilityManualPlugin(state.get_state()), "ReportabilityManualPlugin")],
+            detect_intent=detect_intent
         )
 
     def get_knowledge_specific_instructions(self) -> str:
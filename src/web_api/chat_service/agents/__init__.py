@@ -1,4 +1,5 @@
 from .AgentBase import AgentBase
+from .AgentTemplate import AgentTemplate
 from .NRCRecommendationAgent import NRCRecommendationAgent
 from .NuregAgent import NuregAgent
 from .ReportabilityManualAgent import ReportabilityManualAgent
@@ -8,6 +9,7 @@ from .RecommendationExtractionAgent import RecommendationExtractionAgent
 
 __all__ = [
     "AgentBase",
+    "AgentTemplate",
     "NRCRecommendationAgent",
     "NuregAgent",
     "ReportabilityManualAgent",
@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from opentelemetry import metrics
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar('T')
+meter = metrics.get_meter(__name__)
+cache_hits = meter.create_counter("cache.hits", description="Number of cache lookups that found an entry.")
+cache_misses = meter.create_counter("cache.misses", description="Number of cache lookups that found no entry.")
+
+
+class CacheBase(ABC, Generic[T]):
+    """
+    Abstract base class for key/value caches with time-to-live and least-recently-used eviction.
+
+    Hits and misses are counted through OpenTelemetry, tagged with the cache name. Async callers use `aget` and
+    `aset`, which backends that do blocking I/O override to keep it off the event loop.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float) -> None:
+        """Initialize the cache.
+
+        Args:
+            name (str): The name of the cache, used to tag metrics.
+            max_entries (int): The maximum number of entries kept before the least recently used are evicted.
+            ttl_seconds (float): The number of seconds an entry stays valid.
+        """
+        self._name = name
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def name(self) -> str:
+        """The name of the cache."""
+        return self._name
+
+    def get(self, key: str) -> Optional[T]:
+        """Retrieve a value from the cache.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[T]: The cached value, or None if the key is missing or expired.
+        """
+        return self._count(self._get(key))
+
+    def set(self, key: str, value: T) -> None:
+        """Store a value in the cache.
+
+        Args:
+            key (str): The cache key.
+            value (T): The value to store.
+        """
+        self._set(key, value)
+
+    async def aget(self, key: str) -> Optional[T]:
+        """Retrieve a value from the cache without blocking the event loop.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[T]: The cached value, or None if the key is missing or expired.
+        """
+        return self._count(await self._aget(key))
+
+    async def aset(self, key: str, value: T) -> None:
+        """Store a value in the cache without blocking the event loop.
+
+        Args:
+            key (str): The cache key.
+            value (T): The value to store.
+        """
+        await self._aset(key, value)
+
+    def _count(self, value: Optional[T]) -> Optional[T]:
+        if value is None:
+            self.misses += 1
+            cache_misses.add(1, {"cache": self._name})
+        else:
+            self.hits += 1
+            cache_hits.add(1, {"cache": self._name})
+        return value
+
+    async def _aget(self, key: str) -> Optional[T]:
+        # in-memory backends are fast enough to run on the event loop
+        return self._get(key)
+
+    async def _aset(self, key: str, value: T) -> None:
+        self._set(key, value)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[T]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: T) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
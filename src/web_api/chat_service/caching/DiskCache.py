@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Optional
+
+from .CacheBase import CacheBase, T
+
+
+class DiskCache(CacheBase[T]):
+    """
+    Local-disk implementation of CacheBase backed by a SQLite file.
+
+    Values must be JSON serializable. Entries survive process restarts and can be shared by worker processes on the
+    same host. `aget` and `aset` run the SQLite calls in a worker thread, so async code must use them instead of `get`
+    and `set` to avoid blocking every stream on disk I/O.
+    """
+
+    def __init__(self, name: str, path: str, max_entries: int = 1024, ttl_seconds: float = 300) -> None:
+        """Initialize the disk cache, creating the SQLite file if needed.
+
+        Args:
+            name (str): The name of the cache, used to tag metrics and as the table name.
+            path (str): The path of the SQLite file.
+            max_entries (int, optional): The maximum number of entries. Defaults to 1024.
+            ttl_seconds (float, optional): The number of seconds an entry stays valid. Defaults to 300.
+        """
+        super().__init__(name, max_entries, ttl_seconds)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._table = "".join(c if c.isalnum() else "_" for c in name)
+        # the connection is shared by the worker threads of aget and aset, the lock keeps each lookup atomic
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+
+    async def _aget(self, key: str) -> Optional[T]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def _aset(self, key: str, value: T) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    def _get(self, key: str) -> Optional[T]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: str) -> Optional[T]:
+        row = self._connection.execute(
+            f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        if expires_at < now:
+            self._connection.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+            return None
+        self._connection.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def _set(self, key: str, value: T) -> None:
+        with self._lock:
+            self._set_locked(key, value)
+
+    def _set_locked(self, key: str, value: T) -> None:
+        now = time.time()
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self._ttl_seconds, now)
+        )
+        self._connection.execute(f"DELETE FROM {self._table} WHERE expires_at < ?", (now,))
+        self._connection.execute(
+            f"DELETE FROM {self._table} WHERE key IN "
+            f"(SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,)
+        )
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._connection.execute(f"DELETE FROM {self._table}")
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
@@ -0,0 +1,45 @@
+import time
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .CacheBase import CacheBase, T
+
+
+class MemoryCache(CacheBase[T]):
+    """In-process implementation of CacheBase backed by an ordered dictionary."""
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 300) -> None:
+        """Initialize the in-memory cache.
+
+        Args:
+            name (str): The name of the cache, used to tag metrics.
+            max_entries (int, optional): The maximum number of entries. Defaults to 1024.
+            ttl_seconds (float, optional): The number of seconds an entry stays valid. Defaults to 300.
+        """
+        super().__init__(name, max_entries, ttl_seconds)
+        self._entries: OrderedDict[str, Tuple[float, T]] = OrderedDict()
+
+    def _get(self, key: str) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: T) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
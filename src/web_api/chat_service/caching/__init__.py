@@ -0,0 +1,49 @@
+from typing import Optional
+
+from .CacheBase import CacheBase
+from .DiskCache import DiskCache
+from .MemoryCache import MemoryCache
+
+
+def create_cache(
+        name: str,
+        backend: str,
+        max_entries: int,
+        ttl_seconds: float,
+        path: Optional[str] = None
+) -> Optional[CacheBase]:
+    """
+    Creates a cache for the requested backend.
+
+    Args:
+        name (str): The name of the cache, used to tag metrics.
+        backend (str): The backend to use: "memory", "disk" or "none".
+        max_entries (int): The maximum number of entries.
+        ttl_seconds (float): The number of seconds an entry stays valid.
+        path (Optional[str]): The path of the SQLite file for the disk backend.
+
+    Raises:
+        ValueError: If the backend is unknown or the disk backend has no path.
+
+    Returns:
+        Optional[CacheBase]: The cache, or None when caching is disabled.
+    """
+    match backend.lower():
+        case "none" | "":
+            return None
+        case "memory":
+            return MemoryCache(name, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        case "disk":
+            if not path:
+                raise ValueError(f"A path is required for the disk backend of the {name} cache.")
+            return DiskCache(name, path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        case _:
+            raise ValueError(f"Unknown cache backend: {backend}")
+
+
+__all__ = [
+    "CacheBase",
+    "DiskCache",
+    "MemoryCache",
+    "create_cache",
+]
@@ -26,12 +26,69 @@ class EnvironmentVariables(Enum):
     AZURE_SEARCH_TECHSPEC_INDEX_NAME = "AZURE_SEARCH_TECHSPEC_INDEX_NAME"
     AZURE_SEARCH_UFSAR_INDEX_NAME = "AZURE_SEARCH_UFSAR_INDEX_NAME"
     AZURE_SEARCH_API_KEY = "AZURE_SEARCH_API_KEY"  # pragma: allowlist secret
+    AZURE_SEARCH_CONNECTION_LIMIT = "AZURE_SEARCH_CONNECTION_LIMIT"
+    AZURE_SEARCH_KEEPALIVE_TIMEOUT_SECONDS = "AZURE_SEARCH_KEEPALIVE_TIMEOUT_SECONDS"
     AZURE_EMBEDDING_DEPLOYMENT = "AZURE_EMBEDDING_DEPLOYMENT"
     AZURE_OPENAI_ENDPOINT = "AZURE_OPENAI_ENDPOINT"
     AZURE_OPENAI_DEPLOYMENT = "AZURE_OPENAI_DEPLOYMENT"
     AZURE_OPENAI_API_VERSION = "AZURE_OPENAI_API_VERSION"
+    AZURE_OPENAI_CONNECTION_LIMIT = "AZURE_OPENAI_CONNECTION_LIMIT"
+    AZURE_OPENAI_HTTP2 = "AZURE_OPENAI_HTTP2"
+    AZURE_OPENAI_WARMUP = "AZURE_OPENAI_WARMUP"
     OTEL_EXPORTER_OTLP_ENDPOINT = "OTEL_EXPORTER_OTLP_ENDPOINT"
     AZURE_OPENAI_API_KEY = "AZURE_OPENAI_API_KEY"  # pragma: allowlist secret
     STREAM_BUFFER_SIZE = "STREAM_BUFFER_SIZE"
+    STREAM_FLUSH_BYTES = "STREAM_FLUSH_BYTES"
+    STREAM_FLUSH_INTERVAL_MS = "STREAM_FLUSH_INTERVAL_MS"
+    STREAM_FORMAT = "STREAM_FORMAT"
+    STREAM_HEARTBEAT_SECONDS = "STREAM_HEARTBEAT_SECONDS"
+    STREAM_REPLAY_MAX_EVENTS = "STREAM_REPLAY_MAX_EVENTS"
+    STREAM_REPLAY_MAX_SESSIONS = "STREAM_REPLAY_MAX_SESSIONS"
+    STREAM_REPLAY_TTL_SECONDS = "STREAM_REPLAY_TTL_SECONDS"
+    STREAM_RESUME_GRACE_SECONDS = "STREAM_RESUME_GRACE_SECONDS"
+    CLIENT_DISCONNECT_POLL_SECONDS = "CLIENT_DISCONNECT_POLL_SECONDS"
+    ORCHESTRATOR_SPECULATIVE_START = "ORCHESTRATOR_SPECULATIVE_START"
+    ORCHESTRATOR_COMBINED_INTENT = "ORCHESTRATOR_COMBINED_INTENT"
+    REQUEST_BUDGET_MAX_SECONDS = "REQUEST_BUDGET_MAX_SECONDS"
+    REQUEST_BUDGET_MAX_PROMPT_TOKENS = "REQUEST_BUDGET_MAX_PROMPT_TOKENS"
+    REQUEST_BUDGET_MAX_COMPLETION_TOKENS = "REQUEST_BUDGET_MAX_COMPLETION_TOKENS"
+    REQUEST_BUDGET_MAX_TOOL_CALLS = "REQUEST_BUDGET_MAX_TOOL_CALLS"
+    ADMISSION_MAX_CONCURRENT = "ADMISSION_MAX_CONCURRENT"
+    ADMISSION_MAX_CONCURRENT_PER_USER = "ADMISSION_MAX_CONCURRENT_PER_USER"
+    ADMISSION_MAX_QUEUED = "ADMISSION_MAX_QUEUED"
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = "ADMISSION_QUEUE_TIMEOUT_SECONDS"
+    ADMISSION_RETRY_AFTER_SECONDS = "ADMISSION_RETRY_AFTER_SECONDS"
+    POST_PROCESSING_CONCURRENCY = "POST_PROCESSING_CONCURRENCY"
+    POST_PROCESSING_MAX_PENDING = "POST_PROCESSING_MAX_PENDING"
+    SEARCH_CACHE_BACKEND = "SEARCH_CACHE_BACKEND"
+    SEARCH_CACHE_MAX_ENTRIES = "SEARCH_CACHE_MAX_ENTRIES"
+    SEARCH_CACHE_TTL_SECONDS = "SEARCH_CACHE_TTL_SECONDS"
+    SEARCH_CACHE_PATH = "SEARCH_CACHE_PATH"
+    STATE_STORE_BACKEND = "STATE_STORE_BACKEND"
+    STATE_STORE_MAX_ENTRIES = "STATE_STORE_MAX_ENTRIES"
+    STATE_STORE_TTL_SECONDS = "STATE_STORE_TTL_SECONDS"
+    STATE_STORE_PATH = "STATE_STORE_PATH"
+    STATE_STORE_MAX_TURNS = "STATE_STORE_MAX_TURNS"
+    HISTORY_MAX_TOKENS = "HISTORY_MAX_TOKENS"
+    HISTORY_INTENT_MAX_TOKENS = "HISTORY_INTENT_MAX_TOKENS"
+    HISTORY_RECENT_TURNS = "HISTORY_RECENT_TURNS"
+    HISTORY_SUMMARIZE = "HISTORY_SUMMARIZE"
+    HISTORY_SUMMARY_MAX_TOKENS = "HISTORY_SUMMARY_MAX_TOKENS"
+    TOKENIZER_ENCODING = "TOKENIZER_ENCODING"
+    CONTEXT_PACKING_MAX_TOKENS = "CONTEXT_PACKING_MAX_TOKENS"
+    CONTEXT_PACKING_MAX_FIELD_TOKENS = "CONTEXT_PACKING_MAX_FIELD_TOKENS"
+    LLM_CACHE_BACKEND = "LLM_CACHE_BACKEND"
+    LLM_CACHE_MAX_ENTRIES = "LLM_CACHE_MAX_ENTRIES"
+    LLM_CACHE_TTL_SECONDS = "LLM_CACHE_TTL_SECONDS"
+    LLM_CACHE_PATH = "LLM_CACHE_PATH"
+    INTENT_FAST_PATH = "INTENT_FAST_PATH"
+    INTENT_FAST_PATH_THRESHOLD = "INTENT_FAST_PATH_THRESHOLD"
+    INTENT_MODEL_PATH = "INTENT_MODEL_PATH"
+    SEARCH_CLIENT_SIDE_VECTORIZATION = "SEARCH_CLIENT_SIDE_VECTORIZATION"
+    EMBEDDING_CACHE_MAX_ENTRIES = "EMBEDDING_CACHE_MAX_ENTRIES"
+    EMBEDDING_CACHE_TTL_SECONDS = "EMBEDDING_CACHE_TTL_SECONDS"
+    SEARCH_FANOUT_TIMEOUT_SECONDS = "SEARCH_FANOUT_TIMEOUT_SECONDS"
+    NRC_RECOMMENDATION_SEARCH_ALL = "NRC_RECOMMENDATION_SEARCH_ALL"
     SAS_TOKEN_EXPIRATIONS_DAYS = "SAS_TOKEN_EXPIRATIONS_DAYS"
+    SAS_TOKEN_CACHE_MAX_ENTRIES = "SAS_TOKEN_CACHE_MAX_ENTRIES"
     ORCHESTRATION_TYPE = "ORCHESTRATION_TYPE"
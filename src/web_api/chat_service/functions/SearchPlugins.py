@@ -1,23 +1,33 @@
+import asyncio
+import hashlib
 import logging
 import os
+import re
+import unicodedata
 
 from abc import ABC, abstractmethod
 from azure.search.documents.aio import SearchClient
-from azure.search.documents.models import VectorizableTextQuery
+from azure.search.documents.models import VectorizableTextQuery, VectorizedQuery
 from enum import Enum
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
 from typing import Type, TypeVar
 
-from constants import ChatServiceConstants
+from caching import CacheBase
+from constants import ChatServiceConstants, EnvironmentVariables
 from models import (
-    NUREGSection32, SearchType, SearchConfiguration,
+    NUREGSection32, SearchType, SearchConfiguration, SearchModelsBase,
     SearchConfigurationList, ReportabilityContext, ReportabilityManual, NaiveSearch
 )
-from services import ReportabilityServices
+from services import QueryEmbeddings, ReportabilityServices
+from util import ContextPacker
 
 T = TypeVar('T')
 logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
 
+DEFAULT_FANOUT_TIMEOUT_SECONDS = 10.0
+# dampens the lead of the top ranks in reciprocal-rank fusion, 60 is the value from the original paper
+RRF_RANK_CONSTANT = 60
+
 
 class Index(Enum):
     NUREG = ("nureg", NUREGSection32)
@@ -36,11 +46,19 @@ class SearchPluginsBase(ABC):
         self,
         reportability_context: ReportabilityContext,
         search_configurations: dict[str, SearchConfiguration] = None,
-        auto_populate_document_lists: bool = False
+        auto_populate_document_lists: bool = False,
+        result_cache: CacheBase = None,
+        query_embeddings: QueryEmbeddings = None
     ):
         self._search_configurations = search_configurations or self._load_configuration()
         self._reportability_context: ReportabilityContext = reportability_context
         self._auto_populate_document_lists: bool = auto_populate_document_lists
+        self._result_cache: CacheBase | None = (
+            result_cache if result_cache is not None else ReportabilityServices.get_search_result_cache()
+        )
+        self._query_embeddings: QueryEmbeddings | None = (
+            query_embeddings if query_embeddings is not None else ReportabilityServices.get_query_embeddings()
+        )
 
     @abstractmethod
     def get_documents(self):
@@ -71,7 +89,11 @@ class SearchPluginsBase(ABC):
             raise
 
     async def _search_results(
-            self, search_client: SearchClient, search_configuration: SearchConfiguration, query: str):
+            self,
+            search_client: SearchClient,
+            search_configuration: SearchConfiguration,
+            query: str,
+            vector: list[float] = None):
         if search_configuration.search_type == SearchType.FullText:
             return await search_client.search(
                 search_text=query,
@@ -89,12 +111,20 @@ class SearchPluginsBase(ABC):
             else:
                 search_fields = search_configuration.search_fields
                 search_text = query
-            vector_query = VectorizableTextQuery(
-                text=query,
-                fields=search_configuration.vector_fields,
-                k_nearest_neighbors=search_configuration.k_nearest_neighbors,
-                exhaustive=True,
-            )
+            if vector is not None:
+                vector_query = VectorizedQuery(
+                    vector=vector,
+                    fields=search_configuration.vector_fields,
+                    k_nearest_neighbors=search_configuration.k_nearest_neighbors,
+                    exhaustive=True,
+                )
+            else:
+                vector_query = VectorizableTextQuery(
+                    text=query,
+                    fields=search_configuration.vector_fields,
+                    k_nearest_neighbors=search_configuration.k_nearest_neighbors,
+                    exhaustive=True,
+                )
             return await search_client.search(
                 search_text=search_text,
                 vector_queries=[vector_query],
@@ -118,44 +148,151 @@ class SearchPluginsBase(ABC):
 
             search_configuration = self._search_configurations[index.index_name]
 
-            search_client: SearchClient = ReportabilityServices.get_ai_search_client(
-                search_configuration.index_name
-            )
-            async with search_client:
-                results = await self._search_results(
-                    search_client,
-                    search_configuration,
-                    query=search_query
-                )
-                results_list = await self._convert_results(
-                    search_configuration.threshold, results, search_query, index.model_class
-                )
+            cached_results = None
+            if self._result_cache is not None:
+                cache_key = self._get_cache_key(index, search_configuration, search_query)
+                cached_results = await self._result_cache.aget(cache_key)
+            if cached_results is not None:
+                results_list = [index.model_class.model_validate(result) for result in cached_results]
+            else:
+                vector = await self._get_query_vector(search_configuration, search_query)
+                async with ReportabilityServices.lease_ai_search_client(
+                    search_configuration.index_name
+                ) as search_client:
+                    results = await self._search_results(
+                        search_client,
+                        search_configuration,
+                        query=search_query,
+                        vector=vector
+                    )
+                    results_list = await self._convert_results(
+                        search_configuration.threshold, results, search_query, index.model_class
+                    )
+                if self._result_cache is not None:
+                    await self._result_cache.aset(
+                        cache_key, [result.model_dump(mode="json") for result in results_list]
+                    )
 
             return self._process_results(results_list, search_query)
         except Exception as e:
             logger.exception(f"Error performing search: {e}", exc_info=e)
             raise
 
+    async def search_all(
+        self,
+        search_query: str,
+        indexes: list[Index] = None,
+        timeout_seconds: float = None
+    ) -> list[SearchModelsBase]:
+        """
+        Searches several indexes concurrently and merges the results into one list by reciprocal-rank fusion.
+
+        The raw search scores of different indexes are not comparable, since vector, hybrid and semantic searches score
+        on different scales. Each result is therefore ranked by its position within its own index, so the best result
+        of every index comes before the second best of any. An index that fails or does not answer within the timeout
+        is logged and left out of the results, so one slow index does not hold up or fail the whole search.
+
+        Args:
+            search_query (str): The search query string.
+            indexes (list[Index], optional): The indexes to search. Defaults to every index.
+            timeout_seconds (float, optional): The time allowed for each index. Defaults to the
+                SEARCH_FANOUT_TIMEOUT_SECONDS environment variable or 10.
+
+        Returns:
+            list[SearchModelsBase]: The new results from every index, best fused rank first.
+        """
+        indexes = indexes or list(Index)
+        if timeout_seconds is None:
+            timeout_seconds = float(os.getenv(
+                EnvironmentVariables.SEARCH_FANOUT_TIMEOUT_SECONDS.value, DEFAULT_FANOUT_TIMEOUT_SECONDS
+            ))
+
+        results_per_index = await asyncio.gather(
+            *(asyncio.wait_for(self._get_search_results(index, search_query), timeout_seconds) for index in indexes),
+            return_exceptions=True
+        )
+
+        fused_results: list[tuple[float, SearchModelsBase]] = []
+        for index, results in zip(indexes, results_per_index):
+            if isinstance(results, BaseException):
+                logger.warning(f"Search of index {index.index_name} failed or timed out: {results!r}")
+                continue
+            ranked_results = sorted(results, key=lambda result: result.search_score, reverse=True)
+            fused_results.extend(
+                (1 / (RRF_RANK_CONSTANT + rank), result) for rank, result in enumerate(ranked_results, start=1)
+            )
+
+        # the sort is stable, so results of the same rank keep the order of the indexes
+        fused_results.sort(key=lambda fused_result: fused_result[0], reverse=True)
+        return [result for _, result in fused_results]
+
+    async def _get_query_vector(self, search_configuration: SearchConfiguration, query: str) -> list[float] | None:
+        # only embed client side when enabled and the search actually needs a vector, otherwise the search service
+        # vectorizes the query text itself
+        if self._query_embeddings is None or search_configuration.search_type not in (
+            SearchType.Vector, SearchType.Hybrid
+        ):
+            return None
+        return await self._query_embeddings.get_embedding(query)
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalizes a search query so trivially different phrasings share a cache entry."""
+        normalized = unicodedata.normalize("NFKC", query).casefold()
+        normalized = re.sub(r"\s+", " ", normalized)
+        return normalized.strip(" \t\n\r.,;:!?\"'")
+
+    def _get_cache_key(self, index: Index, search_configuration: SearchConfiguration, query: str) -> str:
+        configuration_hash = hashlib.sha256(search_configuration.model_dump_json().encode()).hexdigest()[:16]
+        query_hash = hashlib.sha256(self._normalize_query(query).encode()).hexdigest()
+        return f"{index.index_name}:{configuration_hash}:{query_hash}"
+
     def _process_results(self, results, query: str) -> list:
         # lets make sure we add the results to the context, but only if the document isn't already present,
         # we also don't want to return results that are already in the context
         only_new_results: list = []
         for result in results:
-            if not any(
-                existing.id == result.id for existing in self._reportability_context.plugin_results
-            ):
+            if not self._reportability_context.has_plugin_result(result.id):
                 result.search_query = query
-                self._reportability_context.plugin_results.append(result)
+                self._reportability_context.add_plugin_result(result)
                 only_new_results.append(result)
+                continue
+            # documents restored from an earlier turn are returned once, since this turn's agents haven't seen them
+            restored_result = self._reportability_context.take_restored_plugin_result(result.id)
+            if restored_result is not None:
+                only_new_results.append(restored_result)
 
         return only_new_results
 
+    def _pack_results(self, results: list[SearchModelsBase], tool_name: str, index: Index = None) -> str:
+        """
+        Fits the results of a search into the token budget of the tool and returns their text for the agent.
+
+        Results left out are removed from the context again, so the agent is not reported as having reviewed them and
+        a later search can return them.
+
+        Args:
+            results (list[SearchModelsBase]): The results of the search.
+            tool_name (str): The name of the kernel function returning the results.
+            index (Index, optional): The index searched, whose configuration may set the token budget. Defaults to the
+                CONTEXT_PACKING_MAX_TOKENS environment variable.
+
+        Returns:
+            str: The text of the packed results.
+        """
+        search_configuration = self._search_configurations.get(index.index_name) if index is not None else None
+        max_tokens = search_configuration.max_tokens if search_configuration is not None else None
+        packed_context = ContextPacker(max_tokens=max_tokens).pack(results, tool_name)
+        self._reportability_context.remove_plugin_results(result.id for result in packed_context.dropped_results)
+        return packed_context.text
+
     async def _convert_results(self, threshold: float, results: list, query: str, model_class: Type[T]) -> list[T]:
         results_list = []
         async for result in results:
             score = result['@search.score']
             if score is not None and score >= threshold:
                 model_instance = model_class.model_validate(result)
+                model_instance.search_score = score
                 results_list.append(model_instance)
 
             logger.debug(
@@ -195,7 +332,7 @@ class NuregPlugin(SearchPluginsBase):
         """Search for relevant NUREG 1022 Section 3.2 documents based on the search query."""
         results_list: list[NUREGSection32] = await self._get_search_results(
             Index.NUREG, search_query)
-        return "\n\n".join(item.to_agent_string() for item in results_list)
+        return self._pack_results(results_list, "search_nureg", Index.NUREG)
 
 
 class ReportabilityManualPlugin(SearchPluginsBase):
@@ -235,7 +372,7 @@ class ReportabilityManualPlugin(SearchPluginsBase):
             Index.REPORTABILITY_MANUAL,
             search_query
         )
-        return "\n\n".join(item.to_agent_string() for item in results_list)
+        return self._pack_results(results_list, "search_reportability_manual", Index.REPORTABILITY_MANUAL)
 
 
 class TSNaivePlugin(SearchPluginsBase):
@@ -260,7 +397,7 @@ class TSNaivePlugin(SearchPluginsBase):
             Index.TS_NAIVE_SEARCH,
             search_query
         )
-        return "\n\n".join(item.to_agent_string() for item in results_list)
+        return self._pack_results(results_list, "search_ts_naive", Index.TS_NAIVE_SEARCH)
 
 
 class UFSARNaivePlugin(SearchPluginsBase):
@@ -285,4 +422,26 @@ class UFSARNaivePlugin(SearchPluginsBase):
             Index.UFSAR_NAIVE_SEARCH,
             search_query
         )
-        return "\n\n".join(item.to_agent_string() for item in results_list)
+        return self._pack_results(results_list, "search_ufsar_naive", Index.UFSAR_NAIVE_SEARCH)
+
+
+class MultiIndexSearchPlugin(SearchPluginsBase):
+    @kernel_function(
+        name="search_all",
+        description="""
+        Search NUREG 1022 Section 3.2, Constellation's Reportability Manual, the Technical Specifications and the
+        UFSAR at the same time.
+
+        Parameters:
+            search_query (str): The search query string. Always use the parameter name 'search_query'.
+        Returns:
+            str: A string representation of the relevant entries from every source, most relevant first.
+        """
+    )
+    async def get_documents(
+        self,
+        search_query: str
+    ) -> str:
+        """Search every index concurrently based on the search query."""
+        results_list: list[SearchModelsBase] = await self.search_all(search_query)
+        return self._pack_results(results_list, "search_all")
@@ -1,6 +1,9 @@
-from functions.SearchPlugins import NuregPlugin, ReportabilityManualPlugin, TSNaivePlugin, UFSARNaivePlugin
+from functions.SearchPlugins import (
+    MultiIndexSearchPlugin, NuregPlugin, ReportabilityManualPlugin, TSNaivePlugin, UFSARNaivePlugin
+)
 from functions.ContextPlugin import ContextPlugin
 
 __all__ = [
-    "NuregPlugin", "ReportabilityManualPlugin", "ContextPlugin", "TSNaivePlugin", "UFSARNaivePlugin"
+    "NuregPlugin", "ReportabilityManualPlugin", "ContextPlugin", "TSNaivePlugin", "UFSARNaivePlugin",
+    "MultiIndexSearchPlugin"
 ]
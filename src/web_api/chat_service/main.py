@@ -1,10 +1,13 @@
+import asyncio
 import logging
 import os
 import sys
 
-from fastapi import APIRouter, Request
+from contextlib import aclosing, asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
+from typing import AsyncIterator
 
 sys.path.append(os.path.dirname(__file__))  # Ensures local imports work
 
@@ -14,15 +17,34 @@ from models import (  # noqa: E402
     AIChatErrorResponse,
     AIChatRequest
 )
+from models.context_models import DEFAULT_SNAPSHOT_MAX_TURNS  # noqa: E402
 from orchestrators import SingleAgentOrchestrator, SequentialAgentOrchestrator, \
                           ConcurrentAgentOrchestrator  # noqa: E402
-from state import MemoryState, StateBase  # noqa: E402
-from util import stream_processor, stream_error_handler  # noqa: E402
+from services import AdmissionRejectedError, AdmissionTicket, ReportabilityServices, StreamResumeError  # noqa: E402
+from state import MemoryState, PersistentState, StateBase  # noqa: E402
+from util import stream_processor, stream_error_handler, sse_stream_processor, sse_error_handler  # noqa: E402
 
 
 # ASGI Application
 stream = APIRouter(prefix="/stream", tags=["stream"])
 logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+# keep proxies from caching or buffering server-sent events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@asynccontextmanager
+async def chat_service_lifespan(app: FastAPI):
+    """
+    Opens the shared service connections on application startup and closes them on shutdown.
+
+    Args:
+        app (FastAPI): The application the chat service is mounted in.
+    """
+    await ReportabilityServices.startup()
+    try:
+        yield
+    finally:
+        await ReportabilityServices.shutdown()
 
 
 # HTTP streaming Endpoint
@@ -33,6 +55,14 @@ async def stream_openai_text(
     """
     Handles streaming OpenAI text responses via an HTTP request.
 
+    The response is sent as JSON lines by default. With the "streamFormat=sse" query parameter, or STREAM_FORMAT set
+    to "sse", it is sent as server-sent events with event ids and heartbeats. A client that reconnects with a
+    Last-Event-ID header and the same session state resumes the recorded response instead of starting a new one.
+
+    New responses are subject to admission control: at most ADMISSION_MAX_CONCURRENT requests, and
+    ADMISSION_MAX_CONCURRENT_PER_USER requests of the user in "context.user.id", run at once. Others wait for a slot
+    in a bounded queue.
+
     Args:
         req (Request): The incoming HTTP request object, expected to have a JSON body with chat messages.
 
@@ -41,9 +71,15 @@ async def stream_openai_text(
         media type.
 
     Raises:
-        StreamingResponse: Returns a streaming error response with status code 400 if validation fails, or 500 for
-        other exceptions.
+        StreamingResponse: Returns a streaming error response with status code 400 if validation fails, 410 if the
+        stream cannot be resumed, 429 with a Retry-After header if the wait queue is full or no slot became free in
+        time, or 500 for other exceptions.
     """
+    last_event_id = req.headers.get("last-event-id")
+    stream_format = req.query_params.get("streamFormat") or os.environ.get(
+        EnvironmentVariables.STREAM_FORMAT.value, "jsonl")
+    use_sse = stream_format.lower() == "sse" or last_event_id is not None
+    error_handler = sse_error_handler if use_sse else stream_error_handler
     try:
         logger.info("Received streaming request for OpenAI text processing.")
         content_type = req.headers['content-type']
@@ -54,41 +90,139 @@ async def stream_openai_text(
             raise Exception(
                 "Unsupported Media Type: Only 'application/json' is supported.")
 
+        session_id = str(chat_request.session_state) if chat_request.session_state is not None else None
+        if last_event_id:
+            return _resume_stream(req, session_id, last_event_id)
+
         orchestrationType = req.query_params.get("orchestrationType")
         if orchestrationType is None:
             orchestrationType = os.environ.get(EnvironmentVariables.ORCHESTRATION_TYPE.value, "concurrent")
 
-        state: StateBase = MemoryState(chat_request=chat_request)
-        # make sure we capture whether the eval content should be included in the final delta context object
-        eval_content = req.query_params.get("evaluation", "False")
-        state.get_state().include_eval_content = eval_content.lower() == "true"
-
-        orchestrator = _get_orchestrator(orchestrationType, state)
-
-        response = orchestrator.invoke_stream()
-
+        # lets the evaluation compare the combined orchestration mode without redeploying
+        combined_intent = req.query_params.get("combinedIntent")
+        if combined_intent is not None:
+            combined_intent = combined_intent.lower() == "true"
+
+        # wait for a slot before any work is done for the request, the slot is freed once the response is produced
+        ticket = await ReportabilityServices.get_admission_controller().acquire(chat_request.get_user_id())
+        try:
+            state: StateBase = _create_state(chat_request)
+            await state.load()
+            # make sure we capture whether the eval content should be included in the final delta context object
+            eval_content = req.query_params.get("evaluation", "False")
+            state.get_state().include_eval_content = eval_content.lower() == "true"
+
+            orchestrator = _get_orchestrator(orchestrationType, state, combined_intent)
+
+            response = orchestrator.invoke_stream()
+            if use_sse:
+                frames = _release_when_done(_save_state_when_done(
+                    stream_processor(streaming_response=response, reportability_context=state.get_state()), state
+                ), ticket)
+                # record the response in the background so a client that loses its connection can resume it
+                replay_log = ReportabilityServices.get_stream_replay_store().start(
+                    session_id, frames, on_error=stream_error_handler)
+                return StreamingResponse(
+                    sse_stream_processor(replay_log, is_disconnected=req.is_disconnected),
+                    media_type="text/event-stream",
+                    headers=SSE_HEADERS
+                )
+            return StreamingResponse(
+                _release_when_done(_save_state_when_done(
+                    stream_processor(
+                        streaming_response=response,
+                        reportability_context=state.get_state(),
+                        is_disconnected=req.is_disconnected
+                    ),
+                    state
+                ), ticket),
+                media_type="text/event-stream"
+            )
+        except BaseException:
+            ticket.release()
+            raise
+    except AdmissionRejectedError as ae:
+        error_response = AIChatErrorResponse(error=AIChatError(code="too_many_requests", message=str(ae)))
         return StreamingResponse(
-            stream_processor(
-                streaming_response=response, reportability_context=state.get_state()), media_type="text/event-stream")
+            error_handler(error_response),
+            media_type="text/event-stream",
+            status_code=429,
+            headers={"Retry-After": str(ae.retry_after_seconds)}
+        )
+    except StreamResumeError as re:
+        logger.warning(f"Unable to resume stream: {re}")
+        error_response = AIChatErrorResponse(error=AIChatError(code="stream_resume_error", message=str(re)))
+        return StreamingResponse(error_handler(error_response), media_type="text/event-stream", status_code=410)
     except (ValidationError, ValueError) as ve:
         logger.exception(f"Validation error: {ve}", exc_info=ve)
         error_response = AIChatErrorResponse(error=AIChatError(code="invalid_request_error", message=str(ve)))
-        return StreamingResponse(stream_error_handler(error_response), media_type="text/event-stream", status_code=400)
+        return StreamingResponse(error_handler(error_response), media_type="text/event-stream", status_code=400)
     except Exception as e:
         logger.exception(f"Error processing request: {e}", exc_info=e)
-        return StreamingResponse(stream_error_handler(e), media_type="text/event-stream", status_code=500)
+        return StreamingResponse(error_handler(e), media_type="text/event-stream", status_code=500)
+
+
+def _resume_stream(req, session_id, last_event_id):
+    replay_log = ReportabilityServices.get_stream_replay_store().get(session_id)
+    if replay_log is None:
+        raise StreamResumeError("There is no recent response to resume for this session.")
+    # validate before the response starts so the client gets an error status rather than an error event
+    replay_log.parse_event_id(last_event_id)
+    logger.info(f"Resuming stream {replay_log.stream_id} after event {last_event_id}.")
+    return StreamingResponse(
+        sse_stream_processor(replay_log, last_event_id, is_disconnected=req.is_disconnected),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+def _create_state(chat_request: AIChatRequest) -> StateBase:
+    store = ReportabilityServices.get_session_state_store()
+    if store is None or chat_request.session_state is None:
+        return MemoryState(chat_request=chat_request)
+    max_turns = int(os.getenv(EnvironmentVariables.STATE_STORE_MAX_TURNS.value, DEFAULT_SNAPSHOT_MAX_TURNS))
+    return PersistentState(chat_request=chat_request, store=store, max_turns=max_turns)
+
+
+async def _save_state_when_done(frames: AsyncIterator[str], state: StateBase) -> AsyncIterator[str]:
+    # saved once the response has been produced or abandoned, so the next turn sees this turn's history, documents and
+    # recommendations
+    try:
+        async with aclosing(frames) as response_frames:
+            async for frame in response_frames:
+                yield frame
+    finally:
+        pending_tasks = state.get_state().pop_pending_tasks()
+        if pending_tasks:
+            # the recommendations are still being extracted, so the state is saved in the background once they are in
+            # rather than holding the response open for them
+            asyncio.gather(*pending_tasks, return_exceptions=True).add_done_callback(
+                lambda _: ReportabilityServices.get_background_task_pool().submit("session_state_save", state.save)
+            )
+        else:
+            await state.save()
+
+
+async def _release_when_done(frames: AsyncIterator[str], ticket: AdmissionTicket) -> AsyncIterator[str]:
+    # the slot is held until the response has been produced or abandoned, not just until the handler returns
+    try:
+        async with aclosing(frames) as response_frames:
+            async for frame in response_frames:
+                yield frame
+    finally:
+        ticket.release()
 
 
-def _get_orchestrator(orchestrationType, state):
+def _get_orchestrator(orchestrationType, state, combined_intent=None):
     match orchestrationType:
         case "sequential":
-            orchestrator = SequentialAgentOrchestrator(state=state)
+            orchestrator = SequentialAgentOrchestrator(state=state, combined_intent=combined_intent)
         case "single":
-            orchestrator = SingleAgentOrchestrator(state=state)
+            orchestrator = SingleAgentOrchestrator(state=state, combined_intent=combined_intent)
         case "concurrent":
-            orchestrator = ConcurrentAgentOrchestrator(state=state)
+            orchestrator = ConcurrentAgentOrchestrator(state=state, combined_intent=combined_intent)
         case _:
             logger.warning(
                     f"Unknown orchestration type: {orchestrationType}. Defaulting to SingleAgentOrchestrator.")
-            orchestrator = SingleAgentOrchestrator(state=state)
+            orchestrator = SingleAgentOrchestrator(state=state, combined_intent=combined_intent)
     return orchestrator
@@ -11,6 +11,10 @@ from models.chat_models import (
     AIChatRole,
 )
 
+from models.chunk_buffer import ChunkBuffer
+
+from models.request_budget import RequestBudget
+
 from models.context_models import (
     ReportabilityContext,
     ContextModel,
@@ -59,5 +63,7 @@ __all__ = [
     "Intent",
     "SearchModelsBase",
     "TokenUsage",
-    "NaiveSearch"
+    "NaiveSearch",
+    "ChunkBuffer",
+    "RequestBudget"
 ]
@@ -176,3 +176,14 @@ class AIChatRequest(ChatModel):
         if not v:
             raise ValueError('messages must not be empty')
         return v
+
+    def get_user_id(self) -> Optional[str]:
+        """
+        Gets the id of the user making the request, from "context.user.id".
+
+        Returns:
+            Optional[str]: The user id, or None if the request does not carry one.
+        """
+        user = self.context.get("user") if isinstance(self.context, dict) else None
+        user_id = user.get("id") if isinstance(user, dict) else None
+        return str(user_id) if user_id else None
@@ -0,0 +1,100 @@
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+from typing import Any, Optional
+
+
+class ChunkBuffer:
+    """
+    Append-only text buffer for streamed chunks.
+
+    Chunks are kept in a list and only joined when the text is read, so accumulating a long streamed answer costs
+    O(n) instead of the O(n²) of repeated string concatenation. The joined text is cached until the next append.
+
+    Attributes:
+        max_chars (Optional[int]): When set, only the first `max_chars` characters are kept and later text is dropped.
+        truncated (bool): Whether text has been dropped because of `max_chars`.
+    """
+
+    __slots__ = ("_chunks", "_length", "_joined", "max_chars", "truncated")
+
+    def __init__(self, text: str = "", max_chars: Optional[int] = None) -> None:
+        """
+        Initializes the buffer.
+
+        Args:
+            text (str, optional): Initial text for the buffer.
+            max_chars (Optional[int], optional): The maximum number of characters to keep. Defaults to no limit.
+        """
+        self._chunks: list[str] = []
+        self._length: int = 0
+        self._joined: Optional[str] = ""
+        self.max_chars: Optional[int] = max_chars
+        self.truncated: bool = False
+        if text:
+            self.append(text)
+
+    def append(self, chunk: Optional[str]) -> None:
+        """
+        Appends a chunk to the buffer. Empty chunks are ignored.
+
+        Args:
+            chunk (Optional[str]): The text to append.
+        """
+        if not chunk:
+            return
+        if self.max_chars is not None:
+            remaining = self.max_chars - self._length
+            if remaining <= 0:
+                self.truncated = True
+                return
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = True
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        self._joined = None
+
+    def __iadd__(self, chunk: str) -> "ChunkBuffer":
+        self.append(chunk)
+        return self
+
+    def __str__(self) -> str:
+        if self._joined is None:
+            self._joined = "".join(self._chunks)
+            # keep the joined text as the only chunk so later reads and appends don't join everything again
+            self._chunks = [self._joined] if self._joined else []
+        return self._joined
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChunkBuffer):
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ChunkBuffer(length={self._length}, chunks={len(self._chunks)}, truncated={self.truncated})"
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        # accept plain strings so the field can be populated from serialized state, and serialize back to a string
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(str),
+        )
+
+    @classmethod
+    def _validate(cls, value: Any) -> "ChunkBuffer":
+        if isinstance(value, ChunkBuffer):
+            return value
+        if isinstance(value, str):
+            return cls(value)
+        raise ValueError("ChunkBuffer must be created from a string.")
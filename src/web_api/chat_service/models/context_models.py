@@ -1,14 +1,26 @@
+import asyncio
+
 from enum import Enum
-from pydantic import ConfigDict, Field
+from pydantic import ConfigDict, Field, PrivateAttr
 from pydantic.alias_generators import to_camel
 from semantic_kernel.agents import ChatHistoryAgentThread
-from semantic_kernel.contents import ChatHistory
+from semantic_kernel.contents import ChatHistory, ChatMessageContent
 from semantic_kernel.kernel_pydantic import KernelBaseModel
-from typing import Any, Optional
+from typing import Any, Iterable, Optional, Type, TypeVar
 
 from . import AIChatRequest, AIChatRole
+from .chunk_buffer import ChunkBuffer
+from .request_budget import RequestBudget
 from .search_models import SearchModelsBase
 
+TSearchModel = TypeVar("TSearchModel", bound=SearchModelsBase)
+
+SNAPSHOT_VERSION = 2
+# Number of turns whose documents and recommendations a snapshot carries over, so a long session stays bounded
+DEFAULT_SNAPSHOT_MAX_TURNS = 5
+# Metadata key of chat history messages holding the full text of a document, set to a short reference to it
+DOCUMENT_REFERENCE_METADATA = "document_reference"
+
 
 class Intent(Enum):
     """Intent is an enumeration representing the intent of a chat session."""
@@ -58,10 +70,17 @@ class TokenUsage(ContextModel):
         prompt_tokens (int): The number of tokens used in the prompt.
         completion_tokens (int): The number of tokens used in the completion.
         total_tokens (int): The total number of tokens used.
+        prompt_tokens_saved (int): The estimated prompt tokens saved by condensing older turns of the chat history.
+        speculative (bool): Whether the tokens were spent on speculative work that was discarded, for example knowledge
+            agents started before the intent turned out to be invalid.
     """
     agent_name: Optional[str] = Field(None, description="The name of the agent associated with the token usage.")
     prompt_tokens: int = Field(0, description="The number of tokens used in the prompt.")
     completion_tokens: int = Field(0, description="The number of tokens used in the completion.")
+    prompt_tokens_saved: int = Field(
+        0, description="The estimated prompt tokens saved by condensing older turns of the chat history."
+    )
+    speculative: bool = Field(False, description="Whether the tokens were spent on discarded speculative work.")
 
 
 class ReportabilityContext(ContextModel):
@@ -70,26 +89,46 @@ class ReportabilityContext(ContextModel):
 
     Attributes:
         current_input_index (int): The index of the current input in the chat session. Defaults to 0.
-        message_history (list[AIChatMessage]): A list containing the history of AI chat messages in the session.
+        message_history (ChatHistory): The history of chat messages in the session.
         streaming_response (Optional[Any]): An optional field to store the current streaming response, if any.
         chat_request (Optional[AIChatRequest]): The AI chat request associated with the session.
-        all_chunks (str): A string containing all chunks of the chat session.
+        all_chunks (ChunkBuffer): All chunks streamed in the chat session.
         intent (Intent): The intent of the chat session, defaulting to an empty string.
+        intent_source (str): What decided the intent, `rules` or `model` for the local classifier, `llm` for the
+            intent agent and `combined` for an agent that detects the intent while searching.
+        predicted_intent (Optional[Intent]): The intent told by the local classifier, kept to compare it with the
+            intent agent. None when the classifier was not confident or did not run.
         user_input_needed (bool): A flag indicating whether user input is needed in the session.
         recommendations (list[Recommendation]): A list of recommendations made during the session.
         token_usage (list[TokenUsage]): A list of token usage statistics for the session.
         include_eval_content (bool): A flag indicating whether to include evaluation content in the session.
+
+    Search results should be added through `add_plugin_result` so the id and type indexes kept alongside
+    `plugin_results` stay in step with the list.
     """
+    # mutable fields use default factories so every request gets its own containers without pydantic deep-copying
+    # a shared default
     current_input_index: int = 0
-    message_history: ChatHistory = ChatHistory()
-    plugin_results: list[SearchModelsBase] = []
+    message_history: ChatHistory = Field(default_factory=ChatHistory)
+    plugin_results: list[SearchModelsBase] = Field(default_factory=list)
     chat_request: Optional[AIChatRequest] = None
-    all_chunks: str = ""
+    all_chunks: ChunkBuffer = Field(default_factory=ChunkBuffer)
     intent: Intent = ""
+    intent_source: str = ""
+    predicted_intent: Optional[Intent] = None
     user_input_needed: bool = False
-    recommendations: list[Recommendation] = []
-    token_usage: list[TokenUsage] = []
+    recommendations: list[Recommendation] = Field(default_factory=list)
+    token_usage: list[TokenUsage] = Field(default_factory=list)
     include_eval_content: bool = False
+    _plugin_results_by_id: dict[str, SearchModelsBase] = PrivateAttr(default_factory=dict)
+    _plugin_results_by_type: dict[type, list[SearchModelsBase]] = PrivateAttr(default_factory=dict)
+    _pending_tasks: list[asyncio.Task] = PrivateAttr(default_factory=list)
+    _restored_plugin_result_ids: set[str] = PrivateAttr(default_factory=set)
+    # the turn of the conversation, and the turns that restored documents and recommendations were last found in
+    _turn: int = PrivateAttr(default=0)
+    _plugin_result_turns: dict[str, int] = PrivateAttr(default_factory=dict)
+    _recommendation_turns: list[int] = PrivateAttr(default_factory=list)
+    _budget: RequestBudget = PrivateAttr(default_factory=RequestBudget)
 
     def __init__(self, **data: Any) -> None:
         """
@@ -99,8 +138,245 @@ class ReportabilityContext(ContextModel):
             **data: Arbitrary keyword arguments to initialize the context.
         """
         super().__init__(**data)
+        for result in self.plugin_results:
+            self._plugin_results_by_id.setdefault(result.id, result)
+        self._index_plugin_results_by_type()
         self._transform_chat_request()
 
+    def has_plugin_result(self, document_id: str) -> bool:
+        """
+        Checks whether a search result with the given document id has already been collected.
+
+        Args:
+            document_id (str): The id of the document.
+
+        Returns:
+            bool: True if the result is in `plugin_results`.
+        """
+        return document_id in self._plugin_results_by_id
+
+    def get_plugin_result(self, document_id: str) -> Optional[SearchModelsBase]:
+        """
+        Gets a collected search result by document id.
+
+        Args:
+            document_id (str): The id of the document.
+
+        Returns:
+            Optional[SearchModelsBase]: The search result, or None if it has not been collected.
+        """
+        return self._plugin_results_by_id.get(document_id)
+
+    def add_plugin_result(self, result: SearchModelsBase) -> bool:
+        """
+        Adds a search result unless a result with the same document id has already been collected.
+
+        Args:
+            result (SearchModelsBase): The search result to add.
+
+        Returns:
+            bool: True if the result was added, False if it was already present.
+        """
+        if result.id in self._plugin_results_by_id:
+            return False
+        self._plugin_results_by_id[result.id] = result
+        self._plugin_results_by_type.setdefault(type(result), []).append(result)
+        self.plugin_results.append(result)
+        return True
+
+    def truncate_plugin_results(self, length: int) -> None:
+        """
+        Removes every search result added after the first `length`, for example to discard speculative work.
+
+        Args:
+            length (int): The number of results to keep.
+        """
+        for result in self.plugin_results[length:]:
+            if self._plugin_results_by_id.get(result.id) is result:
+                del self._plugin_results_by_id[result.id]
+        del self.plugin_results[length:]
+        self._index_plugin_results_by_type()
+
+    def remove_plugin_results(self, document_ids: Iterable[str]) -> None:
+        """
+        Removes collected search results, for example results an agent was never shown, so a later search can
+        return them again.
+
+        Args:
+            document_ids (Iterable[str]): The ids of the documents to remove. Unknown ids are ignored.
+        """
+        removed = {document_id for document_id in document_ids if document_id in self._plugin_results_by_id}
+        if not removed:
+            return
+        for document_id in removed:
+            del self._plugin_results_by_id[document_id]
+        self._restored_plugin_result_ids -= removed
+        self.plugin_results[:] = [result for result in self.plugin_results if result.id not in removed]
+        self._index_plugin_results_by_type()
+
+    def get_plugin_results(self, model_class: Type[TSearchModel]) -> list[TSearchModel]:
+        """
+        Gets the collected search results of one search model type, in the order they were added.
+
+        Results are looked up in the index kept by type, so the lookup does not scan every collected result.
+
+        Args:
+            model_class (Type[TSearchModel]): The search model type to filter on. Results of its subclasses are
+                included.
+
+        Returns:
+            list[TSearchModel]: The matching search results.
+        """
+        matching_types = [
+            result_type for result_type in self._plugin_results_by_type if issubclass(result_type, model_class)
+        ]
+        if len(matching_types) == 1:
+            return list(self._plugin_results_by_type[matching_types[0]])
+        if not matching_types:
+            return []
+        # a base class spanning several indexed types keeps the order results were added in
+        return [result for result in self.plugin_results if isinstance(result, model_class)]
+
+    def _index_plugin_results_by_type(self) -> None:
+        self._plugin_results_by_type.clear()
+        for result in self.plugin_results:
+            self._plugin_results_by_type.setdefault(type(result), []).append(result)
+
+    def mark_plugin_results_cited(self, document_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Marks collected search results as cited.
+
+        Args:
+            document_ids (Optional[Iterable[str]]): The ids of the cited documents. Unknown ids are ignored.
+                Defaults to marking every collected result.
+        """
+        if document_ids is None:
+            results = self.plugin_results
+        else:
+            results = (self._plugin_results_by_id.get(document_id) for document_id in document_ids)
+        for result in results:
+            if result is not None:
+                result.cited = True
+
+    def take_restored_plugin_result(self, document_id: str) -> Optional[SearchModelsBase]:
+        """
+        Gets a search result restored from an earlier turn the first time it is found again in this turn.
+
+        Restored results are already in `plugin_results`, but the agents of this turn have not seen their content.
+
+        Args:
+            document_id (str): The id of the document.
+
+        Returns:
+            Optional[SearchModelsBase]: The restored search result, or None if it was not restored or was already
+                taken.
+        """
+        if document_id not in self._restored_plugin_result_ids:
+            return None
+        self._restored_plugin_result_ids.discard(document_id)
+        # found again, so the document carries over as a document of this turn
+        self._plugin_result_turns.pop(document_id, None)
+        return self._plugin_results_by_id.get(document_id)
+
+    def to_snapshot(self, max_turns: int = DEFAULT_SNAPSHOT_MAX_TURNS) -> dict[str, Any]:
+        """
+        Captures the parts of the context that carry over to the next turn of the conversation: the chat history,
+        the retrieved documents and the recommendations.
+
+        Documents and recommendations are only carried over from the last `max_turns` turns they were found in, so
+        the snapshot of a long conversation does not keep growing.
+
+        Args:
+            max_turns (int, optional): The number of turns whose documents and recommendations are kept. Defaults to
+                DEFAULT_SNAPSHOT_MAX_TURNS.
+
+        Returns:
+            dict[str, Any]: A JSON serializable snapshot.
+        """
+        oldest_turn = self._turn - max_turns + 1
+        recommendation_turns = self._recommendation_turns + [self._turn] * (
+            len(self.recommendations) - len(self._recommendation_turns)
+        )
+        plugin_results = []
+        for result in self.plugin_results:
+            turn = self._plugin_result_turns.get(result.id, self._turn)
+            if turn >= oldest_turn:
+                plugin_results.append(
+                    {"type": type(result).__name__, "turn": turn, "data": result.model_dump(mode="json")}
+                )
+        return {
+            "version": SNAPSHOT_VERSION,
+            "turn": self._turn,
+            "messages": [
+                _message_to_snapshot(message)
+                for message in self.message_history.messages
+                if message.role.value in (AIChatRole.USER.value, AIChatRole.ASSISTANT.value) and message.content
+            ],
+            "plugin_results": plugin_results,
+            "recommendations": [
+                {"turn": turn, "data": recommendation.model_dump(mode="json")}
+                for recommendation, turn in zip(self.recommendations, recommendation_turns)
+                if turn >= oldest_turn
+            ],
+        }
+
+    def restore_snapshot(self, snapshot: dict[str, Any], restore_history: bool = True) -> None:
+        """
+        Restores the documents and recommendations of earlier turns, and optionally the chat history.
+
+        Restored documents are not marked as cited, so each turn reports its own citations.
+
+        Args:
+            snapshot (dict[str, Any]): A snapshot created by `to_snapshot`. Snapshots of another version are ignored.
+            restore_history (bool, optional): Whether the chat history of the snapshot is placed before the messages
+                of the chat request. Defaults to True.
+        """
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return
+        self._turn = snapshot["turn"] + 1
+        if restore_history:
+            history = ChatHistory()
+            for message in snapshot["messages"]:
+                if message["role"] == AIChatRole.USER.value:
+                    history.add_user_message(message["content"])
+                elif message.get(DOCUMENT_REFERENCE_METADATA):
+                    history.add_assistant_message(
+                        message["content"],
+                        metadata={DOCUMENT_REFERENCE_METADATA: message[DOCUMENT_REFERENCE_METADATA]},
+                    )
+                else:
+                    history.add_assistant_message(message["content"])
+            history.messages.extend(self.message_history.messages)
+            self.message_history = history
+
+        model_types = _get_search_model_types()
+        for entry in snapshot["plugin_results"]:
+            model_type = model_types.get(entry["type"])
+            if model_type is None:
+                continue
+            result = model_type.model_validate(entry["data"])
+            result.cited = False
+            if self.add_plugin_result(result):
+                self._restored_plugin_result_ids.add(result.id)
+                self._plugin_result_turns[result.id] = entry["turn"]
+
+        self.recommendations = [
+            Recommendation.model_validate(entry["data"]) for entry in snapshot["recommendations"]
+        ] + self.recommendations
+        self._recommendation_turns = [entry["turn"] for entry in snapshot["recommendations"]]
+
+    def add_document_to_history(self, content: str, document_reference: Optional[str] = None) -> None:
+        """
+        Adds the full text of a document to the chat history as an assistant message.
+
+        Args:
+            content (str): The text of the document.
+            document_reference (Optional[str]): A short reference to the document, used in place of its text once the
+                message is no longer among the most recent turns.
+        """
+        metadata = {DOCUMENT_REFERENCE_METADATA: document_reference} if document_reference else {}
+        self.message_history.add_assistant_message(content, metadata=metadata)
+
     def _transform_chat_request(self) -> None:
         if self.chat_request:
             for message in self.chat_request.messages:
@@ -109,6 +385,43 @@ class ReportabilityContext(ContextModel):
                 elif message.role == AIChatRole.ASSISTANT:
                     self.message_history.add_assistant_message(message.content)
 
+    @property
+    def budget(self) -> RequestBudget:
+        """The budget of the request, unlimited until the orchestrator sets one."""
+        return self._budget
+
+    def set_budget(self, budget: RequestBudget) -> None:
+        """
+        Sets the budget the agents of the request spend from.
+
+        Args:
+            budget (RequestBudget): The budget.
+        """
+        self._budget = budget
+
+    def add_pending_task(self, task: asyncio.Task) -> None:
+        """
+        Registers background work whose results must be in the context before the final context event is sent.
+
+        Args:
+            task (asyncio.Task): The background task.
+        """
+        self._pending_tasks.append(task)
+
+    def pop_pending_tasks(self) -> list[asyncio.Task]:
+        """
+        Removes the registered background tasks, for callers that follow them up without waiting in place.
+
+        Returns:
+            list[asyncio.Task]: The tasks registered since the tasks were last removed or waited for.
+        """
+        pending_tasks, self._pending_tasks = self._pending_tasks, []
+        return pending_tasks
+
+    async def wait_for_pending_tasks(self) -> None:
+        """Waits for every registered background task to finish. Failures are left to the tasks to report."""
+        await asyncio.gather(*self.pop_pending_tasks(), return_exceptions=True)
+
     def get_agent_thread(self) -> ChatHistoryAgentThread:
         """
         Retrieves the agent thread from the message history.
@@ -119,3 +432,21 @@ class ReportabilityContext(ContextModel):
         return ChatHistoryAgentThread(
             thread_id=self.chat_request.session_state,
         )
+
+
+def _message_to_snapshot(message: ChatMessageContent) -> dict[str, str]:
+    snapshot = {"role": message.role.value, "content": message.content}
+    document_reference = message.metadata.get(DOCUMENT_REFERENCE_METADATA)
+    if document_reference:
+        snapshot[DOCUMENT_REFERENCE_METADATA] = document_reference
+    return snapshot
+
+
+def _get_search_model_types() -> dict[str, Type[SearchModelsBase]]:
+    model_types: dict[str, Type[SearchModelsBase]] = {}
+    pending = [SearchModelsBase]
+    while pending:
+        for subclass in pending.pop().__subclasses__():
+            model_types[subclass.__name__] = subclass
+            pending.append(subclass)
+    return model_types
@@ -0,0 +1,90 @@
+import time
+
+from typing import Optional
+
+BUDGET_REASON_TIME = "time"
+BUDGET_REASON_PROMPT_TOKENS = "prompt_tokens"
+BUDGET_REASON_COMPLETION_TOKENS = "completion_tokens"
+BUDGET_REASON_TOOL_CALLS = "tool_calls"
+
+
+class RequestBudget:
+    """
+    The wall time, tokens and tool calls one chat request may spend.
+
+    The clock starts when the budget is created. A limit of zero or less is not enforced, so a budget created without
+    arguments never runs out. The budget only keeps count, the agents and orchestrators decide what to do once it is
+    exhausted.
+
+    Attributes:
+        max_seconds (float): The maximum wall time of the request.
+        max_prompt_tokens (int): The maximum prompt tokens of every completion of the request.
+        max_completion_tokens (int): The maximum completion tokens of every completion of the request.
+        max_tool_calls (int): The maximum number of tool calls of the request.
+        prompt_tokens (int): The prompt tokens spent so far.
+        completion_tokens (int): The completion tokens spent so far.
+        tool_calls (int): The tool calls requested so far, including refused ones.
+    """
+
+    def __init__(
+            self,
+            max_seconds: float = 0.0,
+            max_prompt_tokens: int = 0,
+            max_completion_tokens: int = 0,
+            max_tool_calls: int = 0
+    ) -> None:
+        """
+        Initializes the budget and starts its clock.
+
+        Args:
+            max_seconds (float, optional): The maximum wall time of the request. Defaults to no limit.
+            max_prompt_tokens (int, optional): The maximum prompt tokens. Defaults to no limit.
+            max_completion_tokens (int, optional): The maximum completion tokens. Defaults to no limit.
+            max_tool_calls (int, optional): The maximum number of tool calls. Defaults to no limit.
+        """
+        self.max_seconds = max_seconds
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.max_tool_calls = max_tool_calls
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tool_calls = 0
+        self._started = time.monotonic()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """The wall time since the budget was created."""
+        return time.monotonic() - self._started
+
+    def add_token_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Counts the tokens of a completion.
+
+        Args:
+            prompt_tokens (int): The prompt tokens.
+            completion_tokens (int): The completion tokens.
+        """
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+
+    def add_tool_call(self) -> None:
+        """Counts a tool call requested by an agent, before it is run."""
+        self.tool_calls += 1
+
+    def exceeded(self) -> Optional[str]:
+        """
+        Tells whether a limit of the budget has been passed.
+
+        Returns:
+            Optional[str]: The limit that was passed, one of `time`, `prompt_tokens`, `completion_tokens` or
+                `tool_calls`, or None while the request is within budget.
+        """
+        if 0 < self.max_seconds < self.elapsed_seconds:
+            return BUDGET_REASON_TIME
+        if 0 < self.max_prompt_tokens < self.prompt_tokens:
+            return BUDGET_REASON_PROMPT_TOKENS
+        if 0 < self.max_completion_tokens < self.completion_tokens:
+            return BUDGET_REASON_COMPLETION_TOKENS
+        if 0 < self.max_tool_calls < self.tool_calls:
+            return BUDGET_REASON_TOOL_CALLS
+        return None
@@ -6,7 +6,7 @@ from semantic_kernel.data import (
     VectorStoreRecordKeyField,
     vectorstoremodel,
 )
-from typing import Annotated, List
+from typing import Annotated, ClassVar, List
 from urllib.parse import quote, unquote
 
 from services import ReportabilityServices
@@ -33,6 +33,8 @@ class SearchConfiguration(BaseModel):
         select_fields: The fields to select in the search results.
         vector_fields: The field containing the vector embeddings for vector or hybrid searches.
         threshold: The threshold for similarity in vector searches, used to filter results.
+        max_tokens: The token budget of the results returned to the agent by one search. Defaults to the
+            CONTEXT_PACKING_MAX_TOKENS environment variable.
     """
     index_name_setting: str = Field(
         ..., description="The name of the environment variable the name of the index can be found in.")
@@ -52,6 +54,8 @@ class SearchConfiguration(BaseModel):
         ..., description="The field containing the vector embeddings for vector or hybrid searches.")
     threshold: float = Field(
         ..., description="The threshold for similarity in vector searches, used to filter results.")
+    max_tokens: int | None = Field(
+        default=None, description="The token budget of the results returned to the agent by one search.")
 
 
 class SearchConfigurationList(RootModel[dict[str, SearchConfiguration]]):
@@ -102,7 +106,10 @@ class SearchModelsBase(ABC, BaseModel):
         pageNumber: Page number in the document where the section is located.
         cited: Indicates if the document has been cited in the chat history.
         search_query: The search query used to retrieve this document.
+        search_score: The relevance score the search service assigned to this document.
+        truncatable_fields: The long text and list fields that may be shortened to fit the document into a prompt.
     """
+    truncatable_fields: ClassVar[tuple[str, ...]] = ()
     id: Annotated[str, VectorStoreRecordKeyField] = Field(default="naive", description="Unique identifier of section.")
     storageAccountName: Annotated[str, VectorStoreRecordDataField()] = Field(default="naive")
     containerName: Annotated[str, VectorStoreRecordDataField()] = Field(default="naive")
@@ -114,6 +121,9 @@ class SearchModelsBase(ABC, BaseModel):
     search_query: Annotated[str, VectorStoreRecordDataField()] = Field(
         default="", description="The search query used to retrieve this document."
     )
+    search_score: Annotated[float, VectorStoreRecordDataField()] = Field(
+        default=0.0, description="The relevance score the search service assigned to this document."
+    )
 
     @abstractmethod
     def get_display_value(self) -> str:
@@ -186,6 +196,7 @@ class NUREGSection32(SearchModelsBase):
         pageNumber: Page number in the NUREG document.
         examples: List of example objects, each with a title and description.
     """
+    truncatable_fields: ClassVar[tuple[str, ...]] = ("description", "discussion", "examples")
     section: Annotated[str, VectorStoreRecordDataField()] = Field(
         ..., description="The title of the section within NUREG 1022 this entry is from.")
     lxxii: Annotated[list[str], VectorStoreRecordDataField()] = Field(
@@ -257,6 +268,7 @@ class ReportabilityManual(SearchModelsBase):
     """
     The implementation of the SearchModelBase for the Reportability Manual.
     """
+    truncatable_fields: ClassVar[tuple[str, ...]] = ("referenceContent", "discussion")
     sectionName: Annotated[str, VectorStoreRecordDataField()] = Field(...)
     references: Annotated[list[str], VectorStoreRecordDataField()] = Field(...)
     referenceContent: Annotated[str, VectorStoreRecordDataField()] = Field(...)
@@ -299,6 +311,7 @@ class NaiveSearch(SearchModelsBase):
     """
     The implementation of the SearchModelBase for the Naive Search.
     """
+    truncatable_fields: ClassVar[tuple[str, ...]] = ("content",)
     chunk_id: Annotated[str, VectorStoreRecordDataField()] = Field(...)
     title: Annotated[str, VectorStoreRecordDataField()] = Field(...)
     url: Annotated[str, VectorStoreRecordDataField()] = Field(...)
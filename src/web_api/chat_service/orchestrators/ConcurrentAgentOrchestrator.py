@@ -1,7 +1,10 @@
+import os
+
 from .OrchestratorBase import OrchestratorBase
-from models import Intent, ReportabilityContext
-from opentelemetry import trace
-from asyncio import FIRST_COMPLETED, Task, create_task, wait
+from constants import EnvironmentVariables
+from models import ChunkBuffer, Intent, ReportabilityContext
+from opentelemetry import metrics, trace
+from contextlib import aclosing
 from typing import AsyncIterable, AsyncIterator, Collection
 from semantic_kernel.agents.agent import AgentResponseItem
 from semantic_kernel.contents import StreamingChatMessageContent
@@ -13,27 +16,42 @@ from agents import (
     RecommendationExtractionAgent,
     ReportabilityManualAgent,
 )
-from util import StreamingMessageMetadata, get_agent_response_item
+from util import (
+    PrefetchingAsyncIterator, StreamingMessageMetadata, get_agent_response_item, merge_async_iterators
+)
 from state import StateBase
 
+meter = metrics.get_meter(__name__)
+speculative_start_counter = meter.create_counter(
+    "orchestrator.speculative_start",
+    description="Knowledge agent runs started during intent detection, by whether they were used or discarded.",
+)
+
 
 class ConcurrentAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
     """Concurrent orchestration for agents."""
 
-    def __init__(self, state: StateBase[ReportabilityContext]):
+    def __init__(self, state: StateBase[ReportabilityContext], combined_intent: bool = None):
         """
         Initialize the ConcurrentAgentOrchestrator with a given state.
 
         Args:
             state: The state object containing the chat request and other necessary information.
+            combined_intent: Whether the reportability manual agent detects the intent instead of the intent agent.
+                Defaults to the ORCHESTRATOR_COMBINED_INTENT environment variable or false.
         """
-        super().__init__(state)
+        super().__init__(state, combined_intent=combined_intent)
         self._intent_agent: AgentBase = IntentAgent(state=state)
         self._extraction_agent: RecommendationExtractionAgent = RecommendationExtractionAgent(state=state)
-        self._reportability_agent:  ReportabilityManualAgent = ReportabilityManualAgent(state=state)
+        self._reportability_agent:  ReportabilityManualAgent = ReportabilityManualAgent(
+            state=state, detect_intent=self._combined_intent
+        )
         self._nureg_agent:  NuregAgent = NuregAgent(state=state)
         self._recommendation_agent: RecommendationAgent = RecommendationAgent(state=state)
         self._extraction_agent: RecommendationExtractionAgent = RecommendationExtractionAgent(state=state)
+        self._speculative_start: bool = (
+            os.getenv(EnvironmentVariables.ORCHESTRATOR_SPECULATIVE_START.value, "false").lower() == "true"
+        )
 
     async def _execute_nureg_agent(self) -> AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]:
         async for response in self._nureg_agent.invoke_stream():
@@ -43,54 +61,62 @@ class ConcurrentAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
         async for response in self._reportability_agent.invoke_stream():
             yield response
 
+    def _get_knowledge_iterators(self) -> list[AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]]:
+        return [self._execute_reportability_agent(), self._execute_nureg_agent()]
+
+    def _discard_knowledge_agent_work(self, plugin_result_count: int, token_usage_count: int) -> None:
+        # drop the documents of the cancelled knowledge agents so they are not reported, but keep their token usage,
+        # marked speculative, since those tokens were spent and count against the request budget
+        state = self._state.get_state()
+        state.truncate_plugin_results(plugin_result_count)
+        knowledge_agent_names = {self._reportability_agent.trace_name, self._nureg_agent.trace_name}
+        for usage in state.token_usage[token_usage_count:]:
+            if usage.agent_name in knowledge_agent_names:
+                usage.speculative = True
+
     async def _merge_iterators(self,
                                iterators: Collection[AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]]) \
             -> AsyncIterable[AgentResponseItem[StreamingChatMessageContent]]:
         """
         Enable consumption of multiple `AsyncIterator`s from within one `for` loop.
 
-        - Ignore any exceptions.
+        - Raise the first exception from any iterator after cancelling the others.
         - Yield until all iterators have exhausted.
         """
-
-        # turn async generator into coroutine
-        async def await_next(iterator: AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]) -> \
-                AgentResponseItem[StreamingChatMessageContent]:
-            """Turn an awaitable into a coroutine for `create_task`."""
-            return await iterator.__anext__()
-
-        # turn coroutine into a task.
-        def as_task(iterator: AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]) -> \
-                Task[AgentResponseItem[StreamingChatMessageContent]]:
-            return create_task(await_next(iterator))
-
         yield get_agent_response_item(
             f"## Engaging {self._reportability_agent.display_name} {self._nureg_agent.display_name}\n\n",
             self._state.get_state().get_agent_thread(),
             flush=True
         )
-        # Create a task for each iterator, keyed on the iterator.
-        next_tasks = {iterator: as_task(iterator) for iterator in iterators}
-
-        # As iterators are exhausted, they'll be removed from that mapping.
-        # Repeat for as long as any are NOT exhausted.
-        while next_tasks:
-            # Wait until one of the iterators yields (or errors out).
-            # This also returns pending tasks, but we've got those in our mapping.
-            done, _ = await wait(next_tasks.values(), return_when=FIRST_COMPLETED)
-
-            for task in done:
-                iterator = next(it for it, t in next_tasks.items() if t == task)
+        # close the merge explicitly so the agents still running are cancelled as soon as the caller stops reading
+        async with aclosing(merge_async_iterators(iterators)) as responses:
+            async for response in responses:
+                yield response
 
-                try:
-                    abc = task.result()
-                    yield abc
-                except StopAsyncIteration:
-                    del next_tasks[iterator]
-                except Exception as e:
-                    print(e)
-                else:
-                    next_tasks[iterator] = as_task(iterator)
+    async def _stream_knowledge_responses(
+            self,
+            knowledge_responses: AsyncIterator[AgentResponseItem[StreamingChatMessageContent]],
+            message: ChunkBuffer
+    ) -> AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]:
+        async with aclosing(knowledge_responses) as responses:
+            async for response in responses:
+                yield_to_user = response.message.metadata.get(StreamingMessageMetadata.YIELD_TO_USER.value, True)
+                add_to_chat_history = response.message.metadata.get(
+                    StreamingMessageMetadata.ADD_TO_CHAT_HISTORY.value, True
+                )
+                combine_before_adding_to_history = response.message.metadata.get(
+                    StreamingMessageMetadata.COMBINE_BEFORE_ADDING_TO_HISTORY.value, True
+                )
+                if add_to_chat_history:
+                    if combine_before_adding_to_history:
+                        message.append(response.message.content)
+                    else:
+                        self._state.get_state().add_document_to_history(
+                            response.message.content,
+                            response.message.metadata.get(StreamingMessageMetadata.DOCUMENT_REFERENCE.value)
+                        )
+                if yield_to_user:
+                    yield response
 
     async def invoke_stream(self) -> AsyncIterator[str]:
         """Invoke the orchestration of communication with agents and stream responses.
@@ -103,40 +129,82 @@ class ConcurrentAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
         with tracer.start_as_current_span("ConcurrentAgentOrchestrator.invoke_stream"):
             self._intent_agent: AgentBase = IntentAgent(state=self._state)
 
-            async for response in await self._intent_agent.invoke_stream():
-                self._intent_agent.track_token_usage(response)
-                if response.message.content:
-                    yield response
+            knowledge_responses: AsyncIterator[AgentResponseItem[StreamingChatMessageContent]] | None = None
+            plugin_result_count = len(self._state.get_state().plugin_results)
+            token_usage_count = len(self._state.get_state().token_usage)
+            if self._combined_intent:
+                # the knowledge agents start right away, their responses are held until the intent is known
+                knowledge_responses = self._hold_until_intent(self._merge_iterators(self._get_knowledge_iterators()))
+            elif self._speculative_start:
+                knowledge_responses = PrefetchingAsyncIterator(self._merge_iterators(self._get_knowledge_iterators()))
 
-            if self._state.get_state().intent == Intent.INVALID:
-                return
+            if not self._combined_intent:
+                try:
+                    async for response in await self._intent_agent.invoke_stream():
+                        self._intent_agent.track_token_usage(response)
+                        if response.message.content:
+                            yield response
+                except BaseException:
+                    if knowledge_responses is not None:
+                        await knowledge_responses.aclose()
+                    raise
+
+                if self._state.get_state().intent == Intent.INVALID:
+                    if knowledge_responses is not None:
+                        await knowledge_responses.aclose()
+                        self._discard_knowledge_agent_work(plugin_result_count, token_usage_count)
+                        speculative_start_counter.add(1, {"outcome": "discarded"})
+                    return
+
+                if knowledge_responses is None:
+                    budget_notice = self._check_budget()
+                    if budget_notice is not None:
+                        yield budget_notice
+                        return
+                    knowledge_responses = self._merge_iterators(self._get_knowledge_iterators())
+                else:
+                    speculative_start_counter.add(1, {"outcome": "used"})
 
-            iterators = [self._execute_reportability_agent(), self._execute_nureg_agent()]
-            message = ""
+            message = ChunkBuffer()
+            async for response in self._stream_knowledge_responses(knowledge_responses, message):
+                yield response
 
-            async for response in self._merge_iterators(iterators):
-                yield_to_user = response.message.metadata.get(StreamingMessageMetadata.YIELD_TO_USER.value, True)
-                add_to_chat_history = response.message.metadata.get(
-                    StreamingMessageMetadata.ADD_TO_CHAT_HISTORY.value, True
-                )
-                combine_before_adding_to_history = response.message.metadata.get(
-                    StreamingMessageMetadata.COMBINE_BEFORE_ADDING_TO_HISTORY.value, True
-                )
-                if add_to_chat_history:
-                    if combine_before_adding_to_history:
-                        message += response.message.content
-                    else:
-                        self._state.get_state().message_history.add_assistant_message(response.message.content)
-                if yield_to_user:
+            if self._combined_intent and self._state.get_state().intent == Intent.INVALID:
+                self._discard_knowledge_agent_work(plugin_result_count, token_usage_count)
+                async for response in self._confirm_invalid_intent():
+                    yield response
+                if self._state.get_state().intent == Intent.INVALID:
+                    return
+                # the intent agent overruled the invalid intent, search again without detecting it
+                self._reportability_agent = ReportabilityManualAgent(state=self._state)
+                message = ChunkBuffer()
+                async for response in self._stream_knowledge_responses(
+                        self._merge_iterators(self._get_knowledge_iterators()), message):
                     yield response
 
             if self._state.get_state().user_input_needed:
                 return
 
             if message:
-                self._state.get_state().message_history.add_assistant_message(message)
+                self._state.get_state().message_history.add_assistant_message(str(message))
 
+            budget_notice = self._check_budget()
+            if budget_notice is not None:
+                yield budget_notice
+                return
+
+            message = ChunkBuffer()
             async for response in self._recommendation_agent.invoke_stream():
+                message.append(response.message.content)
                 yield response
 
-            await self._extraction_agent.invoke()
+            # the answer belongs in the history, a kept state continues from it and the extraction reads it
+            if message:
+                self._state.get_state().message_history.add_assistant_message(str(message))
+
+            budget_notice = self._check_budget()
+            if budget_notice is not None:
+                yield budget_notice
+                return
+
+            await self._extract_recommendations(self._extraction_agent)
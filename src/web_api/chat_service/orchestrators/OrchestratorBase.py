@@ -1,8 +1,48 @@
+import logging
+import os
+
 from abc import ABC
+from contextlib import aclosing
+from opentelemetry import metrics
+from semantic_kernel.agents.agent import AgentResponseItem
+from semantic_kernel.contents import StreamingChatMessageContent
+from agents import IntentAgent, RecommendationExtractionAgent
+from constants import ChatServiceConstants, EnvironmentVariables
+from models import Intent, RequestBudget
+from services import ReportabilityServices
 from state import StateBase
-from typing import AsyncIterator, TypeVar, Generic
+from typing import AsyncIterator, Optional, TypeVar, Generic
+from util import get_agent_response_item
 
 T = TypeVar('T')
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+combined_intent_counter = meter.create_counter(
+    "orchestrator.combined_intent",
+    description="Intents set by the first agent in the combined orchestration mode, by intent.",
+)
+invalid_intent_confirmation_counter = meter.create_counter(
+    "orchestrator.combined_intent_confirmation",
+    description="Invalid intents of the combined orchestration mode checked by the intent agent, by outcome.",
+)
+budget_exceeded_counter = meter.create_counter(
+    "request_budget.exceeded",
+    description="Requests ended early with a partial answer because their budget was exhausted, by exhausted limit.",
+)
+request_budget_seconds_histogram = meter.create_histogram(
+    "request_budget.elapsed_seconds",
+    unit="s",
+    description="Wall time of requests ended early because their budget was exhausted.",
+)
+
+DEFAULT_REQUEST_BUDGET_MAX_SECONDS = 90
+DEFAULT_REQUEST_BUDGET_MAX_PROMPT_TOKENS = 200000
+DEFAULT_REQUEST_BUDGET_MAX_COMPLETION_TOKENS = 20000
+DEFAULT_REQUEST_BUDGET_MAX_TOOL_CALLS = 20
+BUDGET_EXHAUSTED_MESSAGE = (
+    "\n\n*This request reached its time or token budget, so the answer is based on the information gathered so far "
+    "and may be incomplete.*\n\n"
+)
 
 
 class OrchestratorBase(ABC, Generic[T]):
@@ -12,13 +52,35 @@ class OrchestratorBase(ABC, Generic[T]):
     with multiple agents in a streaming response manner.
     """
 
-    def __init__(self, state: StateBase[T]) -> None:
+    def __init__(self, state: StateBase[T], combined_intent: bool = None) -> None:
         """Initialize the orchestrator with configuration.
 
         Args:
             state (StateBase[T]): The state for orchestration.
+            combined_intent (bool, optional): Whether the first agent detects the intent in the same completion that
+                searches the documents, instead of a separate call to the intent agent. Defaults to the
+                ORCHESTRATOR_COMBINED_INTENT environment variable or false.
         """
         self._state = state
+        self._combined_intent: bool = combined_intent if combined_intent is not None else (
+            os.getenv(EnvironmentVariables.ORCHESTRATOR_COMBINED_INTENT.value, "false").lower() == "true"
+        )
+        self._budget = RequestBudget(
+            max_seconds=float(os.getenv(
+                EnvironmentVariables.REQUEST_BUDGET_MAX_SECONDS.value, DEFAULT_REQUEST_BUDGET_MAX_SECONDS
+            )),
+            max_prompt_tokens=int(os.getenv(
+                EnvironmentVariables.REQUEST_BUDGET_MAX_PROMPT_TOKENS.value, DEFAULT_REQUEST_BUDGET_MAX_PROMPT_TOKENS
+            )),
+            max_completion_tokens=int(os.getenv(
+                EnvironmentVariables.REQUEST_BUDGET_MAX_COMPLETION_TOKENS.value,
+                DEFAULT_REQUEST_BUDGET_MAX_COMPLETION_TOKENS
+            )),
+            max_tool_calls=int(os.getenv(
+                EnvironmentVariables.REQUEST_BUDGET_MAX_TOOL_CALLS.value, DEFAULT_REQUEST_BUDGET_MAX_TOOL_CALLS
+            )),
+        )
+        state.get_state().set_budget(self._budget)
 
     async def invoke_stream(self) -> AsyncIterator[str]:
         """Invoke the orchestration of communication with agents and stream responses.
@@ -27,3 +89,107 @@ class OrchestratorBase(ABC, Generic[T]):
             str: Streamed response items from the agents.
         """
         pass
+
+    def _check_budget(self) -> Optional[AgentResponseItem[StreamingChatMessageContent]]:
+        """Checks the budget of the request before the next agent is engaged.
+
+        Returns:
+            Optional[AgentResponseItem[StreamingChatMessageContent]]: A note telling the user the answer is partial if
+                the budget is exhausted and the orchestration has to end, otherwise None.
+        """
+        reason = self._budget.exceeded()
+        if reason is None:
+            return None
+        logger.warning(
+            f"Request budget exhausted ({reason}) after {self._budget.elapsed_seconds:.1f}s, "
+            f"{self._budget.prompt_tokens} prompt tokens, {self._budget.completion_tokens} completion tokens and "
+            f"{self._budget.tool_calls} tool calls, ending with a partial answer."
+        )
+        budget_exceeded_counter.add(1, {"reason": reason})
+        request_budget_seconds_histogram.record(self._budget.elapsed_seconds, {"reason": reason})
+        return get_agent_response_item(
+            BUDGET_EXHAUSTED_MESSAGE,
+            self._state.get_state().get_agent_thread(),
+            flush=True,
+            add_to_chat_history=False
+        )
+
+    async def _extract_recommendations(self, extraction_agent: RecommendationExtractionAgent) -> None:
+        """Runs recommendation extraction in the background so the response stream can finish without waiting.
+
+        The recommendations are only used by evaluation requests and by states kept between turns, so other requests
+        skip the extraction. The task is registered on the state, so the final context event of evaluation requests
+        and the save of a kept state wait for it. If the background pool is full, evaluation requests run the
+        extraction inline and other requests skip it.
+
+        Args:
+            extraction_agent (RecommendationExtractionAgent): The agent that extracts the recommendations.
+        """
+        state = self._state.get_state()
+        if not state.include_eval_content and not self._state.is_persistent:
+            return
+
+        task = ReportabilityServices.get_background_task_pool().submit(
+            "recommendation_extraction", extraction_agent.invoke
+        )
+        if task is not None:
+            state.add_pending_task(task)
+        elif state.include_eval_content:
+            await extraction_agent.invoke()
+        else:
+            logger.warning("Skipping recommendation extraction, the background task pool is full.")
+
+    async def _hold_until_intent(
+            self,
+            responses: AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]
+    ) -> AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]:
+        """Holds back the responses of an agent that detects the intent until the intent is set.
+
+        The held responses are released once the intent is set to reportability, or when the agent finishes without
+        setting it. If the intent is invalid they are dropped and the stream ends, so nothing searched for an invalid
+        request reaches the user.
+
+        Args:
+            responses (AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]): The responses of the agent.
+
+        Yields:
+            AgentResponseItem[StreamingChatMessageContent]: The responses once the intent allows them.
+        """
+        state = self._state.get_state()
+        held: list[AgentResponseItem[StreamingChatMessageContent]] | None = []
+        async with aclosing(responses) as responses:
+            async for response in responses:
+                if state.intent == Intent.INVALID:
+                    break
+                if held is None:
+                    yield response
+                    continue
+                held.append(response)
+                if state.intent:
+                    for held_response in held:
+                        yield held_response
+                    held = None
+        if state.intent == Intent.INVALID:
+            combined_intent_counter.add(1, {"intent": Intent.INVALID.value})
+            return
+        combined_intent_counter.add(1, {"intent": Intent.REPORTABILITY.value if state.intent else "unset"})
+        for held_response in held or []:
+            yield held_response
+
+    async def _confirm_invalid_intent(self) -> AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]:
+        """Asks the intent agent to confirm an invalid intent set in the combined orchestration mode.
+
+        The intent agent also explains to the user why the request is refused. The invalid intent stands unless the
+        intent agent sets it to reportability, in which case the caller has to search again.
+
+        Yields:
+            AgentResponseItem[StreamingChatMessageContent]: The responses of the intent agent.
+        """
+        state = self._state.get_state()
+        intent_agent = IntentAgent(state=self._state)
+        async for response in await intent_agent.invoke_stream():
+            intent_agent.track_token_usage(response)
+            if response.message.content:
+                yield response
+        outcome = "confirmed" if state.intent == Intent.INVALID else "overruled"
+        invalid_intent_confirmation_counter.add(1, {"outcome": outcome})
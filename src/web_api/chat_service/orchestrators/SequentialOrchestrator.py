@@ -12,7 +12,7 @@ from agents import (
     RecommendationExtractionAgent,
     ReportabilityManualAgent,
 )
-from models import Intent, ReportabilityContext
+from models import ChunkBuffer, Intent, ReportabilityContext
 from state import StateBase
 from util import StreamingMessageMetadata, get_agent_response_item
 
@@ -20,22 +20,30 @@ from util import StreamingMessageMetadata, get_agent_response_item
 class SequentialAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
     """Sequential orchestration for agents using a sequential flow."""
 
-    def __init__(self, state: StateBase[ReportabilityContext], agents: list[AgentBase] = None):
+    def __init__(
+            self,
+            state: StateBase[ReportabilityContext],
+            agents: list[AgentBase] = None,
+            combined_intent: bool = None
+    ):
         """
         Initialize the SequentialAgentOrchestrator with a given state.
 
         Args:
             state: The state object containing the chat request and other necessary information.
-            agents: Optional list of agents to be used in the orchestration. If not provided, defaults to None.
+            agents: Optional list of agents to be used in the orchestration. If not provided, defaults to None. In the
+                combined orchestration mode the intent is detected by the agents created with `detect_intent`.
+            combined_intent: Whether the first knowledge agent detects the intent instead of the intent agent.
+                Defaults to the ORCHESTRATOR_COMBINED_INTENT environment variable or false.
         """
-        super().__init__(state)
+        super().__init__(state, combined_intent=combined_intent)
         self._intent_agent: AgentBase = IntentAgent(state=state)
         self._extraction_agent: RecommendationExtractionAgent = RecommendationExtractionAgent(state=state)
         if agents is not None:
             self._agents = agents
         else:
             self._agents: list[AgentBase] = [
-                ReportabilityManualAgent(state=state),
+                ReportabilityManualAgent(state=state, detect_intent=self._combined_intent),
                 NuregAgent(state=state),
                 RecommendationAgent(state=state)
             ]
@@ -49,22 +57,29 @@ class SequentialAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
         tracer = trace.get_tracer(__name__)
 
         with tracer.start_as_current_span("SequentialAgentOrchestrator.invoke_stream"):
-            async for response in await self._intent_agent.invoke_stream():
-                self._intent_agent.track_token_usage(response)
-                if response.message.content:
-                    yield response
+            if not self._combined_intent:
+                async for response in await self._intent_agent.invoke_stream():
+                    self._intent_agent.track_token_usage(response)
+                    if response.message.content:
+                        yield response
 
-            if self._state.get_state().intent == Intent.INVALID:
-                return
-            for agent in self._agents:
-                message = ""
-                yield get_agent_response_item(
-                    f"## Engaging {agent.display_name}\n\n",
-                    self._state.get_state().get_agent_thread(),
-                    flush=True
-                )
-
-                async for response in agent.invoke_stream():
+                if self._state.get_state().intent == Intent.INVALID:
+                    return
+
+            agents = list(self._agents)
+            while agents:
+                budget_notice = self._check_budget()
+                if budget_notice is not None:
+                    yield budget_notice
+                    return
+                agent = agents.pop(0)
+                detects_intent = self._combined_intent and getattr(agent, "detects_intent", False)
+                message = ChunkBuffer()
+                responses = self._engage_agent(agent)
+                if detects_intent:
+                    responses = self._hold_until_intent(responses)
+
+                async for response in responses:
                     yield_to_user = response.message.metadata.get(StreamingMessageMetadata.YIELD_TO_USER.value, True)
                     add_to_chat_history = response.message.metadata.get(
                         StreamingMessageMetadata.ADD_TO_CHAT_HISTORY.value, True
@@ -74,16 +89,42 @@ class SequentialAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
                     )
                     if add_to_chat_history:
                         if combine_before_adding_to_history:
-                            message += response.message.content
+                            message.append(response.message.content)
                         else:
-                            self._state.get_state().message_history.add_assistant_message(response.message.content)
+                            self._state.get_state().add_document_to_history(
+                                response.message.content,
+                                response.message.metadata.get(StreamingMessageMetadata.DOCUMENT_REFERENCE.value)
+                            )
                     if yield_to_user:
                         yield response
 
+                if detects_intent and self._state.get_state().intent == Intent.INVALID:
+                    async for response in self._confirm_invalid_intent():
+                        yield response
+                    if self._state.get_state().intent == Intent.INVALID:
+                        return
+                    # the intent agent overruled the invalid intent, search again with an agent of the same kind
+                    agents.insert(0, type(agent)(state=self._state))
+                    continue
+
                 if self._state.get_state().user_input_needed:
                     return
 
                 if message:
-                    self._state.get_state().message_history.add_assistant_message(message)
+                    self._state.get_state().message_history.add_assistant_message(str(message))
+
+            budget_notice = self._check_budget()
+            if budget_notice is not None:
+                yield budget_notice
+                return
+
+            await self._extract_recommendations(self._extraction_agent)
 
-            await self._extraction_agent.invoke()
+    async def _engage_agent(self, agent: AgentBase) -> AsyncIterator[AgentResponseItem[StreamingChatMessageContent]]:
+        yield get_agent_response_item(
+            f"## Engaging {agent.display_name}\n\n",
+            self._state.get_state().get_agent_thread(),
+            flush=True
+        )
+        async for response in agent.invoke_stream():
+            yield response
@@ -3,21 +3,24 @@ from typing import AsyncIterator
 
 from .OrchestratorBase import OrchestratorBase
 from agents import NRCRecommendationAgent, RecommendationExtractionAgent
-from models import ReportabilityContext
+from models import ChunkBuffer, Intent, ReportabilityContext
 from state import StateBase
+from util.intent_classifier import INTENT_SOURCE_COMBINED
 
 
 class SingleAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
     """Sequential orchestration for agents using Semantic Kernel's SequentialOrchestrator."""
 
-    def __init__(self, state: StateBase[ReportabilityContext]):
+    def __init__(self, state: StateBase[ReportabilityContext], combined_intent: bool = None):
         """
         Initialize the SingleAgentOrchestrator with a given state.
 
         Args:
             state: The state object containing the chat request and other necessary information.
+            combined_intent: Whether the agent also sets the intent of the request, which the agent otherwise does not
+                record. Defaults to the ORCHESTRATOR_COMBINED_INTENT environment variable or false.
         """
-        super().__init__(state)
+        super().__init__(state, combined_intent=combined_intent)
 
     async def invoke_stream(self) -> AsyncIterator[str]:
         """Invoke the orchestration of communication with agents and stream responses.
@@ -28,21 +31,31 @@ class SingleAgentOrchestrator(OrchestratorBase[ReportabilityContext]):
         tracer = trace.get_tracer(__name__)
 
         with tracer.start_as_current_span("SingleAgentOrchestrator.invoke_stream"):
-            agent: NRCRecommendationAgent = NRCRecommendationAgent(state=self._state)
-            message = ""
+            agent: NRCRecommendationAgent = NRCRecommendationAgent(
+                state=self._state, detect_intent=self._combined_intent
+            )
+            message = ChunkBuffer()
             async for response in await agent.invoke_stream():
-                message += response.message.content
+                message.append(response.message.content)
                 agent.track_token_usage(response)
                 yield response
 
-            # If the eval content is included, we need to extract the recommendations
-            if self._state.get_state().include_eval_content:
-                self._state.get_state().message_history.add_assistant_message(message)
-                extraction_agent = RecommendationExtractionAgent(state=self._state)
-                await extraction_agent.invoke()
+            # the agent answers invalid requests itself, so there is nothing to confirm or extract
+            if self._combined_intent and self._state.get_state().intent:
+                self._state.get_state().intent_source = INTENT_SOURCE_COMBINED
+                if self._state.get_state().intent == Intent.INVALID:
+                    return
+
+            budget_notice = self._check_budget()
+            if budget_notice is not None:
+                yield budget_notice
+
+            # the answer belongs in the history, a kept state continues from it and the extraction reads it
+            if message:
+                self._state.get_state().message_history.add_assistant_message(str(message))
+            if self._state.get_state().include_eval_content or self._state.is_persistent:
+                await self._extract_recommendations(RecommendationExtractionAgent(state=self._state))
 
             # Since the single agent orchestrator only uses one agent, we know that all of the documents received from
             # the indexes were reviewed by the agent. So we need to mark them all as such.
-            state = self._state.get_state()
-            for result in state.plugin_results:
-                result.cited = True
+            self._state.get_state().mark_plugin_results_cited()
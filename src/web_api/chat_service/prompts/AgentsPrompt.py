@@ -13,6 +13,21 @@ class AgentsPrompt():
         only call the tool as previously instructed.
     """
 
+    KnowledgeAgentIntentPrompt = """
+        Before searching, use the set_intent tool to set the intent of the ReportabilityContext to 'reportability' if
+        the user is asking reportability related questions or describing an event at a nuclear facility, and to
+        'invalid' otherwise. If the intent is 'invalid', do not search and return an empty array: [].
+    """
+
+    NRCRecommendationAgentIntentPrompt = """
+        ---
+        ### INTENT
+        Before anything else, use the set_intent tool to set the intent of the ReportabilityContext to
+        'reportability' if the user is asking reportability related questions or describing an event at a nuclear
+        facility, and to 'invalid' otherwise. If the intent is 'invalid', do not search and inform the user that the
+        system is not designed for that purpose.
+    """
+
     KnowledgeAgentPrompt = """
         You are an agent responsible for finding the relevant documents to the user's query by reviewing the documents.
         You will be provided with tools to search the Knowledge Base.
@@ -260,3 +275,14 @@ class AgentsPrompt():
     - If the user's information is insufficient, ask clarifying questions to gather the necessary details.
     - Respond in the most humanly way and actionable format with clarity.
     """
+
+    HistorySummaryPrompt = """
+    Summarize the earlier part of a conversation about the reportability of events at nuclear power plants.
+    The summary replaces those messages in the conversation, so keep every fact later answers may depend on.
+
+    Follow these guidelines:
+    - Keep the details of the events the user described, the questions asked and the conclusions reached.
+    - Keep every regulation, section and document name exactly as written.
+    - Do not add information that is not in the conversation.
+    - Write plain prose, no longer than {max_words} words.
+    """
@@ -1,3 +1,21 @@
 from services.services import ReportabilityServices
+from services.search_client_pool import SearchClientPool
+from services.query_embeddings import QueryEmbeddings
+from services.background_task_pool import BackgroundTaskPool
+from services.completion_cache import CachingAzureChatCompletion
+from services.admission_control import AdmissionController, AdmissionRejectedError, AdmissionTicket
+from services.stream_replay import StreamReplayLog, StreamReplayStore, StreamResumeError
 
-__all__ = ["ReportabilityServices"]
+__all__ = [
+    "ReportabilityServices",
+    "SearchClientPool",
+    "QueryEmbeddings",
+    "BackgroundTaskPool",
+    "CachingAzureChatCompletion",
+    "StreamReplayLog",
+    "StreamReplayStore",
+    "StreamResumeError",
+    "AdmissionController",
+    "AdmissionRejectedError",
+    "AdmissionTicket",
+]
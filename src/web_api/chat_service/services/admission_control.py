@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+
+from opentelemetry import metrics
+from typing import Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+queue_depth_counter = meter.create_up_down_counter(
+    "admission.queue_depth",
+    description="Chat requests waiting for a free slot.",
+)
+active_counter = meter.create_up_down_counter(
+    "admission.active",
+    description="Chat requests holding a slot.",
+)
+wait_time_histogram = meter.create_histogram(
+    "admission.wait_time",
+    unit="s",
+    description="Time chat requests waited for a slot before they were admitted or rejected, by outcome.",
+)
+rejected_counter = meter.create_counter(
+    "admission.rejected",
+    description="Chat requests rejected because the wait queue was full or the wait timed out, by reason.",
+)
+
+DEFAULT_ADMISSION_MAX_CONCURRENT = 16
+DEFAULT_ADMISSION_MAX_CONCURRENT_PER_USER = 2
+DEFAULT_ADMISSION_MAX_QUEUED = 32
+DEFAULT_ADMISSION_QUEUE_TIMEOUT_SECONDS = 15
+DEFAULT_ADMISSION_RETRY_AFTER_SECONDS = 5
+REJECTED_QUEUE_FULL = "queue_full"
+REJECTED_TIMEOUT = "timeout"
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Raised when a chat request cannot be admitted.
+
+    Attributes:
+        reason (str): Why the request was rejected, `queue_full` or `timeout`.
+        retry_after_seconds (int): The number of seconds the client should wait before retrying.
+    """
+
+    def __init__(self, reason: str, retry_after_seconds: int) -> None:
+        """
+        Initializes the error.
+
+        Args:
+            reason (str): Why the request was rejected.
+            retry_after_seconds (int): The number of seconds the client should wait before retrying.
+        """
+        super().__init__(f"The chat service is busy ({reason}), retry after {retry_after_seconds} seconds.")
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class AdmissionTicket:
+    """A slot held by an admitted chat request. It must be released once the response has been produced."""
+
+    def __init__(
+            self,
+            controller: "AdmissionController",
+            user_id: Optional[str],
+            semaphores: list[asyncio.Semaphore]
+    ) -> None:
+        """
+        Initializes the ticket.
+
+        Args:
+            controller (AdmissionController): The controller that admitted the request.
+            user_id (Optional[str]): The user of the request.
+            semaphores (list[asyncio.Semaphore]): The semaphores acquired for the request.
+        """
+        self._controller = controller
+        self._user_id = user_id
+        self._semaphores = semaphores
+        self._released = False
+
+    def release(self) -> None:
+        """Frees the slot. Releasing a ticket more than once has no effect."""
+        if self._released:
+            return
+        self._released = True
+        for semaphore in self._semaphores:
+            semaphore.release()
+        self._controller._return_user_semaphore(self._user_id)
+        active_counter.add(-1)
+
+
+class AdmissionController:
+    """
+    Limits the chat requests that run at once, in total and per user.
+
+    A request that cannot start right away waits for a slot, for at most `queue_timeout_seconds`. At most
+    `max_queued` requests wait at a time. A request arriving at a full queue is rejected straight away, so a spike
+    is turned away with a retry hint instead of slowing every request down together.
+    """
+
+    def __init__(
+            self,
+            max_concurrent: int = None,
+            max_concurrent_per_user: int = None,
+            max_queued: int = None,
+            queue_timeout_seconds: float = None,
+            retry_after_seconds: int = None
+    ) -> None:
+        """
+        Initializes the controller.
+
+        Args:
+            max_concurrent (int, optional): The number of requests allowed to run at once. Zero or less removes the
+                limit. Defaults to the ADMISSION_MAX_CONCURRENT environment variable or 16.
+            max_concurrent_per_user (int, optional): The number of requests of one user allowed to run at once. Zero
+                or less removes the limit. Defaults to the ADMISSION_MAX_CONCURRENT_PER_USER environment variable
+                or 2.
+            max_queued (int, optional): The number of requests allowed to wait for a slot. Zero rejects every
+                request that cannot start right away. Defaults to the ADMISSION_MAX_QUEUED environment variable
+                or 32.
+            queue_timeout_seconds (float, optional): The number of seconds a request waits for a slot. Defaults to
+                the ADMISSION_QUEUE_TIMEOUT_SECONDS environment variable or 15.
+            retry_after_seconds (int, optional): The number of seconds rejected clients are asked to wait. Defaults
+                to the ADMISSION_RETRY_AFTER_SECONDS environment variable or 5.
+        """
+        max_concurrent = max_concurrent if max_concurrent is not None else int(
+            os.getenv(EnvironmentVariables.ADMISSION_MAX_CONCURRENT.value, DEFAULT_ADMISSION_MAX_CONCURRENT)
+        )
+        self._max_concurrent_per_user: int = max_concurrent_per_user if max_concurrent_per_user is not None else int(
+            os.getenv(
+                EnvironmentVariables.ADMISSION_MAX_CONCURRENT_PER_USER.value, DEFAULT_ADMISSION_MAX_CONCURRENT_PER_USER
+            )
+        )
+        self._max_queued: int = max_queued if max_queued is not None else int(
+            os.getenv(EnvironmentVariables.ADMISSION_MAX_QUEUED.value, DEFAULT_ADMISSION_MAX_QUEUED)
+        )
+        self._queue_timeout_seconds: float = queue_timeout_seconds if queue_timeout_seconds is not None else float(
+            os.getenv(
+                EnvironmentVariables.ADMISSION_QUEUE_TIMEOUT_SECONDS.value, DEFAULT_ADMISSION_QUEUE_TIMEOUT_SECONDS
+            )
+        )
+        self._retry_after_seconds: int = retry_after_seconds if retry_after_seconds is not None else int(
+            os.getenv(EnvironmentVariables.ADMISSION_RETRY_AFTER_SECONDS.value, DEFAULT_ADMISSION_RETRY_AFTER_SECONDS)
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        # semaphore and number of requests holding or waiting for it, by user, dropped once unused
+        self._user_semaphores: dict[str, tuple[asyncio.Semaphore, int]] = {}
+        self._queued = 0
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting for a slot."""
+        return self._queued
+
+    async def acquire(self, user_id: Optional[str] = None) -> AdmissionTicket:
+        """
+        Admits a chat request, waiting for a slot if none is free.
+
+        Args:
+            user_id (Optional[str], optional): The user of the request. Requests without a user are only limited by
+                the total number of requests.
+
+        Returns:
+            AdmissionTicket: The slot of the request.
+
+        Raises:
+            AdmissionRejectedError: If the wait queue is full or no slot became free in time.
+        """
+        semaphores = [self._semaphore] if self._semaphore is not None else []
+        user_semaphore = self._lease_user_semaphore(user_id)
+        if user_semaphore is not None:
+            # the user's own slot first, so a user over their limit does not hold a slot others could use
+            semaphores.insert(0, user_semaphore)
+
+        if not any(semaphore.locked() for semaphore in semaphores):
+            await _acquire_all(semaphores)
+            return self._admit(user_id, semaphores)
+
+        if self._queued >= self._max_queued:
+            self._reject(user_id, REJECTED_QUEUE_FULL, 0.0)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._queued += 1
+        queue_depth_counter.add(1)
+        try:
+            await asyncio.wait_for(_acquire_all(semaphores), timeout=self._queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._reject(user_id, REJECTED_TIMEOUT, loop.time() - started)
+        except BaseException:
+            self._return_user_semaphore(user_id)
+            raise
+        finally:
+            self._queued -= 1
+            queue_depth_counter.add(-1)
+        wait_time_histogram.record(loop.time() - started, {"outcome": "admitted"})
+        return self._admit(user_id, semaphores)
+
+    def _admit(self, user_id: Optional[str], semaphores: list[asyncio.Semaphore]) -> AdmissionTicket:
+        active_counter.add(1)
+        return AdmissionTicket(self, user_id, semaphores)
+
+    def _reject(self, user_id: Optional[str], reason: str, waited_seconds: float) -> None:
+        self._return_user_semaphore(user_id)
+        logger.warning(f"Rejecting chat request ({reason}), {self._queued} requests are waiting for a slot.")
+        rejected_counter.add(1, {"reason": reason})
+        wait_time_histogram.record(waited_seconds, {"outcome": reason})
+        raise AdmissionRejectedError(reason, self._retry_after_seconds)
+
+    def _lease_user_semaphore(self, user_id: Optional[str]) -> Optional[asyncio.Semaphore]:
+        if not user_id or self._max_concurrent_per_user <= 0:
+            return None
+        semaphore, users = self._user_semaphores.get(user_id, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_concurrent_per_user)
+        self._user_semaphores[user_id] = (semaphore, users + 1)
+        return semaphore
+
+    def _return_user_semaphore(self, user_id: Optional[str]) -> None:
+        if user_id not in self._user_semaphores:
+            return
+        semaphore, users = self._user_semaphores[user_id]
+        if users <= 1:
+            del self._user_semaphores[user_id]
+        else:
+            self._user_semaphores[user_id] = (semaphore, users - 1)
+
+
+async def _acquire_all(semaphores: list[asyncio.Semaphore]) -> None:
+    acquired = []
+    try:
+        for semaphore in semaphores:
+            await semaphore.acquire()
+            acquired.append(semaphore)
+    except BaseException:
+        # a wait that timed out or was cancelled gives back what it already held
+        for semaphore in acquired:
+            semaphore.release()
+        raise
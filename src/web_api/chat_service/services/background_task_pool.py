@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+
+from opentelemetry import metrics
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from constants import ChatServiceConstants, EnvironmentVariables
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+rejected_counter = meter.create_counter(
+    "background_task_pool.rejected",
+    description="Number of background tasks rejected because the pool was full.",
+)
+failed_counter = meter.create_counter(
+    "background_task_pool.failed",
+    description="Number of background tasks that raised an exception.",
+)
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_PENDING = 100
+
+
+class BackgroundTaskPool:
+    """
+    Bounded pool for work that should not hold up the response stream, such as post-processing a finished answer.
+
+    At most `concurrency` tasks run at a time and at most `max_pending` are accepted, running or waiting. Work
+    submitted to a full pool is rejected instead of queued, so a burst of requests cannot build an unbounded
+    backlog.
+    """
+
+    def __init__(self, concurrency: int = None, max_pending: int = None) -> None:
+        """
+        Initializes the pool.
+
+        Args:
+            concurrency (int, optional): The number of tasks allowed to run at once. Defaults to the
+                POST_PROCESSING_CONCURRENCY environment variable or 4.
+            max_pending (int, optional): The number of tasks allowed to be running or waiting. Defaults to the
+                POST_PROCESSING_MAX_PENDING environment variable or 100.
+        """
+        concurrency = concurrency if concurrency is not None else int(
+            os.getenv(EnvironmentVariables.POST_PROCESSING_CONCURRENCY.value, DEFAULT_CONCURRENCY)
+        )
+        self._max_pending: int = max_pending if max_pending is not None else int(
+            os.getenv(EnvironmentVariables.POST_PROCESSING_MAX_PENDING.value, DEFAULT_MAX_PENDING)
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """The number of tasks running or waiting to run."""
+        return len(self._tasks)
+
+    def submit(self, name: str, func: Callable[[], Awaitable[T]]) -> Optional[asyncio.Task[Optional[T]]]:
+        """
+        Schedules work on the pool.
+
+        Args:
+            name (str): A name for the work, used in logs and metrics.
+            func (Callable[[], Awaitable[T]]): Creates the awaitable to run. It is only called once a slot is free.
+
+        Returns:
+            Optional[asyncio.Task[Optional[T]]]: The task running the work, or None if the pool is full. The task
+                result is None if the work raised, the exception is logged rather than propagated.
+        """
+        if len(self._tasks) >= self._max_pending:
+            logger.warning(f"Background task pool is full, rejecting {name}.")
+            rejected_counter.add(1, {"task": name})
+            return None
+
+        task = asyncio.create_task(self._run(name, func), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, name: str, func: Callable[[], Awaitable[T]]) -> Optional[T]:
+        # failures are logged here because nothing may ever await the task
+        async with self._semaphore:
+            try:
+                return await func()
+            except Exception as e:
+                logger.exception(f"Background task {name} failed: {e}", exc_info=e)
+                failed_counter.add(1, {"task": name})
+                return None
+
+    async def close(self, timeout: float = None) -> None:
+        """
+        Waits for the submitted tasks to finish and cancels any still running after the timeout.
+
+        Args:
+            timeout (float, optional): The number of seconds to wait. Defaults to waiting indefinitely.
+        """
+        if not self._tasks:
+            return
+        _, still_running = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+
+from collections.abc import AsyncGenerator
+from pydantic import PrivateAttr
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.contents import (
+    ChatHistory, ChatMessageContent, StreamingChatMessageContent, StreamingTextContent, TextContent)
+from semantic_kernel.contents.utils.author_role import AuthorRole
+from typing import Any, Optional
+
+from caching import CacheBase
+from constants import ChatServiceConstants
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+INSTRUCTION_ROLES = (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)
+# Settings that are part of the request but hashed separately or not sent to the model
+EXCLUDED_SETTINGS = {
+    "messages", "tools", "ai_model_id", "service_id", "extension_data", "function_choice_behavior", "stream_options"
+}
+# The raw OpenAI response objects are not serializable and are not read by the agents, the content type and status are
+# not accepted by the streaming message constructor
+EXCLUDED_CONTENT = {
+    "content_type": True, "status": True, "inner_content": True, "items": {"__all__": {"inner_content"}}
+}
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _dump_message(message: ChatMessageContent) -> dict[str, Any]:
+    return message.model_dump(mode="json", exclude=EXCLUDED_CONTENT)
+
+
+def _load_message(data: dict[str, Any]) -> ChatMessageContent:
+    message = ChatMessageContent.model_validate(data)
+    _load_usage(message)
+    return message
+
+
+def _load_streaming_message(data: dict[str, Any], function_invoke_attempt: int) -> StreamingChatMessageContent:
+    message = StreamingChatMessageContent.model_validate(data)
+    # streamed text is serialized as plain text content, which is not merged when the chunks are added together
+    message.items = [
+        StreamingTextContent(
+            choice_index=message.choice_index,
+            text=item.text,
+            encoding=item.encoding,
+            ai_model_id=item.ai_model_id,
+            metadata=item.metadata,
+        ) if type(item) is TextContent else item
+        for item in message.items
+    ]
+    message.function_invoke_attempt = function_invoke_attempt
+    _load_usage(message)
+    return message
+
+
+def _load_usage(message: ChatMessageContent) -> None:
+    usage = message.metadata.get("usage")
+    if isinstance(usage, dict):
+        message.metadata["usage"] = CompletionUsage.model_validate(usage)
+
+
+class CachingAzureChatCompletion(AzureChatCompletion):
+    """
+    AzureChatCompletion that replays the responses of earlier identical requests.
+
+    Only requests sent at temperature 0 are cached, since only those are close to deterministic. A request is keyed on
+    the deployment, the instructions, the tool schemas, the remaining execution settings and the rest of the chat
+    history. Every round trip of the function calling loop is cached on its own, so tool calls in a replayed response
+    are still invoked. Replayed responses keep their usage metadata, so token usage is reported as if the request had
+    been sent.
+    """
+
+    _cache: CacheBase = PrivateAttr()
+
+    def __init__(self, cache: CacheBase, **kwargs: Any) -> None:
+        """
+        Initializes the chat completion service.
+
+        Args:
+            cache (CacheBase): The cache of responses keyed on request hash.
+            **kwargs: The arguments of AzureChatCompletion.
+        """
+        super().__init__(**kwargs)
+        self._cache = cache
+
+    async def _inner_get_chat_message_contents(
+            self,
+            chat_history: ChatHistory,
+            settings: PromptExecutionSettings
+    ) -> list[ChatMessageContent]:
+        key = self._get_cache_key(chat_history, settings)
+        if key is not None:
+            cached = await self._cache.aget(key)
+            if cached is not None:
+                return [_load_message(message) for message in cached]
+
+        messages = await super()._inner_get_chat_message_contents(chat_history, settings)
+        if key is not None:
+            try:
+                await self._cache.aset(key, [_dump_message(message) for message in messages])
+            except Exception as e:
+                logger.warning(f"Chat completion response could not be cached: {e}")
+        return messages
+
+    async def _inner_get_streaming_chat_message_contents(
+            self,
+            chat_history: ChatHistory,
+            settings: PromptExecutionSettings,
+            function_invoke_attempt: int = 0
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        key = self._get_cache_key(chat_history, settings)
+        if key is not None:
+            cached = await self._cache.aget(key)
+            if cached is not None:
+                for chunk in cached:
+                    yield [_load_streaming_message(message, function_invoke_attempt) for message in chunk]
+                return
+
+        recorded: Optional[list[list[dict[str, Any]]]] = [] if key is not None else None
+        async for messages in super()._inner_get_streaming_chat_message_contents(
+            chat_history, settings, function_invoke_attempt
+        ):
+            if recorded is not None:
+                try:
+                    recorded.append([_dump_message(message) for message in messages])
+                except Exception as e:
+                    logger.warning(f"Streamed chat completion response could not be cached: {e}")
+                    recorded = None
+            yield messages
+        # a stream abandoned by its consumer never gets here, so partial responses are not cached
+        if recorded is not None:
+            try:
+                await self._cache.aset(key, recorded)
+            except Exception as e:
+                # the whole answer has been streamed by now, so a failed write must not fail the response
+                logger.warning(f"Streamed chat completion response could not be cached: {e}")
+
+    def _get_cache_key(self, chat_history: ChatHistory, settings: PromptExecutionSettings) -> Optional[str]:
+        if getattr(settings, "temperature", None) != 0:
+            return None
+        try:
+            instructions = [
+                message.content for message in chat_history.messages if message.role in INSTRUCTION_ROLES
+            ]
+            messages = [
+                message.to_dict() for message in chat_history.messages if message.role not in INSTRUCTION_ROLES
+            ]
+            parts = (
+                getattr(settings, "ai_model_id", None) or self.ai_model_id,
+                _hash(instructions),
+                _hash(getattr(settings, "tools", None)),
+                _hash(settings.model_dump(mode="json", exclude=EXCLUDED_SETTINGS, exclude_none=True)),
+                _hash(messages),
+            )
+        except Exception as e:
+            logger.warning(f"Chat completion request could not be hashed, skipping the cache: {e}")
+            return None
+        return _hash(parts)
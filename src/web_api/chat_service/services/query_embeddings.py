@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+
+from semantic_kernel.connectors.ai.embedding_generator_base import EmbeddingGeneratorBase
+
+from caching import CacheBase
+
+
+class QueryEmbeddings:
+    """
+    Computes search query embeddings client side and caches them by text hash.
+
+    Concurrent requests for the same text share one in-flight embedding call, so fanning a query out to several
+    indexes embeds it only once.
+    """
+
+    def __init__(self, embedding_service: EmbeddingGeneratorBase, cache: CacheBase[list[float]]) -> None:
+        """
+        Initializes the query embeddings.
+
+        Args:
+            embedding_service (EmbeddingGeneratorBase): The service used to generate embeddings.
+            cache (CacheBase[list[float]]): The cache of embeddings keyed on text hash.
+        """
+        self._embedding_service = embedding_service
+        self._cache = cache
+        self._pending: dict[str, asyncio.Task[list[float]]] = {}
+
+    async def get_embedding(self, text: str) -> list[float]:
+        """
+        Returns the embedding for a query, computing it only if it is not cached or already being computed.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            list[float]: The embedding vector.
+        """
+        key = hashlib.sha256(text.encode()).hexdigest()
+        vector = await self._cache.aget(key)
+        if vector is not None:
+            return vector
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(key, text))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _generate(self, key: str, text: str) -> list[float]:
+        embeddings = await self._embedding_service.generate_embeddings([text])
+        vector = [float(value) for value in embeddings[0]]
+        await self._cache.aset(key, vector)
+        return vector
@@ -0,0 +1,175 @@
+import aiohttp
+import logging
+import os
+import weakref
+
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.search.documents.aio import SearchClient
+from contextlib import asynccontextmanager
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_KEEPALIVE_TIMEOUT_SECONDS = 30.0
+
+
+class SearchClientPool:
+    """
+    Process-wide registry of Azure AI Search clients keyed on index name.
+
+    All clients share a single aiohttp session, so TCP and TLS connections to the search service are kept alive
+    and reused across plugin calls instead of being negotiated for every search.
+    """
+
+    def __init__(self, connection_limit: int = None, keepalive_timeout: float = None) -> None:
+        """
+        Initializes the pool. The underlying session is created lazily on first use or by `open`.
+
+        Args:
+            connection_limit (int, optional): Maximum number of simultaneous connections to the search service.
+                Defaults to the AZURE_SEARCH_CONNECTION_LIMIT environment variable or 100.
+            keepalive_timeout (float, optional): Seconds an idle connection is kept open for reuse.
+                Defaults to the AZURE_SEARCH_KEEPALIVE_TIMEOUT_SECONDS environment variable or 30.
+        """
+        self._connection_limit: int = connection_limit if connection_limit is not None else int(
+            os.getenv(EnvironmentVariables.AZURE_SEARCH_CONNECTION_LIMIT.value, DEFAULT_CONNECTION_LIMIT)
+        )
+        self._keepalive_timeout: float = keepalive_timeout if keepalive_timeout is not None else float(
+            os.getenv(
+                EnvironmentVariables.AZURE_SEARCH_KEEPALIVE_TIMEOUT_SECONDS.value, DEFAULT_KEEPALIVE_TIMEOUT_SECONDS
+            )
+        )
+        self._clients: dict[str, SearchClient] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._leased: int = 0
+
+        # the gauges report on the latest pool, a pool replaced after a restart is left to be garbage collected
+        global _current_pool
+        _current_pool = weakref.ref(self)
+
+    @property
+    def connection_limit(self) -> int:
+        """The maximum number of simultaneous connections to the search service."""
+        return self._connection_limit
+
+    @property
+    def leased(self) -> int:
+        """The number of searches currently holding a pooled client."""
+        return self._leased
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._connection_limit,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def get_client(self, index_name: str) -> SearchClient:
+        """
+        Returns the pooled SearchClient for an index, creating it on first use.
+
+        The returned client is owned by the pool and must not be closed by the caller.
+
+        Args:
+            index_name (str): The name of the Azure AI Search index.
+
+        Environment Variables:
+            AZURE_SEARCH_SERVICE_ENDPOINT: The endpoint URL for the Azure AI Search service.
+            AZURE_SEARCH_API_KEY: The API key for authenticating with the Azure AI Search service.
+
+        Returns:
+            SearchClient: The shared client for the index.
+        """
+        client = self._clients.get(index_name)
+        if client is None:
+            service_endpoint = os.environ[EnvironmentVariables.AZURE_SEARCH_SERVICE_ENDPOINT.value]
+            key = os.environ[EnvironmentVariables.AZURE_SEARCH_API_KEY.value]
+            client = SearchClient(
+                endpoint=service_endpoint,
+                index_name=index_name,
+                credential=AzureKeyCredential(key),
+                transport=AioHttpTransport(session=self._get_session(), session_owner=False),
+            )
+            self._clients[index_name] = client
+            logger.debug(f"Created pooled search client for index: {index_name}")
+        return client
+
+    @asynccontextmanager
+    async def lease(self, index_name: str) -> AsyncIterator[SearchClient]:
+        """
+        Provides the pooled SearchClient for an index for the duration of a search, tracking pool occupancy.
+
+        Args:
+            index_name (str): The name of the Azure AI Search index.
+
+        Yields:
+            SearchClient: The shared client for the index.
+        """
+        client = self.get_client(index_name)
+        self._leased += 1
+        try:
+            yield client
+        finally:
+            self._leased -= 1
+
+    async def open(self, index_names: Iterable[str] = ()) -> None:
+        """
+        Opens the shared session and creates clients for the given indexes ahead of the first request.
+
+        Args:
+            index_names (Iterable[str], optional): The index names to create clients for.
+        """
+        self._get_session()
+        for index_name in index_names:
+            self.get_client(index_name)
+        logger.info(f"Search client pool opened with connection limit {self._connection_limit}.")
+
+    async def close(self) -> None:
+        """Closes every pooled client and the shared session."""
+        for index_name, client in list(self._clients.items()):
+            try:
+                await client.close()
+            except Exception as e:
+                logger.exception(f"Error closing search client for index {index_name}: {e}", exc_info=e)
+        self._clients.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        logger.info("Search client pool closed.")
+
+
+_current_pool: Optional[weakref.ReferenceType[SearchClientPool]] = None
+
+
+def _observe(value: Callable[[SearchClientPool], int]) -> Callable[[CallbackOptions], Iterable[Observation]]:
+    def callback(options: CallbackOptions) -> Iterable[Observation]:
+        pool = _current_pool() if _current_pool is not None else None
+        if pool is not None:
+            yield Observation(value(pool))
+    return callback
+
+
+meter.create_observable_gauge(
+    "search_client_pool.clients",
+    callbacks=[_observe(lambda pool: len(pool._clients))],
+    description="Number of pooled Azure AI Search clients.",
+)
+meter.create_observable_gauge(
+    "search_client_pool.leased",
+    callbacks=[_observe(lambda pool: pool.leased)],
+    description="Number of searches currently holding a pooled client.",
+)
+meter.create_observable_gauge(
+    "search_client_pool.connection_limit",
+    callbacks=[_observe(lambda pool: pool.connection_limit)],
+    description="Maximum number of connections the pool will open to the search service.",
+)
@@ -1,13 +1,42 @@
+import httpx
+import logging
 import os
 
 from azure.search.documents.aio import SearchClient
-from azure.core.credentials import AzureKeyCredential
 from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from contextlib import AbstractAsyncContextManager
 from datetime import datetime, timedelta
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
 from semantic_kernel.connectors.ai.open_ai import (
-    AzureChatCompletion, AzureTextEmbedding)
+    AzureChatCompletion, AzureChatPromptExecutionSettings, AzureTextEmbedding)
+from semantic_kernel.contents import ChatHistory
 
+from caching import CacheBase, MemoryCache, create_cache
 from constants import ChatServiceConstants, EnvironmentVariables
+from services.admission_control import AdmissionController
+from services.background_task_pool import BackgroundTaskPool
+from services.completion_cache import CachingAzureChatCompletion
+from services.query_embeddings import QueryEmbeddings
+from services.search_client_pool import SearchClientPool
+from services.stream_replay import StreamReplayStore
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+DEFAULT_OPENAI_CONNECTION_LIMIT = 100
+DEFAULT_CACHE_MAX_ENTRIES = 1024
+DEFAULT_CACHE_TTL_SECONDS = 300
+DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES = 4096
+DEFAULT_EMBEDDING_CACHE_TTL_SECONDS = 86400
+DEFAULT_SAS_TOKEN_CACHE_MAX_ENTRIES = 4096
+DEFAULT_STATE_STORE_MAX_ENTRIES = 1024
+DEFAULT_STATE_STORE_TTL_SECONDS = 86400
+DEFAULT_HISTORY_SUMMARY_CACHE_MAX_ENTRIES = 1024
+DEFAULT_HISTORY_SUMMARY_CACHE_TTL_SECONDS = 3600
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 1024
+DEFAULT_LLM_CACHE_TTL_SECONDS = 86400
+# Cached SAS tokens are re-signed once this share of their lifetime has passed, so a returned URL stays usable
+SAS_TOKEN_REFRESH_RATIO = 0.9
+BACKGROUND_TASK_SHUTDOWN_TIMEOUT_SECONDS = 30
 
 
 class ReportabilityServices:
@@ -16,63 +45,331 @@ class ReportabilityServices:
     for chat completion and text embedding functionalities. The services are configured using
     environment variables for credentials and deployment details.
     """
-    @staticmethod
-    def get_ai_search_client(index_name: str) -> SearchClient:
+    _search_client_pool: SearchClientPool = None
+    _chat_completion_service: AzureChatCompletion = None
+    _openai_http_client: httpx.AsyncClient = None
+    _openai_client: AsyncAzureOpenAI = None
+    _text_embedding_service: AzureTextEmbedding = None
+    _query_embeddings: QueryEmbeddings = None
+    _search_result_cache: CacheBase = None
+    _search_result_cache_loaded: bool = False
+    _session_state_store: CacheBase = None
+    _session_state_store_loaded: bool = False
+    _sas_token_cache: MemoryCache = None
+    _history_summary_cache: MemoryCache = None
+    _completion_cache: CacheBase = None
+    _completion_cache_loaded: bool = False
+    _background_task_pool: BackgroundTaskPool = None
+    _stream_replay_store: StreamReplayStore = None
+    _admission_controller: AdmissionController = None
+    _sas_token_lifetime: timedelta = None
+
+    @classmethod
+    def get_search_client_pool(cls) -> SearchClientPool:
+        """
+        Returns the process-wide SearchClientPool, creating it on first use.
+
+        Returns:
+            SearchClientPool: The shared pool of Azure AI Search clients.
+        """
+        if cls._search_client_pool is None:
+            cls._search_client_pool = SearchClientPool()
+        return cls._search_client_pool
+
+    @classmethod
+    def get_ai_search_client(cls, index_name: str) -> SearchClient:
+        """
+        Returns the pooled SearchClient for querying Azure Cognitive Search.
+
+        The client is shared across requests and owned by the pool, callers must not close it.
+
+        Args:
+            index_name (str): The name of the Azure Cognitive Search index to connect to.
+
+        Returns:
+            SearchClient: The pooled SearchClient for the specified index name.
         """
-        Initializes and returns an instance of SearchClient for querying Azure Cognitive Search.
+        return cls.get_search_client_pool().get_client(index_name)
+
+    @classmethod
+    def lease_ai_search_client(cls, index_name: str) -> AbstractAsyncContextManager[SearchClient]:
+        """
+        Leases the pooled SearchClient for the duration of a search so pool occupancy can be tracked.
 
         Args:
             index_name (str): The name of the Azure Cognitive Search index to connect to.
 
+        Returns:
+            AbstractAsyncContextManager[SearchClient]: A context manager yielding the pooled SearchClient.
+        """
+        return cls.get_search_client_pool().lease(index_name)
+
+    @classmethod
+    def get_background_task_pool(cls) -> BackgroundTaskPool:
+        """
+        Returns the process-wide pool for post-processing work that runs after a response has been streamed.
+
+        Returns:
+            BackgroundTaskPool: The shared background task pool.
+        """
+        if cls._background_task_pool is None:
+            cls._background_task_pool = BackgroundTaskPool()
+        return cls._background_task_pool
+
+    @classmethod
+    def get_admission_controller(cls) -> AdmissionController:
+        """
+        Returns the process-wide controller that limits how many chat requests run at once.
+
+        Returns:
+            AdmissionController: The shared admission controller.
+        """
+        if cls._admission_controller is None:
+            cls._admission_controller = AdmissionController()
+        return cls._admission_controller
+
+    @classmethod
+    def get_stream_replay_store(cls) -> StreamReplayStore:
+        """
+        Returns the process-wide store of recent streamed responses, used to resume server-sent event streams.
+
+        Returns:
+            StreamReplayStore: The shared stream replay store.
+        """
+        if cls._stream_replay_store is None:
+            cls._stream_replay_store = StreamReplayStore()
+        return cls._stream_replay_store
+
+    @classmethod
+    async def startup(cls) -> None:
+        """
+        Opens the shared service connections when the application starts.
+
+        Search clients are created up front for every index name configured in the environment, and the chat
+        completion service is warmed up when AZURE_OPENAI_WARMUP is true.
+        """
+        index_names = [
+            os.getenv(setting.value) for setting in (
+                EnvironmentVariables.AZURE_SEARCH_NUREG_INDEX_NAME,
+                EnvironmentVariables.AZURE_SEARCH_REPORTABILITY_MANUAL_INDEX_NAME,
+                EnvironmentVariables.AZURE_SEARCH_TECHSPEC_INDEX_NAME,
+                EnvironmentVariables.AZURE_SEARCH_UFSAR_INDEX_NAME,
+            )
+        ]
+        await cls.get_search_client_pool().open(index_name for index_name in index_names if index_name)
+
+        if os.getenv(EnvironmentVariables.AZURE_OPENAI_WARMUP.value, "false").lower() == "true":
+            await cls.warm_up_chat_completion_service()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Closes the shared service connections when the application stops."""
+        if cls._stream_replay_store is not None:
+            await cls._stream_replay_store.close()
+            cls._stream_replay_store = None
+        cls._admission_controller = None
+        if cls._background_task_pool is not None:
+            await cls._background_task_pool.close(timeout=BACKGROUND_TASK_SHUTDOWN_TIMEOUT_SECONDS)
+            cls._background_task_pool = None
+        if cls._search_client_pool is not None:
+            await cls._search_client_pool.close()
+            cls._search_client_pool = None
+        if cls._openai_http_client is not None:
+            await cls._openai_http_client.aclose()
+            cls._openai_http_client = None
+            cls._openai_client = None
+            cls._chat_completion_service = None
+            cls._text_embedding_service = None
+            cls._query_embeddings = None
+
+    @classmethod
+    def get_search_result_cache(cls) -> CacheBase | None:
+        """
+        Returns the process-wide cache for search plugin results, creating it on first use.
+
+        Environment Variables:
+            SEARCH_CACHE_BACKEND: Optional; "memory", "disk" or "none". Defaults to "none" (caching disabled).
+            SEARCH_CACHE_MAX_ENTRIES: Optional; the maximum number of cached queries. Defaults to 1024.
+            SEARCH_CACHE_TTL_SECONDS: Optional; the number of seconds a cached result stays valid. Defaults to 300.
+            SEARCH_CACHE_PATH: The SQLite file used by the disk backend.
+
+        Returns:
+            CacheBase | None: The search result cache, or None when caching is disabled.
+        """
+        if not cls._search_result_cache_loaded:
+            cls._search_result_cache = create_cache(
+                name="search_results",
+                backend=os.getenv(EnvironmentVariables.SEARCH_CACHE_BACKEND.value, "none"),
+                max_entries=int(
+                    os.getenv(EnvironmentVariables.SEARCH_CACHE_MAX_ENTRIES.value, DEFAULT_CACHE_MAX_ENTRIES)
+                ),
+                ttl_seconds=float(
+                    os.getenv(EnvironmentVariables.SEARCH_CACHE_TTL_SECONDS.value, DEFAULT_CACHE_TTL_SECONDS)
+                ),
+                path=os.getenv(EnvironmentVariables.SEARCH_CACHE_PATH.value),
+            )
+            cls._search_result_cache_loaded = True
+        return cls._search_result_cache
+
+    @classmethod
+    def get_session_state_store(cls) -> CacheBase | None:
+        """
+        Returns the process-wide store of conversation state between turns, creating it on first use.
+
         Environment Variables:
-            AZURE_SEARCH_SERVICE_ENDPOINT: The endpoint URL for the Azure Cognitive Search service.
-            AZURE_SEARCH_API_KEY: The API key for authenticating with the Azure Cognitive Search service.
+            STATE_STORE_BACKEND: Optional; "memory", "disk" or "none". Defaults to "none" (state is not kept).
+            STATE_STORE_MAX_ENTRIES: Optional; the maximum number of stored sessions. Defaults to 1024.
+            STATE_STORE_TTL_SECONDS: Optional; the number of seconds an idle session is kept. Defaults to 86400.
+            STATE_STORE_PATH: The SQLite file used by the disk backend.
 
         Returns:
-            SearchClient: An instance of SearchClient configured with the specified index name and credentials.
+            CacheBase | None: The session state store, or None when state is not kept between turns.
+        """
+        if not cls._session_state_store_loaded:
+            cls._session_state_store = create_cache(
+                name="session_state",
+                backend=os.getenv(EnvironmentVariables.STATE_STORE_BACKEND.value, "none"),
+                max_entries=int(
+                    os.getenv(EnvironmentVariables.STATE_STORE_MAX_ENTRIES.value, DEFAULT_STATE_STORE_MAX_ENTRIES)
+                ),
+                ttl_seconds=float(
+                    os.getenv(EnvironmentVariables.STATE_STORE_TTL_SECONDS.value, DEFAULT_STATE_STORE_TTL_SECONDS)
+                ),
+                path=os.getenv(EnvironmentVariables.STATE_STORE_PATH.value),
+            )
+            cls._session_state_store_loaded = True
+        return cls._session_state_store
+
+    @classmethod
+    def get_history_summary_cache(cls) -> MemoryCache:
         """
-        service_endpoint = os.environ[EnvironmentVariables.AZURE_SEARCH_SERVICE_ENDPOINT.value]
-        key = os.environ[EnvironmentVariables.AZURE_SEARCH_API_KEY.value]
+        Returns the process-wide cache of chat history summaries, keyed on the summarized messages, so the agents of
+        a request and the following turns do not summarize the same messages again.
 
-        credential = AzureKeyCredential(key)
-        # Create a SearchClient for querying
-        return SearchClient(
-            endpoint=service_endpoint,
-            index_name=index_name,
-            credential=credential)
+        Returns:
+            MemoryCache: The shared history summary cache.
+        """
+        if cls._history_summary_cache is None:
+            cls._history_summary_cache = MemoryCache(
+                "history_summaries",
+                max_entries=DEFAULT_HISTORY_SUMMARY_CACHE_MAX_ENTRIES,
+                ttl_seconds=DEFAULT_HISTORY_SUMMARY_CACHE_TTL_SECONDS,
+            )
+        return cls._history_summary_cache
 
-    @staticmethod
-    def get_chat_completion_service() -> AzureChatCompletion:
+    @classmethod
+    def get_chat_completion_service(cls) -> AzureChatCompletion:
         """
-        Initializes and returns an instance of AzureChatCompletion using configuration values
-        from environment variables.
+        Returns the process-wide AzureChatCompletion, creating it on first use.
+
+        Every agent shares this service and its underlying OpenAI client, so requests reuse pooled (and, when
+        enabled, HTTP/2 multiplexed) connections instead of paying client construction and connection setup.
 
         Environment Variables:
             AZURE_OPENAI_API_KEY: The API key for authenticating with Azure OpenAI.
             AZURE_OPENAI_ENDPOINT: The endpoint URL for the Azure OpenAI service.
             AZURE_OPENAI_DEPLOYMENT: The deployment name for the Azure OpenAI model.
             AZURE_OPENAI_API_VERSION: The API version to use for the Azure OpenAI service.
+            AZURE_OPENAI_CONNECTION_LIMIT: Optional; the connection pool size. Defaults to 100.
+            AZURE_OPENAI_HTTP2: Optional; whether to negotiate HTTP/2. Defaults to true.
+
+        When LLM_CACHE_BACKEND enables the completion cache, temperature 0 requests identical to an earlier one are
+        answered from the cache, see `get_completion_cache`.
 
         Returns:
             AzureChatCompletion: A chat completion instance configured with the specified environment variables.
         """
+        if cls._chat_completion_service is None:
+            settings = {
+                "service_id": ChatServiceConstants.CHAT_SERVICE_ID.value,
+                "deployment_name": os.getenv(EnvironmentVariables.AZURE_OPENAI_DEPLOYMENT.value),
+                "async_client": cls._get_openai_client(),
+            }
+            cache = cls.get_completion_cache()
+            if cache is not None:
+                cls._chat_completion_service = CachingAzureChatCompletion(cache=cache, **settings)
+            else:
+                cls._chat_completion_service = AzureChatCompletion(**settings)
+        return cls._chat_completion_service
+
+    @classmethod
+    def get_completion_cache(cls) -> CacheBase | None:
+        """
+        Returns the process-wide cache of chat completion responses, creating it on first use.
+
+        Environment Variables:
+            LLM_CACHE_BACKEND: Optional; "memory", "disk" or "none". Defaults to "none" (caching disabled).
+            LLM_CACHE_MAX_ENTRIES: Optional; the maximum number of cached responses. Defaults to 1024.
+            LLM_CACHE_TTL_SECONDS: Optional; the number of seconds a cached response stays valid. Defaults to 86400.
+            LLM_CACHE_PATH: The SQLite file used by the disk backend.
+
+        Returns:
+            CacheBase | None: The completion cache, or None when caching is disabled.
+        """
+        if not cls._completion_cache_loaded:
+            cls._completion_cache = create_cache(
+                name="llm_completions",
+                backend=os.getenv(EnvironmentVariables.LLM_CACHE_BACKEND.value, "none"),
+                max_entries=int(
+                    os.getenv(EnvironmentVariables.LLM_CACHE_MAX_ENTRIES.value, DEFAULT_LLM_CACHE_MAX_ENTRIES)
+                ),
+                ttl_seconds=float(
+                    os.getenv(EnvironmentVariables.LLM_CACHE_TTL_SECONDS.value, DEFAULT_LLM_CACHE_TTL_SECONDS)
+                ),
+                path=os.getenv(EnvironmentVariables.LLM_CACHE_PATH.value),
+            )
+            cls._completion_cache_loaded = True
+        return cls._completion_cache
+
+    @classmethod
+    def _get_openai_client(cls) -> AsyncAzureOpenAI:
+        if cls._openai_client is not None:
+            return cls._openai_client
+
         api_key = os.getenv(EnvironmentVariables.AZURE_OPENAI_API_KEY.value)
         endpoint = os.getenv(EnvironmentVariables.AZURE_OPENAI_ENDPOINT.value)
-        deployment_name = os.getenv(EnvironmentVariables.AZURE_OPENAI_DEPLOYMENT.value)
         api_version = os.getenv(EnvironmentVariables.AZURE_OPENAI_API_VERSION.value)
+        connection_limit = int(
+            os.getenv(EnvironmentVariables.AZURE_OPENAI_CONNECTION_LIMIT.value, DEFAULT_OPENAI_CONNECTION_LIMIT)
+        )
+        http2 = os.getenv(EnvironmentVariables.AZURE_OPENAI_HTTP2.value, "true").lower() == "true"
 
-        return AzureChatCompletion(
-            service_id=ChatServiceConstants.CHAT_SERVICE_ID.value,
+        cls._openai_http_client = DefaultAsyncHttpxClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=connection_limit, max_keepalive_connections=connection_limit),
+        )
+        cls._openai_client = AsyncAzureOpenAI(
             api_key=api_key,
-            endpoint=endpoint,
-            deployment_name=deployment_name,
+            azure_endpoint=endpoint,
             api_version=api_version,
+            http_client=cls._openai_http_client,
         )
+        return cls._openai_client
 
-    @staticmethod
-    def get_text_embedding_service() -> AzureTextEmbedding:
+    @classmethod
+    async def warm_up_chat_completion_service(cls) -> None:
         """
-        Initializes and returns an instance of AzureTextEmbedding using environment variables.
+        Sends a minimal completion through the shared chat completion service so the first user request does not
+        pay for TLS negotiation and connection setup. Failures are logged and otherwise ignored.
+        """
+        try:
+            chat_history = ChatHistory()
+            chat_history.add_user_message("ping")
+            await cls.get_chat_completion_service().get_chat_message_content(
+                chat_history=chat_history,
+                settings=AzureChatPromptExecutionSettings(
+                    max_tokens=1, temperature=ChatServiceConstants.DEFAULT_TEMPERATURE.value
+                ),
+            )
+            logger.info("Chat completion service warmed up.")
+        except Exception as e:
+            logger.warning(f"Chat completion service warm-up failed: {e}")
+
+    @classmethod
+    def get_text_embedding_service(cls) -> AzureTextEmbedding:
+        """
+        Returns the process-wide AzureTextEmbedding, creating it on first use. It shares the OpenAI client, and
+        therefore the connection pool, of the chat completion service.
 
         Environment Variables:
             AZURE_OPENAI_API_KEY: The API key for authenticating with Azure OpenAI.
@@ -83,48 +380,91 @@ class ReportabilityServices:
         Returns:
             AzureTextEmbedding: An text embedding service instance configured with the specified environment variables.
         """
-        api_key = os.getenv(EnvironmentVariables.AZURE_OPENAI_API_KEY.value)
-        endpoint = os.getenv(EnvironmentVariables.AZURE_OPENAI_ENDPOINT.value)
-        deployment_name = os.getenv(EnvironmentVariables.AZURE_EMBEDDING_DEPLOYMENT.value)
-        api_version = os.getenv(EnvironmentVariables.AZURE_OPENAI_API_VERSION.value)
+        if cls._text_embedding_service is None:
+            cls._text_embedding_service = AzureTextEmbedding(
+                service_id=ChatServiceConstants.EMBEDDING_SERVICE_ID.value,
+                deployment_name=os.getenv(EnvironmentVariables.AZURE_EMBEDDING_DEPLOYMENT.value),
+                async_client=cls._get_openai_client(),
+            )
+        return cls._text_embedding_service
 
-        return AzureTextEmbedding(
-            service_id=ChatServiceConstants.EMBEDDING_SERVICE_ID.value,
-            api_key=api_key,
-            endpoint=endpoint,
-            deployment_name=deployment_name,
-            api_version=api_version,
-        )
+    @classmethod
+    def get_query_embeddings(cls) -> QueryEmbeddings | None:
+        """
+        Returns the process-wide QueryEmbeddings used to vectorize search queries client side, creating it on first
+        use. The embedding deployment must match the vectorizer configured on the search indexes.
 
-    @staticmethod
-    def get_sas_token(account_name: str, container_name: str, blob_name: str) -> str:
+        Environment Variables:
+            SEARCH_CLIENT_SIDE_VECTORIZATION: Optional; whether search queries are embedded by the chat service
+                instead of the search service. Defaults to false.
+            EMBEDDING_CACHE_MAX_ENTRIES: Optional; the maximum number of cached query embeddings. Defaults to 4096.
+            EMBEDDING_CACHE_TTL_SECONDS: Optional; the number of seconds a cached embedding stays valid.
+                Defaults to 86400.
+
+        Returns:
+            QueryEmbeddings | None: The query embeddings, or None when client side vectorization is disabled.
+        """
+        if os.getenv(EnvironmentVariables.SEARCH_CLIENT_SIDE_VECTORIZATION.value, "false").lower() != "true":
+            return None
+        if cls._query_embeddings is None:
+            cls._query_embeddings = QueryEmbeddings(
+                embedding_service=cls.get_text_embedding_service(),
+                cache=MemoryCache(
+                    "query_embeddings",
+                    max_entries=int(os.getenv(
+                        EnvironmentVariables.EMBEDDING_CACHE_MAX_ENTRIES.value, DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES
+                    )),
+                    ttl_seconds=float(os.getenv(
+                        EnvironmentVariables.EMBEDDING_CACHE_TTL_SECONDS.value, DEFAULT_EMBEDDING_CACHE_TTL_SECONDS
+                    )),
+                ),
+            )
+        return cls._query_embeddings
+
+    @classmethod
+    def get_sas_token(cls, account_name: str, container_name: str, blob_name: str) -> str:
         """
         Retrieves the SAS token for the blob item.
 
+        Tokens are cached per blob and re-signed once most of their lifetime has passed, so building document URLs
+        for the same blob repeatedly does not sign a new token each time.
+
         Args:
             account_name (str): The name of the Azure storage account.
             container_name (str): The name of the container in the Azure storage account.
             blob_name (str): The name of the blob for which the SAS token is generated.
 
+        Environment Variables:
+            SAS_TOKEN_EXPIRATIONS_DAYS: The number of days a SAS token is valid for.
+            SAS_TOKEN_CACHE_MAX_ENTRIES: Optional; the maximum number of cached SAS tokens. Defaults to 4096.
+
         Returns:
             str: A SAS token that grants read access to the specified blob for a limited time.
         """
+        if cls._sas_token_cache is None:
+            cls._sas_token_lifetime = timedelta(
+                days=float(os.getenv(EnvironmentVariables.SAS_TOKEN_EXPIRATIONS_DAYS.value))
+            )
+            cls._sas_token_cache = MemoryCache(
+                "sas_tokens",
+                max_entries=int(os.getenv(
+                    EnvironmentVariables.SAS_TOKEN_CACHE_MAX_ENTRIES.value, DEFAULT_SAS_TOKEN_CACHE_MAX_ENTRIES
+                )),
+                ttl_seconds=cls._sas_token_lifetime.total_seconds() * SAS_TOKEN_REFRESH_RATIO,
+            )
 
-        # Define the SAS token parameters
-        sas_token = generate_blob_sas(
-            account_name=account_name,
-            container_name=container_name,
-            blob_name=blob_name,
-            account_key=os.getenv(EnvironmentVariables.AZURE_BLOB_KEY.value),
-            permission=BlobSasPermissions(read=True),
-            expiry=(
-                datetime.now() +
-                timedelta(
-                    days=float(
-                        os.getenv(EnvironmentVariables.SAS_TOKEN_EXPIRATIONS_DAYS.value)
-                    )
-                )
+        cache_key = f"{account_name}/{container_name}/{blob_name}"
+        sas_token = cls._sas_token_cache.get(cache_key)
+        if sas_token is None:
+            # Define the SAS token parameters
+            sas_token = generate_blob_sas(
+                account_name=account_name,
+                container_name=container_name,
+                blob_name=blob_name,
+                account_key=os.getenv(EnvironmentVariables.AZURE_BLOB_KEY.value),
+                permission=BlobSasPermissions(read=True),
+                expiry=datetime.now() + cls._sas_token_lifetime
             )
-        )
+            cls._sas_token_cache.set(cache_key, sas_token)
 
         return sas_token
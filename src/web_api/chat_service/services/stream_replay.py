@@ -0,0 +1,304 @@
+import asyncio
+import itertools
+import logging
+import os
+import uuid
+
+from collections import deque
+from typing import AsyncIterator, Callable, Optional
+
+from caching import MemoryCache
+from constants import ChatServiceConstants, EnvironmentVariables
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+DEFAULT_REPLAY_MAX_EVENTS = 512
+DEFAULT_REPLAY_MAX_SESSIONS = 1024
+DEFAULT_REPLAY_TTL_SECONDS = 300
+DEFAULT_RESUME_GRACE_SECONDS = 30
+
+
+class StreamResumeError(ValueError):
+    """Raised when a client asks to resume a stream from an event that is no longer available."""
+
+
+class StreamReplayLog:
+    """
+    The events of one streamed response, kept so a client that loses its connection can reconnect and resume.
+
+    The response is written to the log by a background task, and each connection follows the log from the event
+    after the last one it received. Only the most recent `max_events` events are kept. When every connection has gone
+    and none returns within `resume_grace_seconds`, the recording is cancelled so the agents stop spending tokens.
+    """
+
+    def __init__(
+            self,
+            max_events: int = DEFAULT_REPLAY_MAX_EVENTS,
+            resume_grace_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Initializes an empty log.
+
+        Args:
+            max_events (int, optional): The number of events kept for replay. Defaults to 512.
+            resume_grace_seconds (Optional[float], optional): Seconds to wait for a connection to return before the
+                recording is cancelled. Defaults to recording until the response finishes.
+        """
+        self.stream_id: str = uuid.uuid4().hex
+        self._events: deque[tuple[int, str]] = deque(maxlen=max_events)
+        self._last_seq: int = 0
+        self._done: bool = False
+        self._changed = asyncio.Event()
+        self._resume_grace_seconds: Optional[float] = resume_grace_seconds
+        self._recorder: Optional[asyncio.Task] = None
+        self._followers: int = 0
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the response has finished and no more events will be added."""
+        return self._done
+
+    def event_id(self, seq: int) -> str:
+        """
+        Gets the id sent to the client for an event.
+
+        Args:
+            seq (int): The sequence number of the event in this log.
+
+        Returns:
+            str: The event id, unique across streams.
+        """
+        return f"{self.stream_id}-{seq}"
+
+    def parse_event_id(self, event_id: str) -> int:
+        """
+        Gets the sequence number of an event id sent by this log.
+
+        Args:
+            event_id (str): The id, usually from the Last-Event-ID header of a reconnecting client.
+
+        Returns:
+            int: The sequence number of the event.
+
+        Raises:
+            StreamResumeError: If the id was not sent by this log.
+        """
+        stream_id, _, seq = event_id.strip().rpartition("-")
+        if stream_id != self.stream_id or not seq.isdigit() or int(seq) > self._last_seq:
+            raise StreamResumeError(f"Event {event_id} does not belong to the current stream.")
+        return int(seq)
+
+    def append(self, data: str) -> str:
+        """
+        Adds an event and wakes the connections following the log.
+
+        Args:
+            data (str): The event data.
+
+        Returns:
+            str: The id of the event.
+        """
+        self._last_seq += 1
+        self._events.append((self._last_seq, data))
+        self._notify()
+        return self.event_id(self._last_seq)
+
+    def finish(self) -> None:
+        """Marks the response as finished, which ends every connection once it has caught up."""
+        self._done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def record(
+            self,
+            frames: AsyncIterator[str],
+            on_error: Callable[[Exception], AsyncIterator[str]] = None
+    ) -> None:
+        """
+        Writes every frame of a response to the log and finishes it.
+
+        Args:
+            frames (AsyncIterator[str]): The frames of the response.
+            on_error (Callable[[Exception], AsyncIterator[str]], optional): Creates the frames to add if the response
+                fails. Defaults to ending the log without further frames.
+        """
+        self._recorder = asyncio.current_task()
+        try:
+            async for frame in frames:
+                self.append(frame)
+        except Exception as e:
+            logger.exception(f"Error recording stream {self.stream_id}: {e}", exc_info=e)
+            if on_error is not None:
+                async for frame in on_error(e):
+                    self.append(frame)
+        finally:
+            self.finish()
+
+    def _attach(self) -> None:
+        self._followers += 1
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+
+    def _detach(self) -> None:
+        self._followers -= 1
+        if self._followers == 0 and not self._done and self._resume_grace_seconds is not None:
+            self._abandon_timer = asyncio.get_running_loop().call_later(
+                self._resume_grace_seconds, self._cancel_abandoned
+            )
+
+    def _cancel_abandoned(self) -> None:
+        self._abandon_timer = None
+        if self._followers == 0 and not self._done and self._recorder is not None:
+            logger.info(f"No client resumed stream {self.stream_id}, cancelling the response.")
+            self._recorder.cancel()
+
+    async def follow(
+            self,
+            after_seq: int = 0,
+            heartbeat_seconds: Optional[float] = None
+    ) -> AsyncIterator[Optional[tuple[str, str]]]:
+        """
+        Yields the events after the given one, waiting for new events until the response has finished.
+
+        Args:
+            after_seq (int, optional): The sequence number of the last event the client received. Defaults to 0, which
+                yields every event.
+            heartbeat_seconds (Optional[float], optional): Seconds to wait for a new event before yielding None, so the
+                caller can keep the connection alive. Defaults to waiting indefinitely.
+
+        Yields:
+            Optional[tuple[str, str]]: The id and data of each event, or None when no event arrived in time.
+
+        Raises:
+            StreamResumeError: If events after `after_seq` have already been dropped from the log.
+        """
+        self._attach()
+        try:
+            async for event in self._follow(after_seq, heartbeat_seconds):
+                yield event
+        finally:
+            self._detach()
+
+    async def _follow(
+            self,
+            after_seq: int,
+            heartbeat_seconds: Optional[float]
+    ) -> AsyncIterator[Optional[tuple[str, str]]]:
+        while True:
+            # capture the wake-up event before reading, so an event added while the caller handles a yield is not missed
+            changed = self._changed
+            first_seq = self._events[0][0] if self._events else self._last_seq + 1
+            if after_seq < first_seq - 1:
+                raise StreamResumeError(f"Events after {self.event_id(after_seq)} are no longer available.")
+            pending = list(itertools.islice(self._events, max(0, after_seq - first_seq + 1), None))
+            for seq, data in pending:
+                after_seq = seq
+                yield self.event_id(seq), data
+            if pending:
+                continue
+            if self._done:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield None
+
+
+class StreamReplayStore:
+    """
+    Process-wide registry of the replay logs of recent responses, keyed on the chat session.
+
+    Only the latest response of each session is kept, for at most `ttl_seconds`. Responses are recorded by tasks
+    owned by the store, so they keep running for `resume_grace_seconds` after the client that started them
+    disconnects.
+    """
+
+    def __init__(
+            self,
+            max_sessions: int = None,
+            max_events: int = None,
+            ttl_seconds: float = None,
+            resume_grace_seconds: float = None
+    ) -> None:
+        """
+        Initializes the store.
+
+        Args:
+            max_sessions (int, optional): The number of sessions whose latest response is kept. Defaults to the
+                STREAM_REPLAY_MAX_SESSIONS environment variable or 1024.
+            max_events (int, optional): The number of events kept per response. Defaults to the
+                STREAM_REPLAY_MAX_EVENTS environment variable or 512.
+            resume_grace_seconds (float, optional): Seconds a response keeps running without a connection. Defaults to
+                the STREAM_RESUME_GRACE_SECONDS environment variable or 30.
+            ttl_seconds (float, optional): The number of seconds a response can be resumed. Defaults to the
+                STREAM_REPLAY_TTL_SECONDS environment variable or 300.
+        """
+        max_sessions = max_sessions if max_sessions is not None else int(
+            os.getenv(EnvironmentVariables.STREAM_REPLAY_MAX_SESSIONS.value, DEFAULT_REPLAY_MAX_SESSIONS)
+        )
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv(EnvironmentVariables.STREAM_REPLAY_TTL_SECONDS.value, DEFAULT_REPLAY_TTL_SECONDS)
+        )
+        self._max_events: int = max_events if max_events is not None else int(
+            os.getenv(EnvironmentVariables.STREAM_REPLAY_MAX_EVENTS.value, DEFAULT_REPLAY_MAX_EVENTS)
+        )
+        self._resume_grace_seconds: float = resume_grace_seconds if resume_grace_seconds is not None else float(
+            os.getenv(EnvironmentVariables.STREAM_RESUME_GRACE_SECONDS.value, DEFAULT_RESUME_GRACE_SECONDS)
+        )
+        self._logs: MemoryCache[StreamReplayLog] = MemoryCache(
+            "stream_replay", max_entries=max_sessions, ttl_seconds=ttl_seconds
+        )
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(
+            self,
+            session_id: Optional[str],
+            frames: AsyncIterator[str],
+            on_error: Callable[[Exception], AsyncIterator[str]] = None
+    ) -> StreamReplayLog:
+        """
+        Starts recording a response in the background.
+
+        Args:
+            session_id (Optional[str]): The chat session the response belongs to. Responses without a session are
+                recorded but cannot be resumed.
+            frames (AsyncIterator[str]): The frames of the response.
+            on_error (Callable[[Exception], AsyncIterator[str]], optional): Creates the frames to add if the response
+                fails.
+
+        Returns:
+            StreamReplayLog: The log the response is written to.
+        """
+        replay_log = StreamReplayLog(self._max_events, self._resume_grace_seconds)
+        if session_id is not None:
+            self._logs.set(session_id, replay_log)
+        task = asyncio.create_task(replay_log.record(frames, on_error), name=f"stream_replay_{replay_log.stream_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return replay_log
+
+    def get(self, session_id: Optional[str]) -> Optional[StreamReplayLog]:
+        """
+        Gets the latest response of a session.
+
+        Args:
+            session_id (Optional[str]): The chat session.
+
+        Returns:
+            Optional[StreamReplayLog]: The log, or None if the session has no response that can be resumed.
+        """
+        if session_id is None:
+            return None
+        return self._logs.get(session_id)
+
+    async def close(self) -> None:
+        """Cancels the responses still being recorded."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._logs.clear()
@@ -0,0 +1,97 @@
+import json
+import logging
+
+from typing import Any, Optional
+
+from .StateBase import StateBase
+from caching import CacheBase
+from constants import ChatServiceConstants
+from models import AIChatRequest, ReportabilityContext
+from models.context_models import DEFAULT_SNAPSHOT_MAX_TURNS
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+
+class PersistentState(StateBase[ReportabilityContext]):
+    """
+    StateBase implementation that keeps the conversation in a session store between requests, keyed on the session
+    state of the chat request and the user in "context.user.id", so one user cannot continue another's session.
+
+    The chat history, and the retrieved documents and recommendations of the last turns, are restored when a request
+    continues a stored session. A request carrying a single message is treated as the next turn and appended to the
+    stored history. A request carrying several messages is treated as the full history, as without a store, and only
+    the documents and recommendations are restored.
+    """
+
+    def __init__(
+            self,
+            chat_request: AIChatRequest,
+            store: CacheBase[dict[str, Any]],
+            max_turns: int = DEFAULT_SNAPSHOT_MAX_TURNS
+    ) -> None:
+        """Initialize PersistentState. The stored session is restored by load.
+
+        Args:
+            chat_request (AIChatRequest): The chat request object.
+            store (CacheBase[dict[str, Any]]): The session store, for example a MemoryCache or a DiskCache.
+            max_turns (int, optional): The number of turns whose documents and recommendations are kept. Defaults to
+                DEFAULT_SNAPSHOT_MAX_TURNS.
+        """
+        super().__init__(chat_request)
+        self._store = store
+        self._max_turns = max_turns
+        self._session_id: Optional[str] = (
+            str(chat_request.session_state) if chat_request.session_state is not None else None
+        )
+        # encoded as a JSON pair so no session state of one user can spell out the key of another
+        self._key: Optional[str] = (
+            json.dumps([chat_request.get_user_id(), self._session_id]) if self._session_id is not None else None
+        )
+        self._state: ReportabilityContext = ReportabilityContext(chat_request=chat_request)
+
+    def get_state(self) -> Optional[ReportabilityContext]:
+        """Retrieve the current ReportabilityContext state.
+
+        Returns:
+            Optional[ReportabilityContext]: The current state or None if unset.
+        """
+        return self._state
+
+    def set_state(self, state: ReportabilityContext) -> None:
+        """Set the current ReportabilityContext state.
+
+        Args:
+            state (ReportabilityContext): The state to set.
+        """
+        self._state = state
+
+    @property
+    def is_persistent(self) -> bool:
+        """Whether the state is kept between the turns of the conversation.
+
+        Returns:
+            bool: True if the chat request has a session state to store the state under.
+        """
+        return self._session_id is not None
+
+    async def load(self) -> None:
+        """Restore the stored session of the chat request, if there is one."""
+        if self._session_id is None:
+            return
+        snapshot = await self._store.aget(self._key)
+        if snapshot is not None:
+            self._state.restore_snapshot(snapshot, restore_history=len(self._chat_request.messages) == 1)
+            logger.debug(f"Restored session {self._session_id} with {len(self._state.plugin_results)} documents.")
+
+    async def save(self) -> None:
+        """Store a snapshot of the current state under the session state of the chat request.
+
+        Requests without a session state are not stored.
+        """
+        if self._session_id is None or self._state is None:
+            return
+        try:
+            await self._store.aset(self._key, self._state.to_snapshot(self._max_turns))
+        except Exception as e:
+            # a failed save only costs the next turn its restored state, so the response is not failed for it
+            logger.exception(f"Failed to save session {self._session_id}: {e}", exc_info=e)
@@ -34,3 +34,26 @@ class StateBase(ABC, Generic[T]):
             state (T): The state to set.
         """
         pass
+
+    @property
+    def is_persistent(self) -> bool:
+        """Whether the state is kept between the turns of the conversation.
+
+        Returns:
+            bool: False, the default implementation keeps nothing between requests.
+        """
+        return False
+
+    async def load(self) -> None:
+        """Restore the state that an earlier turn of the conversation saved.
+
+        The default implementation keeps nothing between requests.
+        """
+        pass
+
+    async def save(self) -> None:
+        """Persist the current state so the next turn of the conversation can continue from it.
+
+        The default implementation keeps nothing between requests.
+        """
+        pass
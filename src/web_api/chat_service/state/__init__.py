@@ -1,7 +1,9 @@
 from .MemoryState import MemoryState
+from .PersistentState import PersistentState
 from .StateBase import StateBase
 
 __all__ = [
     "MemoryState",
+    "PersistentState",
     "StateBase",
 ]
@@ -1,8 +1,33 @@
-from .stream_processing import stream_processor, stream_error_handler, get_agent_response_item, StreamingMessageMetadata
+from .stream_processing import (
+    stream_processor,
+    stream_error_handler,
+    sse_stream_processor,
+    sse_error_handler,
+    get_agent_response_item,
+    StreamingMessageMetadata,
+)
+from .fan_in import merge_async_iterators, PrefetchingAsyncIterator
+from .history_manager import HistoryManager, HistoryWindow
+from .context_packing import ContextPacker, PackedContext
+from .token_counting import count_tokens, truncate_to_tokens
+from .intent_classifier import IntentClassifier, IntentModel, IntentPrediction
 
 __all__ = [
     "stream_processor",
     "stream_error_handler",
+    "sse_stream_processor",
+    "sse_error_handler",
     "get_agent_response_item",
     "StreamingMessageMetadata",
+    "merge_async_iterators",
+    "PrefetchingAsyncIterator",
+    "HistoryManager",
+    "HistoryWindow",
+    "ContextPacker",
+    "PackedContext",
+    "count_tokens",
+    "truncate_to_tokens",
+    "IntentClassifier",
+    "IntentModel",
+    "IntentPrediction",
 ]
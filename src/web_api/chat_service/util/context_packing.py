@@ -0,0 +1,193 @@
+import logging
+import os
+
+from opentelemetry import metrics
+from pydantic import BaseModel
+from typing import Any, Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+from models import SearchModelsBase
+from .token_counting import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+packed_tokens_histogram = meter.create_histogram(
+    "context_packing.packed_tokens",
+    unit="{token}",
+    description="Tokens of search results returned to an agent by one search, by tool.",
+)
+dropped_tokens_histogram = meter.create_histogram(
+    "context_packing.dropped_tokens",
+    unit="{token}",
+    description="Tokens of search results left out or truncated to fit the token budget of one search, by tool.",
+)
+dropped_documents_counter = meter.create_counter(
+    "context_packing.dropped_documents",
+    description="Search results left out because they did not fit the token budget of a search, by tool.",
+)
+
+DEFAULT_CONTEXT_PACKING_MAX_TOKENS = 4000
+DEFAULT_CONTEXT_PACKING_MAX_FIELD_TOKENS = 1000
+# A field cut shorter than this no longer says enough about the document to be worth sending
+MIN_FIELD_TOKENS = 50
+DOCUMENT_SEPARATOR = "\n\n"
+
+
+class PackedContext:
+    """
+    The search results returned to an agent by one search.
+
+    Attributes:
+        text (str): The text of the packed results.
+        results (list[SearchModelsBase]): The results included in `text`, highest score first.
+        dropped_results (list[SearchModelsBase]): The results left out because they did not fit.
+        packed_tokens (int): The tokens of `text`.
+        dropped_tokens (int): The tokens of every result minus `packed_tokens`, covering both the results left out
+            and the parts cut from truncated fields.
+    """
+
+    def __init__(
+            self,
+            text: str,
+            results: list[SearchModelsBase],
+            dropped_results: list[SearchModelsBase],
+            packed_tokens: int,
+            dropped_tokens: int
+    ) -> None:
+        """
+        Initializes the packed context.
+
+        Args:
+            text (str): The text of the packed results.
+            results (list[SearchModelsBase]): The results included in `text`.
+            dropped_results (list[SearchModelsBase]): The results left out because they did not fit.
+            packed_tokens (int): The tokens of `text`.
+            dropped_tokens (int): The tokens left out or cut.
+        """
+        self.text = text
+        self.results = results
+        self.dropped_results = dropped_results
+        self.packed_tokens = packed_tokens
+        self.dropped_tokens = dropped_tokens
+
+
+class ContextPacker:
+    """
+    Fits the search results of one tool call into a token budget.
+
+    Results are added greedily, highest search score first. Long fields, listed in `truncatable_fields` of each search
+    model, are cut to `max_field_tokens` at a sentence boundary, and further when that is what it takes to fit the
+    remaining budget. A result that cannot fit even with its fields cut short is left out and the next one is tried.
+    """
+
+    def __init__(self, max_tokens: int = None, max_field_tokens: int = None) -> None:
+        """
+        Initializes the packer.
+
+        Args:
+            max_tokens (int, optional): The token budget of the packed results. Zero or less returns every result in
+                full. Defaults to the CONTEXT_PACKING_MAX_TOKENS environment variable or 4000.
+            max_field_tokens (int, optional): The maximum tokens of each long field. Zero or less leaves fields whole
+                unless the budget requires otherwise. Defaults to the CONTEXT_PACKING_MAX_FIELD_TOKENS environment
+                variable or 1000.
+        """
+        self._max_tokens: int = max_tokens if max_tokens is not None else int(
+            os.getenv(EnvironmentVariables.CONTEXT_PACKING_MAX_TOKENS.value, DEFAULT_CONTEXT_PACKING_MAX_TOKENS)
+        )
+        self._max_field_tokens: int = max_field_tokens if max_field_tokens is not None else int(os.getenv(
+            EnvironmentVariables.CONTEXT_PACKING_MAX_FIELD_TOKENS.value, DEFAULT_CONTEXT_PACKING_MAX_FIELD_TOKENS
+        ))
+
+    def pack(self, results: list[SearchModelsBase], tool_name: str = None) -> PackedContext:
+        """
+        Packs search results into the token budget.
+
+        Args:
+            results (list[SearchModelsBase]): The search results.
+            tool_name (str, optional): The name of the tool returning the results, used to tag metrics.
+
+        Returns:
+            PackedContext: The packed results.
+        """
+        full_texts = [result.to_agent_string() for result in results]
+        full_tokens = count_tokens(DOCUMENT_SEPARATOR.join(full_texts))
+        if self._max_tokens <= 0:
+            return PackedContext(DOCUMENT_SEPARATOR.join(full_texts), list(results), [], full_tokens, 0)
+
+        separator_tokens = count_tokens(DOCUMENT_SEPARATOR)
+        remaining = self._max_tokens
+        texts: list[str] = []
+        packed: list[SearchModelsBase] = []
+        dropped: list[SearchModelsBase] = []
+        ranked = sorted(zip(results, full_texts), key=lambda entry: entry[0].search_score, reverse=True)
+        for result, full_text in ranked:
+            available = remaining - (separator_tokens if texts else 0)
+            text = self._fit(result, full_text, available)
+            if text is None:
+                dropped.append(result)
+                continue
+            remaining = available - count_tokens(text)
+            texts.append(text)
+            packed.append(result)
+
+        text = DOCUMENT_SEPARATOR.join(texts)
+        packed_tokens = count_tokens(text)
+        packed_context = PackedContext(text, packed, dropped, packed_tokens, max(0, full_tokens - packed_tokens))
+
+        attributes = {"tool": tool_name or ""}
+        packed_tokens_histogram.record(packed_context.packed_tokens, attributes)
+        dropped_tokens_histogram.record(packed_context.dropped_tokens, attributes)
+        if dropped:
+            dropped_documents_counter.add(len(dropped), attributes)
+        logger.debug(
+            f"Packed {len(packed)} of {len(results)} results from {tool_name} into {packed_context.packed_tokens} "
+            f"tokens, {packed_context.dropped_tokens} tokens dropped."
+        )
+        return packed_context
+
+    def _fit(self, result: SearchModelsBase, full_text: str, available: int) -> Optional[str]:
+        fields = {name: getattr(result, name) for name in result.truncatable_fields if getattr(result, name)}
+        within_field_limit = self._max_field_tokens <= 0 or all(
+            _field_tokens(value) <= self._max_field_tokens for value in fields.values()
+        )
+        if within_field_limit and count_tokens(full_text) <= available:
+            return full_text
+        if not fields:
+            return None
+
+        without_fields = result.model_copy(update={name: value[:0] for name, value in fields.items()})
+        field_tokens = (available - count_tokens(without_fields.to_agent_string())) // len(fields)
+        if self._max_field_tokens > 0:
+            field_tokens = min(field_tokens, self._max_field_tokens)
+        if field_tokens < MIN_FIELD_TOKENS:
+            return None
+
+        text = result.model_copy(
+            update={name: _truncate_field(value, field_tokens) for name, value in fields.items()}
+        ).to_agent_string()
+        return text if count_tokens(text) <= available else None
+
+
+def _item_text(item: Any) -> str:
+    if isinstance(item, BaseModel):
+        return " ".join(str(value) for value in item.model_dump().values())
+    return str(item)
+
+
+def _field_tokens(value: Any) -> int:
+    if isinstance(value, str):
+        return count_tokens(value)
+    return sum(count_tokens(_item_text(item)) for item in value)
+
+
+def _truncate_field(value: Any, max_tokens: int) -> Any:
+    if isinstance(value, str):
+        return truncate_to_tokens(value, max_tokens)
+    # lists keep their leading items
+    kept = []
+    for item in value:
+        max_tokens -= count_tokens(_item_text(item))
+        if max_tokens < 0:
+            break
+        kept.append(item)
+    return kept
@@ -0,0 +1,124 @@
+import asyncio
+
+from typing import AsyncIterator, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BUFFERED = 8
+
+_EXHAUSTED = object()
+
+
+async def _aclose(iterator: AsyncIterator[T]) -> None:
+    # close a source left suspended at a yield so its own cleanup, such as cancelling its searches, runs now rather
+    # than whenever it is garbage collected
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+async def merge_async_iterators(
+        iterators: Iterable[AsyncIterator[T]],
+        max_buffered: int = DEFAULT_MAX_BUFFERED
+) -> AsyncIterator[T]:
+    """
+    Consumes several async iterators concurrently and yields their items as soon as any of them produces one.
+
+    Each source is drained by its own task, which stops reading from the source once `max_buffered` of its items are
+    waiting to be consumed, so a fast source cannot run arbitrarily far ahead of the consumer. Items from the same
+    source keep their order.
+
+    If a source raises, the remaining sources are cancelled and the exception is raised to the consumer. Closing the
+    merged iterator early, for example because the client disconnected, cancels every source.
+
+    Args:
+        iterators (Iterable[AsyncIterator[T]]): The sources to merge.
+        max_buffered (int, optional): The maximum number of unconsumed items held per source. Defaults to 8.
+
+    Yields:
+        T: The items from every source, in the order they were produced.
+    """
+    sources = list(iterators)
+    queue: asyncio.Queue[tuple[int, object, Optional[Exception]]] = asyncio.Queue()
+    slots = [asyncio.Semaphore(max_buffered) for _ in sources]
+
+    async def drain(index: int, iterator: AsyncIterator[T]) -> None:
+        try:
+            async for item in iterator:
+                await slots[index].acquire()
+                queue.put_nowait((index, item, None))
+        except Exception as e:
+            queue.put_nowait((index, _EXHAUSTED, e))
+        else:
+            queue.put_nowait((index, _EXHAUSTED, None))
+        finally:
+            await _aclose(iterator)
+
+    tasks = [asyncio.create_task(drain(index, iterator)) for index, iterator in enumerate(sources)]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            index, item, error = await queue.get()
+            if item is _EXHAUSTED:
+                if error is not None:
+                    raise error
+                remaining -= 1
+                continue
+            slots[index].release()
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class PrefetchingAsyncIterator(AsyncIterator[T]):
+    """
+    Starts consuming an async iterator in the background as soon as it is created and replays the items in order
+    when iterated.
+
+    This lets work behind an async generator begin before the caller is ready to read its output, and lets the caller
+    wait for the next item with a timeout without cancelling the source. Closing the iterator cancels the background
+    consumption, whether or not the source has finished.
+    """
+
+    def __init__(self, iterator: AsyncIterator[T], max_buffered: int = 0) -> None:
+        """
+        Starts consuming the iterator.
+
+        Args:
+            iterator (AsyncIterator[T]): The source to prefetch.
+            max_buffered (int, optional): The maximum number of unconsumed items to hold before the source is paused.
+                Defaults to 0, which holds every item.
+        """
+        self._queue: asyncio.Queue[tuple[object, Optional[Exception]]] = asyncio.Queue(max_buffered)
+        self._task = asyncio.create_task(self._drain(iterator))
+
+    async def _drain(self, iterator: AsyncIterator[T]) -> None:
+        try:
+            async for item in iterator:
+                await self._queue.put((item, None))
+        except Exception as e:
+            await self._queue.put((_EXHAUSTED, e))
+        else:
+            await self._queue.put((_EXHAUSTED, None))
+        finally:
+            await _aclose(iterator)
+
+    def __aiter__(self) -> "PrefetchingAsyncIterator[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        item, error = await self._queue.get()
+        if item is _EXHAUSTED:
+            # leave the end marker in place so later calls end the same way
+            self._queue.put_nowait((item, error))
+            if error is not None:
+                raise error
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self) -> None:
+        """Cancels the background consumption and waits for it to stop."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
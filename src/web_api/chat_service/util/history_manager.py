@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import os
+
+from opentelemetry import metrics
+from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
+from semantic_kernel.contents import ChatHistory, ChatMessageContent
+from typing import Iterable, Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+from models import AIChatRole, ReportabilityContext, TokenUsage
+from models.context_models import DOCUMENT_REFERENCE_METADATA
+from prompts.AgentsPrompt import AgentsPrompt
+from services import ReportabilityServices
+from .token_counting import count_tokens
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+prompt_tokens_saved_counter = meter.create_counter(
+    "history.prompt_tokens_saved",
+    unit="{token}",
+    description="Estimated prompt tokens not sent to the agents because older turns of the history were condensed.",
+)
+
+DEFAULT_HISTORY_MAX_TOKENS = 6000
+DEFAULT_HISTORY_INTENT_MAX_TOKENS = 2000
+DEFAULT_HISTORY_RECENT_TURNS = 2
+DEFAULT_HISTORY_SUMMARY_MAX_TOKENS = 400
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARIZER_NAME = "HistorySummarizer"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(messages: Iterable[ChatMessageContent]) -> int:
+    """
+    Estimates the prompt tokens used by chat messages.
+
+    Args:
+        messages (Iterable[ChatMessageContent]): The messages.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return sum(MESSAGE_OVERHEAD_TOKENS + count_tokens(message.content or "") for message in messages)
+
+
+class HistoryWindow:
+    """
+    The part of the chat history sent to an agent.
+
+    Attributes:
+        messages (list[ChatMessageContent]): The messages to send.
+        original_tokens (int): The estimated prompt tokens of the full history.
+        tokens (int): The estimated prompt tokens of `messages`.
+    """
+
+    def __init__(self, messages: list[ChatMessageContent], original_tokens: int, tokens: int) -> None:
+        """
+        Initializes the window.
+
+        Args:
+            messages (list[ChatMessageContent]): The messages to send.
+            original_tokens (int): The estimated prompt tokens of the full history.
+            tokens (int): The estimated prompt tokens of `messages`.
+        """
+        self.messages = messages
+        self.original_tokens = original_tokens
+        self.tokens = tokens
+
+    @property
+    def tokens_saved(self) -> int:
+        """The estimated prompt tokens saved by sending the window instead of the full history."""
+        return max(0, self.original_tokens - self.tokens)
+
+
+class HistoryManager:
+    """
+    Fits the chat history sent to an agent into a prompt token budget.
+
+    A turn starts at a user message and holds the replies that follow it. The most recent turns are always sent
+    verbatim. In older turns the full text of cited documents is replaced with a short reference, since the search
+    plugins can find those documents again. If the history is still over budget, the older turns are either
+    summarized by the chat completion service or dropped, oldest first.
+    """
+
+    def __init__(
+            self,
+            max_tokens: int = None,
+            recent_turns: int = None,
+            summarize: bool = None,
+            summary_max_tokens: int = None
+    ) -> None:
+        """
+        Initializes the manager.
+
+        Args:
+            max_tokens (int, optional): The prompt token budget of the history. Zero or less sends the full history.
+                Defaults to the HISTORY_MAX_TOKENS environment variable or 6000.
+            recent_turns (int, optional): The number of most recent turns sent verbatim. Defaults to the
+                HISTORY_RECENT_TURNS environment variable or 2.
+            summarize (bool, optional): Whether older turns over the budget are summarized instead of dropped.
+                Defaults to the HISTORY_SUMMARIZE environment variable or false.
+            summary_max_tokens (int, optional): The maximum length of a summary. Defaults to the
+                HISTORY_SUMMARY_MAX_TOKENS environment variable or 400.
+        """
+        self._max_tokens: int = max_tokens if max_tokens is not None else int(
+            os.getenv(EnvironmentVariables.HISTORY_MAX_TOKENS.value, DEFAULT_HISTORY_MAX_TOKENS)
+        )
+        self._recent_turns: int = recent_turns if recent_turns is not None else int(
+            os.getenv(EnvironmentVariables.HISTORY_RECENT_TURNS.value, DEFAULT_HISTORY_RECENT_TURNS)
+        )
+        self._summarize: bool = summarize if summarize is not None else (
+            os.getenv(EnvironmentVariables.HISTORY_SUMMARIZE.value, "false").lower() == "true"
+        )
+        self._summary_max_tokens: int = summary_max_tokens if summary_max_tokens is not None else int(
+            os.getenv(EnvironmentVariables.HISTORY_SUMMARY_MAX_TOKENS.value, DEFAULT_HISTORY_SUMMARY_MAX_TOKENS)
+        )
+
+    async def get_window(self, reportability_context: ReportabilityContext, agent_name: str = None) -> HistoryWindow:
+        """
+        Gets the part of the chat history to send to an agent.
+
+        Args:
+            reportability_context (ReportabilityContext): The state of the request. The token usage of a summary is
+                added to it.
+            agent_name (str, optional): The name of the agent, used to tag metrics.
+
+        Returns:
+            HistoryWindow: The messages to send and the estimated tokens they save.
+        """
+        messages = list(reportability_context.message_history.messages)
+        original_tokens = estimate_tokens(messages)
+        if self._max_tokens <= 0:
+            return HistoryWindow(messages, original_tokens, original_tokens)
+
+        turns = _split_turns(messages)
+        split = max(0, len(turns) - max(1, self._recent_turns))
+        older_turns = [[_compact_document(message) for message in turn] for turn in turns[:split]]
+        recent = [message for turn in turns[split:] for message in turn]
+
+        older_budget = self._max_tokens - estimate_tokens(recent)
+        older = [message for turn in older_turns for message in turn]
+        if estimate_tokens(older) > older_budget:
+            summary = await self._get_summary(reportability_context, older) if self._summarize else None
+            if summary is not None:
+                older = [summary]
+            else:
+                older = _drop_oldest_turns(older_turns, older_budget)
+
+        window = HistoryWindow(older + recent, original_tokens, estimate_tokens(older) + estimate_tokens(recent))
+        if window.tokens_saved:
+            prompt_tokens_saved_counter.add(window.tokens_saved, {"agent_name": agent_name or ""})
+        return window
+
+    async def _get_summary(
+            self,
+            reportability_context: ReportabilityContext,
+            messages: list[ChatMessageContent]
+    ) -> Optional[ChatMessageContent]:
+        cache = ReportabilityServices.get_history_summary_cache()
+        cache_key = _get_summary_key(messages)
+        text = cache.get(cache_key)
+        if text is None:
+            try:
+                text = await self._create_summary(reportability_context, messages)
+            except Exception as e:
+                logger.warning(f"Summarizing the chat history failed, dropping older turns instead: {e}")
+                return None
+            cache.set(cache_key, text)
+        summary = ChatHistory()
+        summary.add_assistant_message(SUMMARY_PREFIX + text)
+        return summary.messages[0]
+
+    async def _create_summary(
+            self,
+            reportability_context: ReportabilityContext,
+            messages: list[ChatMessageContent]
+    ) -> str:
+        chat_history = ChatHistory()
+        # roughly three words for every four tokens
+        chat_history.add_system_message(
+            AgentsPrompt.HistorySummaryPrompt.format(max_words=self._summary_max_tokens * 3 // 4)
+        )
+        for message in messages:
+            chat_history.add_message(message)
+        chat_history.add_user_message("Summarize the conversation so far.")
+        response = await ReportabilityServices.get_chat_completion_service().get_chat_message_content(
+            chat_history=chat_history,
+            settings=AzureChatPromptExecutionSettings(
+                max_tokens=self._summary_max_tokens, temperature=ChatServiceConstants.DEFAULT_TEMPERATURE.value
+            ),
+        )
+        usage = response.metadata.get("usage")
+        if usage:
+            reportability_context.token_usage.append(TokenUsage(
+                agent_name=SUMMARIZER_NAME,
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+            ))
+            reportability_context.budget.add_token_usage(usage.prompt_tokens, usage.completion_tokens)
+        return response.content
+
+
+def _split_turns(messages: list[ChatMessageContent]) -> list[list[ChatMessageContent]]:
+    turns: list[list[ChatMessageContent]] = []
+    for message in messages:
+        if not turns or message.role.value == AIChatRole.USER.value:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _compact_document(message: ChatMessageContent) -> ChatMessageContent:
+    document_reference = message.metadata.get(DOCUMENT_REFERENCE_METADATA)
+    if not document_reference:
+        return message
+    reference = ChatHistory()
+    reference.add_assistant_message(
+        f"Document {document_reference} was provided earlier in the conversation, its full text is omitted.",
+        metadata=dict(message.metadata),
+    )
+    return reference.messages[0]
+
+
+def _drop_oldest_turns(turns: list[list[ChatMessageContent]], budget: int) -> list[ChatMessageContent]:
+    kept: list[list[ChatMessageContent]] = []
+    for turn in reversed(turns):
+        tokens = estimate_tokens(turn)
+        if tokens > budget:
+            break
+        budget -= tokens
+        kept.append(turn)
+    return [message for turn in reversed(kept) for message in turn]
+
+
+def _get_summary_key(messages: list[ChatMessageContent]) -> str:
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(message.role.value.encode())
+        digest.update(b"\0")
+        digest.update((message.content or "").encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
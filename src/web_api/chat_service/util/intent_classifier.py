@@ -0,0 +1,337 @@
+import csv
+import json
+import logging
+import math
+import os
+import random
+import re
+import zlib
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+from models import Intent
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+DEFAULT_INTENT_FAST_PATH_THRESHOLD = 0.9
+DEFAULT_INTENT_MODEL_BUCKETS = 2 ** 18
+INTENT_SOURCE_RULES = "rules"
+INTENT_SOURCE_MODEL = "model"
+INTENT_SOURCE_LLM = "llm"
+# the intent was set by the first knowledge agent in the combined orchestration mode
+INTENT_SOURCE_COMBINED = "combined"
+
+# Log-odds of the lexicon, added up and squashed into a probability that the message asks about reportability
+LEXICON_BIAS = -4.0
+CITATION_WEIGHT = 6.5
+REPORTABILITY_TERM_WEIGHT = 3.5
+EVENT_TERM_WEIGHT = 1.5
+MAX_EVENT_TERMS = 6
+OFF_TOPIC_WEIGHT = -8.0
+
+_CITATION = re.compile(
+    r"\b(?:10\s*c\.?f\.?r\.?\s*(?:part\s*)?\d+|(?:50\.72|50\.73|50\.9|20\.2201|20\.2202|20\.2203|21\.21|26\.719|"
+    r"72\.75|73\.71|73\.1200)(?:\s*\([a-z0-9]+\))*)"
+)
+_REPORTABILITY_TERMS = re.compile(
+    r"\b(?:reportab\w+|report(?:ed|ing)? (?:it |this )?to (?:the )?nrc|notif\w* (?:the )?nrc|nureg[- ]?1022|"
+    r"licensee event report|\bler\b|event notification|\bens\b|\d{1,2}[- ]hour (?:report|notification)|"
+    r"60[- ]day report)"
+)
+# Plant event vocabulary by kind of term, phrases have up to three words and a trailing "*" matches any word starting
+# with the prefix
+_EVENT_TERMS = {
+    "scram": (
+        "scram*", "reactor trip", "reactor trips", "reactor tripped", "turbine trip", "turbine tripped", "rx trip",
+        "manually tripped", "automatically tripped",
+    ),
+    "actuation": (
+        "actuat*", "esf", "engineered safety feature", "engineered safety features", "safety injection", "eccs",
+    ),
+    "diesel": ("edg", "edgs", "diesel generator", "diesel generators"),
+    "operability": (
+        "inoperab*", "operab*", "lco", "limiting condition", "technical specification", "technical specifications",
+        "tech spec", "tech specs", "ts",
+    ),
+    "safety_function": ("safety function", "safety related", "single failure", "common cause"),
+    "containment": ("containment", "primary coolant", "reactor coolant", "rcs", "pressure boundary"),
+    "leak": ("leak*", "release", "releases", "effluent*", "spill*", "contaminat*"),
+    "radiation": ("radiation", "radiological", "dose", "exposure", "radioactiv*"),
+    "power": (
+        "offsite power", "loss of power", "loop", "station blackout", "emergency bus", "emergency buses", "breaker*",
+    ),
+    "feedwater": ("feedwater", "afw", "hpci", "rcic", "residual heat removal", "rhr", "service water"),
+    "fire": ("fire", "fires", "smoke", "fire protection", "fire barrier", "fire barriers"),
+    "security": ("security", "fitness for duty", "fatigue rule", "unauthorized access", "safeguards"),
+    "emergency": ("unusual event", "alert", "site area emergency", "general emergency", "emergency plan"),
+    "plant_state": (
+        "mode 1", "mode 2", "mode 3", "mode 4", "mode 5", "mode 6", "shutdown", "startup", "refueling*",
+        "power operation", "rated thermal power", "percent power", "full power",
+    ),
+    "equipment": (
+        "pump*", "valve*", "relay*", "inverter*", "battery", "batteries", "charger*", "turbine*", "sensor*",
+        "instrument*",
+    ),
+    "operations": ("control room", "operator*", "surveillance*", "abnormal operating", "work order", "troubleshoot*"),
+    "reactor": ("reactor", "nuclear", "plant", "unit 1", "unit 2", "unit 3", "unit 4", "station"),
+}
+# a message is matched on its set of words and word pairs and triples rather than with a regular expression per
+# term, which keeps scoring a long event narrative well under a millisecond
+_EVENT_PHRASES = {
+    phrase: kind for kind, phrases in _EVENT_TERMS.items() for phrase in phrases if not phrase.endswith("*")
+}
+_EVENT_PREFIXES = {
+    phrase[:-1]: kind for kind, phrases in _EVENT_TERMS.items() for phrase in phrases if phrase.endswith("*")
+}
+_EVENT_PREFIX_TUPLE = tuple(_EVENT_PREFIXES)
+_WORD = re.compile(r"[a-z0-9]+")
+_OFF_TOPIC = re.compile(
+    r"\b(?:joke|poem|song|recipe|movie|sports?|stock price|horoscope|write (?:me )?(?:a |some )?code|"
+    r"ignore (?:all |your |the )?(?:previous |prior )?instructions|system prompt|pretend to be)\b"
+)
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+class IntentPrediction:
+    """
+    The intent of a message as told by the local classifier.
+
+    Attributes:
+        intent (Optional[Intent]): The intent, or None when the classifier is not confident enough and the intent
+            agent has to decide.
+        probability (float): The estimated probability that the message asks about reportability.
+        source (str): What decided the intent, `rules` or `model`.
+    """
+
+    def __init__(self, intent: Optional[Intent], probability: float, source: str) -> None:
+        """
+        Initializes the prediction.
+
+        Args:
+            intent (Optional[Intent]): The intent, or None when the classifier is not confident enough.
+            probability (float): The estimated probability that the message asks about reportability.
+            source (str): What decided the intent, `rules` or `model`.
+        """
+        self.intent = intent
+        self.probability = probability
+        self.source = source
+
+
+class IntentModel:
+    """
+    A logistic regression over hashed word unigrams and bigrams, small enough to score a message in microseconds.
+    """
+
+    def __init__(self, weights: dict[int, float], bias: float, buckets: int = DEFAULT_INTENT_MODEL_BUCKETS) -> None:
+        """
+        Initializes the model.
+
+        Args:
+            weights (dict[int, float]): The weight of every feature bucket seen in training.
+            bias (float): The intercept.
+            buckets (int, optional): The number of feature buckets. Defaults to 2 ** 18.
+        """
+        self.weights = weights
+        self.bias = bias
+        self.buckets = buckets
+
+    def decision_function(self, text: str) -> float:
+        """
+        Scores a message.
+
+        Args:
+            text (str): The message.
+
+        Returns:
+            float: The log-odds that the message asks about reportability.
+        """
+        return self.bias + sum(self.weights.get(feature, 0.0) for feature in _features(text, self.buckets))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the model to a JSON file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({
+                "buckets": self.buckets,
+                "bias": self.bias,
+                "weights": {str(feature): round(weight, 6) for feature, weight in self.weights.items() if weight},
+            }, file)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        """
+        Reads a model written by `save`.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            IntentModel: The model.
+        """
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(
+            weights={int(feature): weight for feature, weight in data["weights"].items()},
+            bias=data["bias"],
+            buckets=data["buckets"],
+        )
+
+
+def train_intent_model(
+        texts: list[str],
+        labels: list[bool],
+        epochs: int = 10,
+        learning_rate: float = 0.1,
+        l2: float = 1e-4,
+        buckets: int = DEFAULT_INTENT_MODEL_BUCKETS
+) -> IntentModel:
+    """
+    Trains an intent model with stochastic gradient descent.
+
+    Args:
+        texts (list[str]): The messages.
+        labels (list[bool]): Whether each message asks about reportability.
+        epochs (int, optional): The number of passes over the messages. Defaults to 10.
+        learning_rate (float, optional): The step size. Defaults to 0.1.
+        l2 (float, optional): The L2 regularization strength. Defaults to 1e-4.
+        buckets (int, optional): The number of feature buckets. Defaults to 2 ** 18.
+
+    Returns:
+        IntentModel: The trained model.
+    """
+    examples = [(_features(text, buckets), 1.0 if label else 0.0) for text, label in zip(texts, labels)]
+    weights: dict[int, float] = {}
+    bias = 0.0
+    # a fixed seed keeps training reproducible
+    shuffler = random.Random(0)
+    for _ in range(epochs):
+        shuffler.shuffle(examples)
+        for features, label in examples:
+            error = _sigmoid(bias + sum(weights.get(feature, 0.0) for feature in features)) - label
+            bias -= learning_rate * error
+            for feature in features:
+                weight = weights.get(feature, 0.0)
+                weights[feature] = weight - learning_rate * (error + l2 * weight)
+    return IntentModel(weights, bias, buckets)
+
+
+class IntentClassifier:
+    """
+    Tells whether a message asks about reportability without calling the chat completion service.
+
+    A lexicon of CFR citations, reportability terms and plant event vocabulary is scored as log-odds, and the scores
+    of an optional `IntentModel` are added to it. Only messages that clearly ask about reportability are classified,
+    anything else is left to the intent agent, which also explains to the user why an invalid request is refused.
+    """
+
+    def __init__(self, threshold: float = None, model: Optional[IntentModel] = None) -> None:
+        """
+        Initializes the classifier.
+
+        Args:
+            threshold (float, optional): The probability a message must reach to be classified. Defaults to the
+                INTENT_FAST_PATH_THRESHOLD environment variable or 0.9.
+            model (Optional[IntentModel], optional): The model whose scores are added to the lexicon. Defaults to
+                the model at INTENT_MODEL_PATH, or none when the variable is not set.
+        """
+        self._threshold: float = threshold if threshold is not None else float(
+            os.getenv(EnvironmentVariables.INTENT_FAST_PATH_THRESHOLD.value, DEFAULT_INTENT_FAST_PATH_THRESHOLD)
+        )
+        self._model = model if model is not None else _load_model(
+            os.getenv(EnvironmentVariables.INTENT_MODEL_PATH.value, "")
+        )
+
+    def classify(self, text: str) -> IntentPrediction:
+        """
+        Classifies a message.
+
+        Args:
+            text (str): The message.
+
+        Returns:
+            IntentPrediction: The prediction, with no intent when the classifier is not confident enough.
+        """
+        lexicon_score = _lexicon_score(text or "")
+        probability = _sigmoid(lexicon_score)
+        source = INTENT_SOURCE_RULES
+        if self._model is not None:
+            combined = _sigmoid(lexicon_score + self._model.decision_function(text or ""))
+            if probability < self._threshold <= combined:
+                source = INTENT_SOURCE_MODEL
+            probability = combined
+        intent = Intent.REPORTABILITY if probability >= self._threshold else None
+        return IntentPrediction(intent, probability, source)
+
+
+def _lexicon_score(text: str) -> float:
+    # the patterns are lower case, which matches faster than ignoring case
+    text = text.lower()
+    if _OFF_TOPIC.search(text):
+        return LEXICON_BIAS + OFF_TOPIC_WEIGHT
+    score = LEXICON_BIAS
+    if _CITATION.search(text):
+        score += CITATION_WEIGHT
+    if _REPORTABILITY_TERMS.search(text):
+        score += REPORTABILITY_TERM_WEIGHT
+    return score + EVENT_TERM_WEIGHT * min(len(_event_term_kinds(text)), MAX_EVENT_TERMS)
+
+
+def _event_term_kinds(text: str) -> set[str]:
+    words = _WORD.findall(text)
+    grams = set(words)
+    grams.update(map(" ".join, zip(words, words[1:])))
+    grams.update(map(" ".join, zip(words, words[1:], words[2:])))
+    kinds = {_EVENT_PHRASES[gram] for gram in grams.intersection(_EVENT_PHRASES)}
+    for word in set(words):
+        if word.startswith(_EVENT_PREFIX_TUPLE):
+            kinds.update(kind for prefix, kind in _EVENT_PREFIXES.items() if word.startswith(prefix))
+    return kinds
+
+
+def _features(text: str, buckets: int) -> set[int]:
+    tokens = _TOKEN.findall(text.lower())
+    grams = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    # crc32 rather than hash, which is salted per process, so a saved model scores the same after a restart
+    return {zlib.crc32(gram.encode()) % buckets for gram in grams}
+
+
+def _sigmoid(value: float) -> float:
+    if value < 0:
+        exponent = math.exp(value)
+        return exponent / (1.0 + exponent)
+    return 1.0 / (1.0 + math.exp(-value))
+
+
+@lru_cache(maxsize=4)
+def _load_model(path: str) -> Optional[IntentModel]:
+    if not path:
+        return None
+    try:
+        return IntentModel.load(path)
+    except Exception as e:
+        logger.warning(f"Intent model {path} could not be loaded, classifying intents with the lexicon only: {e}")
+        return None
+
+
+def read_messages(paths: Iterable[str], column: str = "content") -> list[str]:
+    """
+    Reads the messages of one column of CSV files, for example the narratives of the evaluation ground truth.
+
+    Args:
+        paths (Iterable[str]): The paths of the CSV files.
+        column (str, optional): The column holding the messages. Defaults to "content".
+
+    Returns:
+        list[str]: The non-empty messages.
+    """
+    messages = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as file:
+            messages.extend(row[column] for row in csv.DictReader(file) if row.get(column))
+    return messages
@@ -0,0 +1,96 @@
+import logging
+
+from opentelemetry import metrics
+from typing import Optional
+
+from constants import ChatServiceConstants
+from models import ReportabilityContext
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+cancelled_requests_counter = meter.create_counter(
+    "stream.cancelled_requests",
+    description="Number of streamed requests stopped before they finished, by reason.",
+)
+tokens_saved_counter = meter.create_counter(
+    "stream.cancelled_tokens_saved",
+    unit="{token}",
+    description="Estimated tokens not spent because streamed requests were stopped before they finished.",
+)
+
+
+class TokenUsageBaseline:
+    """
+    Running average of the tokens used by requests that finished, used to estimate what a stopped request saved.
+
+    Usage is only reported once an agent finishes, so the tokens of the agent that was interrupted count as saved.
+    """
+
+    def __init__(self, smoothing: float = 0.1) -> None:
+        """
+        Initializes the baseline.
+
+        Args:
+            smoothing (float, optional): Weight of each new request in the exponential moving average. Defaults to 0.1.
+        """
+        self._smoothing = smoothing
+        self.average_tokens: Optional[float] = None
+
+    def record_completed(self, tokens: int) -> None:
+        """
+        Adds the tokens used by a request that finished.
+
+        Args:
+            tokens (int): The tokens the request used.
+        """
+        if self.average_tokens is None:
+            self.average_tokens = float(tokens)
+        else:
+            self.average_tokens += self._smoothing * (tokens - self.average_tokens)
+
+    def estimate_saved(self, tokens: int) -> int:
+        """
+        Estimates the tokens a stopped request did not spend.
+
+        Args:
+            tokens (int): The tokens the request used before it was stopped.
+
+        Returns:
+            int: The estimated tokens saved, or 0 before any request has finished.
+        """
+        if self.average_tokens is None:
+            return 0
+        return max(0, round(self.average_tokens - tokens))
+
+
+_baseline = TokenUsageBaseline()
+
+
+def _tokens_used(reportability_context: ReportabilityContext) -> int:
+    return sum(usage.prompt_tokens + usage.completion_tokens for usage in reportability_context.token_usage)
+
+
+def record_completed_request(reportability_context: ReportabilityContext) -> None:
+    """
+    Records the tokens used by a streamed request that finished.
+
+    Args:
+        reportability_context (ReportabilityContext): The state of the request.
+    """
+    _baseline.record_completed(_tokens_used(reportability_context))
+
+
+def record_cancelled_request(reportability_context: ReportabilityContext, reason: str) -> None:
+    """
+    Records a streamed request that was stopped before it finished, along with the tokens that saved.
+
+    Args:
+        reportability_context (ReportabilityContext): The state of the request.
+        reason (str): Why the request stopped: "disconnect" when the client was found to have gone, or "cancelled"
+            when the response task was cancelled.
+    """
+    tokens_used = _tokens_used(reportability_context)
+    tokens_saved = _baseline.estimate_saved(tokens_used)
+    cancelled_requests_counter.add(1, {"reason": reason})
+    tokens_saved_counter.add(tokens_saved, {"reason": reason})
+    logger.info(f"Streamed request stopped ({reason}) after {tokens_used} tokens, about {tokens_saved} tokens saved.")
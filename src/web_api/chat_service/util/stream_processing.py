@@ -1,12 +1,16 @@
+import asyncio
 import logging
 import os
+import time
 
 from enum import Enum
+from opentelemetry import metrics
 from pydantic import BaseModel
+from pydantic_core import to_json
 from semantic_kernel.agents import ChatHistoryAgentThread
 from semantic_kernel.agents.agent import AgentResponseItem
 from semantic_kernel.contents import StreamingChatMessageContent
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
 from constants import EnvironmentVariables, ChatServiceConstants
 from models import (
@@ -14,11 +18,40 @@ from models import (
     AIChatErrorResponse,
     AIChatCompletionDelta,
     AIChatMessageDelta,
+    AIChatRole,
     ReportabilityContext,
 )
+from services import StreamReplayLog, StreamResumeError
+from .fan_in import PrefetchingAsyncIterator
+from .request_cancellation import record_cancelled_request, record_completed_request
 
 
 logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+meter = metrics.get_meter(__name__)
+frames_per_request_histogram = meter.create_histogram(
+    "stream.frames_per_request",
+    description="Number of frames sent to the client per streamed response.",
+)
+frame_bytes_histogram = meter.create_histogram(
+    "stream.frame_bytes",
+    unit="By",
+    description="Size of each frame sent to the client, by the reason it was flushed.",
+)
+frame_gap_histogram = meter.create_histogram(
+    "stream.frame_gap",
+    unit="ms",
+    description="Time between consecutive frames sent to the client.",
+)
+
+DEFAULT_STREAM_BUFFER_SIZE = 5
+DEFAULT_STREAM_FLUSH_BYTES = 2048
+DEFAULT_STREAM_FLUSH_INTERVAL_MS = 50
+DEFAULT_STREAM_HEARTBEAT_SECONDS = 15
+DEFAULT_CLIENT_DISCONNECT_POLL_SECONDS = 1
+# SSE comment line, ignored by clients but keeps proxies from closing an idle connection
+SSE_HEARTBEAT = ": heartbeat\n\n"
+# Chunks read ahead of the client before the orchestrator is paused
+STREAM_READ_AHEAD = 256
 
 
 class StreamingMessageMetadata(Enum):
@@ -30,12 +63,135 @@ class StreamingMessageMetadata(Enum):
     YIELD_TO_USER = "yield_to_user"
     ADD_TO_CHAT_HISTORY = "add_to_chat_history"
     COMBINE_BEFORE_ADDING_TO_HISTORY = "combine_before_adding_to_history"
+    DOCUMENT_REFERENCE = "document_reference"
+
+
+class StreamFlushPolicy:
+    """
+    Decides when buffered chunks are sent to the client as a frame.
+
+    A frame is flushed as soon as any limit is reached: the number of buffered chunks, the number of buffered bytes,
+    or the time since the oldest buffered chunk arrived. The time limit keeps slow agents from stalling the UI, and
+    the size limits keep fast agents from producing many tiny frames.
+    """
+
+    def __init__(self, max_chunks: int = None, max_bytes: int = None, max_latency_ms: float = None) -> None:
+        """
+        Initializes the policy.
+
+        Args:
+            max_chunks (int, optional): Chunks buffered before a flush. Defaults to the STREAM_BUFFER_SIZE environment
+                variable or 5.
+            max_bytes (int, optional): UTF-8 bytes buffered before a flush. Defaults to the STREAM_FLUSH_BYTES
+                environment variable or 2048.
+            max_latency_ms (float, optional): Milliseconds a chunk may wait in the buffer. Defaults to the
+                STREAM_FLUSH_INTERVAL_MS environment variable or 50. Zero disables the timer.
+        """
+        self.max_chunks: int = max_chunks if max_chunks is not None else int(
+            os.getenv(EnvironmentVariables.STREAM_BUFFER_SIZE.value, DEFAULT_STREAM_BUFFER_SIZE)
+        )
+        self.max_bytes: int = max_bytes if max_bytes is not None else int(
+            os.getenv(EnvironmentVariables.STREAM_FLUSH_BYTES.value, DEFAULT_STREAM_FLUSH_BYTES)
+        )
+        max_latency_ms = max_latency_ms if max_latency_ms is not None else float(
+            os.getenv(EnvironmentVariables.STREAM_FLUSH_INTERVAL_MS.value, DEFAULT_STREAM_FLUSH_INTERVAL_MS)
+        )
+        self.max_latency_seconds: Optional[float] = max_latency_ms / 1000 if max_latency_ms > 0 else None
+
+    def flush_reason(self, chunk_count: int, byte_count: int) -> Optional[str]:
+        """
+        Checks the size limits for the buffered chunks.
+
+        Args:
+            chunk_count (int): The number of buffered chunks.
+            byte_count (int): The number of buffered bytes.
+
+        Returns:
+            Optional[str]: "chunks" or "bytes" when that limit is reached, otherwise None.
+        """
+        if chunk_count >= self.max_chunks:
+            return "chunks"
+        if byte_count >= self.max_bytes:
+            return "bytes"
+        return None
+
+    def time_until_flush(self, first_chunk_at: Optional[float]) -> Optional[float]:
+        """
+        Gets how long the stream may wait for another chunk before the buffer must be flushed.
+
+        Args:
+            first_chunk_at (Optional[float]): The monotonic time the oldest buffered chunk arrived, or None if the
+                buffer is empty.
+
+        Returns:
+            Optional[float]: The seconds left, or None to wait indefinitely.
+        """
+        if first_chunk_at is None or self.max_latency_seconds is None:
+            return None
+        return max(0.0, first_chunk_at + self.max_latency_seconds - time.monotonic())
+
+
+class _FrameMetrics:
+    """Records the frames sent for one streamed response."""
+
+    def __init__(self) -> None:
+        self.frames: int = 0
+        self._last_frame_at: Optional[float] = None
+
+    def record(self, frame: str, reason: str) -> None:
+        now = time.monotonic()
+        self.frames += 1
+        frame_bytes_histogram.record(len(frame.encode()), {"reason": reason})
+        if self._last_frame_at is not None:
+            frame_gap_histogram.record((now - self._last_frame_at) * 1000)
+        self._last_frame_at = now
+
+    def finish(self) -> None:
+        frames_per_request_histogram.record(self.frames)
 
 
 def _object_to_json_line(obj: BaseModel):
     return f"{obj.model_dump_json()}\r\n"
 
 
+def _encode_json_string(value: str) -> str:
+    # the serializer the models use, so the escaping is identical and a lone surrogate raises the same
+    # PydanticSerializationError
+    return to_json(value).decode()
+
+
+_ROLE_JSON = {role.value: _encode_json_string(role.value) for role in AIChatRole}
+_ROLE_JSON[None] = "null"
+
+
+def _content_delta_to_json_line(content: str, role: Optional[str]) -> str:
+    """
+    Serializes a content-only delta without building the pydantic models.
+
+    Produces the same line as `_object_to_json_line(AIChatCompletionDelta(delta=AIChatMessageDelta(content=content,
+    role=role)))`, which is the frame sent for every flush of streamed text.
+
+    Args:
+        content (str): The text of the delta.
+        role (Optional[str]): The role of the message sender. Must be None or an AIChatRole value.
+
+    Returns:
+        str: The JSON line for the delta.
+
+    Raises:
+        ValueError: If the role is not an AIChatRole value.
+        PydanticSerializationError: If the content cannot be encoded as UTF-8, for example a lone surrogate.
+    """
+    role_json = _ROLE_JSON.get(role)
+    if role_json is None:
+        # raises the same ValueError as the model for an unknown role
+        role_json = _ROLE_JSON[AIChatRole(role).value]
+    return (
+        f'{{"delta":{{"role":{role_json},"content":{_encode_json_string(content)},"context":null}},'
+        f'"session_state":null,"context":null}}\r\n'
+    )
+
+
 def get_agent_response_item(
         message: str,
         thread: ChatHistoryAgentThread,
@@ -55,6 +211,9 @@ def get_agent_response_item(
               Defaults to True.
             - StreamingMessageMetadata.COMBINE_BEFORE_ADDING_TO_HISTORY (bool, optional): Whether to combine the message
               with previous ones before adding to history. Defaults to True.
+            - StreamingMessageMetadata.DOCUMENT_REFERENCE (str, optional): A short reference to the document the
+              message contains, kept with the message in the chat history so older turns can refer to the document
+              instead of repeating it.
             Additional keyword arguments are included in the metadata dictionary.
 
     Returns:
@@ -95,17 +254,94 @@ async def stream_error_handler(e: Exception | AIChatErrorResponse):
     yield _object_to_json_line(AIChatErrorResponse(error=error))
 
 
-async def stream_processor(reportability_context: ReportabilityContext, streaming_response: AsyncIterator[Any]):
-    """ Processes streaming chat messages and yields them as JSON lines."""
+def _to_sse_event(data: str, event_id: Optional[str] = None) -> str:
+    # frames are single JSON lines, so the data fits one data field once the line ending is removed
+    data = data.rstrip("\r\n")
+    if event_id is None:
+        return f"data: {data}\n\n"
+    return f"id: {event_id}\ndata: {data}\n\n"
+
+
+async def sse_error_handler(e: Exception | AIChatErrorResponse):
+    """ Handles errors that occur during streaming processing, framed as server-sent events."""
+    async for line in stream_error_handler(e):
+        yield _to_sse_event(line)
+
+
+async def sse_stream_processor(
+        replay_log: StreamReplayLog,
+        last_event_id: Optional[str] = None,
+        heartbeat_seconds: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> AsyncIterator[str]:
+    """
+    Sends the frames of a recorded response as server-sent events.
+
+    Every frame is sent with its event id, and a heartbeat comment is sent whenever no frame has been sent for
+    `heartbeat_seconds`. A client that reconnects with the id of the last event it received continues from the next
+    event instead of the start of the response.
+
+    Args:
+        replay_log (StreamReplayLog): The log the response is being recorded to.
+        last_event_id (Optional[str], optional): The Last-Event-ID sent by a reconnecting client. Defaults to sending
+            every frame.
+        heartbeat_seconds (Optional[float], optional): Seconds between heartbeats. Defaults to the
+            STREAM_HEARTBEAT_SECONDS environment variable or 15. Zero disables heartbeats.
+        is_disconnected (Optional[Callable[[], Awaitable[bool]]], optional): Checks whether the client has gone. It is
+            called every CLIENT_DISCONNECT_POLL_SECONDS, and the connection stops following the log once it returns
+            True. Defaults to relying on the server to notice.
+
+    Yields:
+        str: The server-sent events. If the client cannot be resumed, a single error event is sent instead.
+    """
+    if heartbeat_seconds is None:
+        heartbeat_seconds = float(
+            os.getenv(EnvironmentVariables.STREAM_HEARTBEAT_SECONDS.value, DEFAULT_STREAM_HEARTBEAT_SECONDS)
+        )
+    poll_seconds = float(
+        os.getenv(EnvironmentVariables.CLIENT_DISCONNECT_POLL_SECONDS.value, DEFAULT_CLIENT_DISCONNECT_POLL_SECONDS)
+    ) if is_disconnected is not None else 0
+    wake_seconds = min((seconds for seconds in (heartbeat_seconds, poll_seconds) if seconds > 0), default=None)
+    last_sent_at = time.monotonic()
+    next_disconnect_check = last_sent_at + poll_seconds
+    try:
+        after_seq = replay_log.parse_event_id(last_event_id) if last_event_id else 0
+        async for event in replay_log.follow(after_seq, wake_seconds):
+            now = time.monotonic()
+            if event is not None:
+                event_id, data = event
+                yield _to_sse_event(data, event_id)
+                last_sent_at = now
+            elif heartbeat_seconds > 0 and now - last_sent_at >= heartbeat_seconds:
+                yield SSE_HEARTBEAT
+                last_sent_at = now
+            if is_disconnected is not None and now >= next_disconnect_check:
+                next_disconnect_check = now + poll_seconds
+                if await is_disconnected():
+                    logger.info(f"Client disconnected from stream {replay_log.stream_id}.")
+                    return
+    except StreamResumeError as e:
+        logger.warning(f"Unable to resume stream {replay_log.stream_id}: {e}")
+        error_response = AIChatErrorResponse(error=AIChatError(code="stream_resume_error", message=str(e)))
+        async for event in sse_error_handler(error_response):
+            yield event
+
+
+async def stream_processor(
+        reportability_context: ReportabilityContext,
+        streaming_response: AsyncIterator[Any],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+):
+    """
+    Processes streaming chat messages and yields them as JSON lines.
+
+    When `is_disconnected` is given, the client is checked every CLIENT_DISCONNECT_POLL_SECONDS, including while the
+    agents are silent, and the response is stopped once it has gone. Stopping or cancelling the response closes the
+    orchestrator, which cancels the agents and searches still running.
+    """
     def _create_result(buffer, role):
         if buffer and len(buffer) > 0:
-            response_chunk = AIChatCompletionDelta(
-                delta=AIChatMessageDelta(
-                    content="".join(buffer),
-                    role=role,
-                ),
-            )
-            return _object_to_json_line(response_chunk)
+            return _content_delta_to_json_line("".join(buffer), role)
         return None
 
     def _create_context(role, reportability_context: ReportabilityContext):
@@ -118,6 +354,8 @@ async def stream_processor(reportability_context: ReportabilityContext, streamin
             context.update({
                 "recommendations": reportability_context.recommendations,
                 "intent": reportability_context.intent,
+                "intent_source": reportability_context.intent_source,
+                "predicted_intent": reportability_context.predicted_intent,
                 "user_input_needed": reportability_context.user_input_needed,
                 "token_usage": reportability_context.token_usage,
             })
@@ -151,29 +389,101 @@ async def stream_processor(reportability_context: ReportabilityContext, streamin
 
         return documents
 
+    policy = StreamFlushPolicy()
+    frame_metrics = _FrameMetrics()
     buffer = []
+    buffer_bytes = 0
+    first_chunk_at = None
     role = None
-    buffer_size = int(os.getenv(EnvironmentVariables.STREAM_BUFFER_SIZE.value, 5))
-    async for chunk in streaming_response:
-        message = chunk.content
-        flush = chunk.metadata.get(StreamingMessageMetadata.FLUSH.value, False)
-        if message.content and message.content == '':
-            continue
-        buffer.append(message.content)
-        reportability_context.all_chunks += message.content
-        role = message.role  # Use the last role seen in the batch, this should always be the same anyway
-        if len(buffer) == buffer_size or flush:
-            result = _create_result(buffer, role)
-            if result:
-                yield result
-            buffer = []
-    # Yield any remaining content in the buffer
-    result = _create_result(buffer, role)
-    if result:
-        yield result
-
-    context = _create_context(role, reportability_context)
-    if context:
-        yield _object_to_json_line(context)
 
+    def _flush(reason: str) -> Optional[str]:
+        nonlocal buffer, buffer_bytes, first_chunk_at
+        result = _create_result(buffer, role)
+        buffer, buffer_bytes, first_chunk_at = [], 0, None
+        if result:
+            frame_metrics.record(result, reason)
+        return result
+
+    # read the response in the background so the latency timer can flush, and the client can be checked, without
+    # cancelling the orchestrator
+    chunks = PrefetchingAsyncIterator(streaming_response, max_buffered=STREAM_READ_AHEAD)
+    disconnect_poll_seconds = float(
+        os.getenv(EnvironmentVariables.CLIENT_DISCONNECT_POLL_SECONDS.value, DEFAULT_CLIENT_DISCONNECT_POLL_SECONDS)
+    )
+    next_disconnect_check = time.monotonic() + disconnect_poll_seconds
+
+    def _wait_timeout() -> Optional[float]:
+        timeout = policy.time_until_flush(first_chunk_at)
+        if is_disconnected is not None:
+            until_check = max(0.0, next_disconnect_check - time.monotonic())
+            timeout = until_check if timeout is None else min(timeout, until_check)
+        return timeout
+
+    async def _client_disconnected() -> bool:
+        nonlocal next_disconnect_check
+        if is_disconnected is None or time.monotonic() < next_disconnect_check:
+            return False
+        next_disconnect_check = time.monotonic() + disconnect_poll_seconds
+        return await is_disconnected()
+
+    try:
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), _wait_timeout())
+                except asyncio.TimeoutError:
+                    chunk = None
+                except StopAsyncIteration:
+                    break
+
+                if chunk is not None:
+                    message = chunk.content
+                    flush = chunk.metadata.get(StreamingMessageMetadata.FLUSH.value, False)
+                    if message.content and message.content == '':
+                        continue
+                    buffer.append(message.content)
+                    if message.content:
+                        buffer_bytes += len(message.content.encode())
+                    if first_chunk_at is None:
+                        first_chunk_at = time.monotonic()
+                    reportability_context.all_chunks.append(message.content)
+                    role = message.role  # Use the last role seen in the batch, this should always be the same anyway
+                    reason = "flush" if flush else policy.flush_reason(len(buffer), buffer_bytes)
+                    if reason:
+                        result = _flush(reason)
+                        if result:
+                            yield result
+
+                if policy.time_until_flush(first_chunk_at) == 0:
+                    result = _flush("timer")
+                    if result:
+                        yield result
+
+                if await _client_disconnected():
+                    # returning closes the response below, which cancels the agents and searches still running
+                    record_cancelled_request(reportability_context, "disconnect")
+                    frame_metrics.finish()
+                    return
+        finally:
+            await chunks.aclose()
+
+        # Yield any remaining content in the buffer
+        result = _flush("end")
+        if result:
+            yield result
+
+        # background post-processing whose output belongs in the context, such as evaluation recommendations
+        if reportability_context.include_eval_content:
+            await reportability_context.wait_for_pending_tasks()
+        context = _create_context(role, reportability_context)
+        if context:
+            context_line = _object_to_json_line(context)
+            frame_metrics.record(context_line, "context")
+            yield context_line
+        frame_metrics.finish()
+    except (asyncio.CancelledError, GeneratorExit):
+        record_cancelled_request(reportability_context, "cancelled")
+        raise
+
+    record_completed_request(reportability_context)
     logger.debug("All chunks processed: %s", reportability_context.all_chunks)
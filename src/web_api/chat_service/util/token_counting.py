@@ -0,0 +1,88 @@
+import logging
+import math
+import os
+import re
+import tiktoken
+
+from functools import lru_cache
+from typing import Optional
+
+from constants import ChatServiceConstants, EnvironmentVariables
+
+logger = logging.getLogger(ChatServiceConstants.LOGGER_NAME.value + __name__)
+
+# The encoding used by the gpt-4o family of models
+DEFAULT_TOKENIZER_ENCODING = "o200k_base"
+# Rough size of a token in English text, used when the tokenizer encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...]"
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    encoding_name = os.getenv(EnvironmentVariables.TOKENIZER_ENCODING.value, DEFAULT_TOKENIZER_ENCODING)
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        # the encoding file is downloaded on first use, which fails on hosts without internet access unless it was
+        # placed in TIKTOKEN_CACHE_DIR beforehand
+        logger.warning(f"Tokenizer encoding {encoding_name} could not be loaded, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text with the tokenizer of the chat model.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens, or an estimate based on the length of the text if the tokenizer encoding is not
+            available.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shortens a text to at most `max_tokens` tokens, cutting at the end of a sentence where possible.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The maximum number of tokens of the result, including the truncation marker.
+
+    Returns:
+        str: The text unchanged if it fits, otherwise its leading sentences followed by a truncation marker. If even
+            the first sentence does not fit, it is cut mid-sentence.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    if budget <= 0:
+        return ""
+
+    # the token count of a prefix grows with its length, so search for the longest prefix ending a sentence that fits
+    boundaries = [match.start() for match in _SENTENCE_END.finditer(text)]
+    low, high = 0, len(boundaries)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:boundaries[middle - 1]]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    kept = text[:boundaries[low - 1]] if low else _cut_to_tokens(text, budget)
+    return kept + TRUNCATION_MARKER
+
+
+def _cut_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
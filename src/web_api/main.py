@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from dotenv import load_dotenv
-from chat_service.main import stream
+from chat_service.main import stream, chat_service_lifespan
 from nureg_search.main import nureg_search
 from configuration import configure_telemetry
 from reportability_manual_search.main import reportability_manual_search
@@ -9,7 +9,7 @@ from health.main import health_router
 load_dotenv()
 configure_telemetry()
 
-app = FastAPI(debug=True)
+app = FastAPI(debug=True, lifespan=chat_service_lifespan)
 app.include_router(stream, prefix="/chat", tags=["chat"])
 app.include_router(nureg_search, prefix="/search", tags=["search"])
 app.include_router(reportability_manual_search, prefix="/search", tags=["search"])
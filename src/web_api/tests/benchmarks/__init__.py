@@ -0,0 +1,6 @@
+import sys
+import os
+
+# Ensure the chat_service directory is in the Python path so the benchmarks can import the service modules.
+chat_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'chat_service'))
+sys.path.append(chat_service_path)
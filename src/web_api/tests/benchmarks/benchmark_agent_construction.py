@@ -0,0 +1,70 @@
+"""
+Microbenchmark comparing the per-request cost of building agents with and without the cached agent templates.
+
+Run from the src/web_api directory:
+
+    python -m tests.benchmarks.benchmark_agent_construction
+"""
+import os
+import timeit
+
+from . import chat_service_path  # noqa: F401
+
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://benchmark.openai.azure.us/")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")  # pragma: allowlist secret
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "benchmark")
+os.environ.setdefault("AZURE_OPENAI_API_VERSION", "2024-10-21")
+os.environ.setdefault("AZURE_OPENAI_HTTP2", "false")
+
+from semantic_kernel.agents import ChatCompletionAgent  # noqa: E402
+from semantic_kernel.kernel import Kernel  # noqa: E402
+
+from agents import AgentBase, IntentAgent, NRCRecommendationAgent, NuregAgent  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole  # noqa: E402
+from state import MemoryState  # noqa: E402
+
+ITERATIONS = 200
+
+
+def _new_state() -> MemoryState:
+    return MemoryState(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="The reactor scrammed on low water level.")]
+    ))
+
+
+def _build_uncached(agent: AgentBase) -> ChatCompletionAgent:
+    """Builds the agent the way it was built before templates were cached."""
+    kernel = Kernel()
+    for service in agent._services:
+        kernel.add_service(service)
+    for plugin, plugin_name in agent._plugin_defs:
+        kernel.add_plugin(plugin, plugin_name)
+    return ChatCompletionAgent(
+        kernel=kernel,
+        instructions=agent._get_instructions(),
+        arguments=agent._get_kernel_arguments(kernel),
+        name=agent._trace_name,
+    )
+
+
+def _build_cached(agent: AgentBase) -> ChatCompletionAgent:
+    return agent._get_agent()
+
+
+def main() -> None:
+    for agent_class in (IntentAgent, NuregAgent, NRCRecommendationAgent):
+        # Build once so the template cache is warm, mirroring a long running process.
+        agent_class(state=_new_state())._get_agent()
+
+        uncached = timeit.timeit(lambda: _build_uncached(agent_class(state=_new_state())), number=ITERATIONS)
+        cached = timeit.timeit(lambda: _build_cached(agent_class(state=_new_state())), number=ITERATIONS)
+        print(
+            f"{agent_class.__name__:<24} "
+            f"uncached {uncached / ITERATIONS * 1000:8.3f} ms/request  "
+            f"cached {cached / ITERATIONS * 1000:8.3f} ms/request  "
+            f"speedup {uncached / cached:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Microbenchmark comparing the per-token cost of accumulating a streamed answer with string concatenation on the
+context model and with the ChunkBuffer the stream processor now uses.
+
+Run from the src/web_api directory:
+
+    python -m tests.benchmarks.benchmark_chunk_buffer
+"""
+import timeit
+
+from . import chat_service_path  # noqa: F401
+
+from semantic_kernel.kernel_pydantic import KernelBaseModel  # noqa: E402
+
+from models import ReportabilityContext  # noqa: E402
+
+TOKEN_COUNTS = (1_000, 10_000)
+TOKEN = "token "
+REPEATS = 5
+
+
+class _StringContext(KernelBaseModel):
+    """Mirrors the previous `all_chunks: str` field, including the model's assignment validation."""
+    all_chunks: str = ""
+
+
+def _accumulate_string(token_count: int) -> str:
+    context = _StringContext()
+    for _ in range(token_count):
+        context.all_chunks += TOKEN
+    return context.all_chunks
+
+
+def _accumulate_buffer(token_count: int) -> str:
+    context = ReportabilityContext()
+    for _ in range(token_count):
+        context.all_chunks.append(TOKEN)
+    return str(context.all_chunks)
+
+
+def main() -> None:
+    for token_count in TOKEN_COUNTS:
+        string_time = min(timeit.repeat(lambda: _accumulate_string(token_count), number=1, repeat=REPEATS))
+        buffer_time = min(timeit.repeat(lambda: _accumulate_buffer(token_count), number=1, repeat=REPEATS))
+        print(
+            f"{token_count:>6} tokens  "
+            f"str += {string_time / token_count * 1e6:8.3f} us/token  "
+            f"ChunkBuffer {buffer_time / token_count * 1e6:8.3f} us/token  "
+            f"speedup {string_time / buffer_time:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
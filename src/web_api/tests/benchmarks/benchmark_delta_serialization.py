@@ -0,0 +1,59 @@
+"""
+Microbenchmark comparing the cost of serializing a content-only delta frame through the pydantic models with the
+fast path the stream processor now uses.
+
+Frame sizes run up to the default STREAM_FLUSH_BYTES cap, the largest frame the flush policy produces. The benchmark
+exits with an error if the fast path is slower than the models at any of them.
+
+Run from the src/web_api directory:
+
+    python -m tests.benchmarks.benchmark_delta_serialization
+"""
+import sys
+import timeit
+
+from . import chat_service_path  # noqa: F401
+
+from models import AIChatCompletionDelta, AIChatMessageDelta  # noqa: E402
+from util.stream_processing import _content_delta_to_json_line, _object_to_json_line  # noqa: E402
+
+# 340 tokens of 6 characters is 2040 bytes, just under the default STREAM_FLUSH_BYTES of 2048
+FRAME_SIZES = (5, 50, 200, 340)
+TOKEN = "token "
+MIN_SPEEDUP = 1.0
+ROLE = "assistant"
+NUMBER = 20_000
+REPEATS = 5
+
+
+def _serialize_model(content: str) -> str:
+    return _object_to_json_line(AIChatCompletionDelta(delta=AIChatMessageDelta(content=content, role=ROLE)))
+
+
+def _serialize_fast(content: str) -> str:
+    return _content_delta_to_json_line(content, ROLE)
+
+
+def main() -> int:
+    regressions = []
+    for tokens_per_frame in FRAME_SIZES:
+        content = TOKEN * tokens_per_frame
+        assert _serialize_model(content) == _serialize_fast(content)
+        model_time = min(timeit.repeat(lambda: _serialize_model(content), number=NUMBER, repeat=REPEATS))
+        fast_time = min(timeit.repeat(lambda: _serialize_fast(content), number=NUMBER, repeat=REPEATS))
+        print(
+            f"{tokens_per_frame:>4} tokens/frame  "
+            f"pydantic {NUMBER / model_time:>10,.0f} frames/s  "
+            f"fast path {NUMBER / fast_time:>10,.0f} frames/s  "
+            f"speedup {model_time / fast_time:5.1f}x"
+        )
+        if model_time / fast_time < MIN_SPEEDUP:
+            regressions.append(tokens_per_frame)
+    if regressions:
+        print(f"The fast path is slower than the models at {regressions} tokens/frame.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
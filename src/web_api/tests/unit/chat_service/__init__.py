@@ -6,4 +6,4 @@ import os
 # Adjust the path as necessary based on your project structure.
 chat_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'chat_service'))
 print(f"Adding {chat_service_path} to sys.path")
-sys.path.append(chat_service_path)
+sys.path.insert(0, chat_service_path)
@@ -0,0 +1,90 @@
+import pytest
+from types import SimpleNamespace
+from semantic_kernel.functions import KernelFunctionMetadata
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents import AgentBase  # noqa: E402
+from agents.AgentBase import BUDGET_EXHAUSTED_TOOL_RESULT  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, ReportabilityContext, RequestBudget  # noqa: E402
+from state import StateBase  # noqa: E402
+from util import HistoryWindow  # noqa: E402
+
+
+class DummyAgent(AgentBase):
+    def _get_instructions(self) -> str:
+        return "instructions"
+
+    async def invoke_stream(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def patch_services():
+    AgentBase._templates.clear()
+    with patch("agents.AgentBase.ReportabilityServices.get_chat_completion_service", return_value=MagicMock()):
+        yield
+    AgentBase._templates.clear()
+
+
+def test_template_is_shared_per_agent_class():
+    # Arrange
+    state = MagicMock(spec=StateBase)
+    state.get_state.return_value = ReportabilityContext()
+    first = DummyAgent(display_name="Dummy", trace_name="DummyAgent", state=state)
+    second = DummyAgent(display_name="Dummy", trace_name="DummyAgent", state=state)
+
+    # Act
+    with patch("agents.AgentBase.AgentTemplate") as mock_template:
+        first_template = first._get_template()
+        second_template = second._get_template()
+
+    # Assert
+    assert first_template is second_template
+    mock_template.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_track_token_usage_reports_history_savings_once():
+    # Arrange
+    context = ReportabilityContext(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Hello")], session_state="session123"
+    ))
+    state = MagicMock(spec=StateBase)
+    state.get_state.return_value = context
+    agent = DummyAgent(display_name="Dummy", trace_name="DummyAgent", state=state)
+    response = SimpleNamespace(metadata={"usage": SimpleNamespace(prompt_tokens=100, completion_tokens=10)})
+    window = HistoryWindow(context.message_history.messages, original_tokens=500, tokens=100)
+
+    # Act
+    with patch("agents.AgentBase.HistoryManager") as mock_history_manager:
+        mock_history_manager.return_value.get_window = AsyncMock(return_value=window)
+        messages = await agent._get_history_messages()
+    agent.track_token_usage(response)
+    agent.track_token_usage(response)
+
+    # Assert
+    assert messages == context.message_history.messages
+    assert [usage.prompt_tokens_saved for usage in context.token_usage] == [400, 0]
+
+
+@pytest.mark.asyncio
+async def test_enforce_budget_refuses_tool_calls_once_exhausted():
+    # Arrange
+    context = ReportabilityContext()
+    context.set_budget(RequestBudget(max_tool_calls=1))
+    state = MagicMock(spec=StateBase)
+    state.get_state.return_value = context
+    agent = DummyAgent(display_name="Dummy", trace_name="DummyAgent", state=state)
+    tool_calls = [MagicMock(function_result=None, terminate=False) for _ in range(3)]
+    for tool_call in tool_calls:
+        tool_call.function.metadata = KernelFunctionMetadata(name="search", is_prompt=False)
+    next_call = AsyncMock()
+
+    # Act
+    for tool_call in tool_calls:
+        await agent._enforce_budget(tool_call, next_call)
+
+    # Assert
+    next_call.assert_awaited_once_with(tool_calls[0])
+    assert tool_calls[1].function_result.value == BUDGET_EXHAUSTED_TOOL_RESULT
+    assert [tool_call.terminate for tool_call in tool_calls] == [False, False, True]
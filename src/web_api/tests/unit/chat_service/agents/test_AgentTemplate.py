@@ -0,0 +1,58 @@
+import pytest
+from semantic_kernel.functions.kernel_function_decorator import kernel_function
+from semantic_kernel.kernel import Kernel
+
+from agents import AgentTemplate  # noqa: E402
+
+
+class DummyPlugin:
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    @kernel_function(name="get_value", description="Returns the plugin value.")
+    async def get_value(self, suffix: str) -> str:
+        return self.value + suffix
+
+
+@pytest.fixture
+def template():
+    return AgentTemplate([(DummyPlugin("template"), "DummyPlugin")], "instructions", "DummyAgent")
+
+
+@pytest.mark.asyncio
+async def test_bind_plugin_calls_request_instance(template):
+    # Arrange
+    plugin = template.bind_plugin("DummyPlugin", DummyPlugin("request"))
+
+    # Act
+    result = await plugin["get_value"].method(suffix="!")
+
+    # Assert
+    assert result == "request!"
+
+
+def test_bind_plugin_reuses_function_metadata(template):
+    # Act
+    first = template.bind_plugin("DummyPlugin", DummyPlugin("one"))
+    second = template.bind_plugin("DummyPlugin", DummyPlugin("two"))
+
+    # Assert
+    assert first["get_value"].metadata is second["get_value"].metadata
+    assert first["get_value"].method.__self__ is not second["get_value"].method.__self__
+
+
+def test_create_agent_binds_kernel(template):
+    # Arrange
+    first_kernel = Kernel()
+    second_kernel = Kernel()
+
+    # Act
+    first = template.create_agent(first_kernel)
+    second = template.create_agent(second_kernel)
+
+    # Assert
+    assert first.kernel is first_kernel
+    assert second.kernel is second_kernel
+    assert first.id != second.id
+    assert first.name == "DummyAgent"
+    assert first.instructions == "instructions"
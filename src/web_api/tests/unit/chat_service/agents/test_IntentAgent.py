@@ -0,0 +1,78 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+
+from agents import AgentBase, IntentAgent  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, Intent, ReportabilityContext  # noqa: E402
+from state import StateBase  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def patch_services():
+    AgentBase._templates.clear()
+    with patch("agents.AgentBase.ReportabilityServices.get_chat_completion_service", return_value=MagicMock()):
+        yield
+    AgentBase._templates.clear()
+
+
+def _agent(content: str) -> IntentAgent:
+    context = ReportabilityContext(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content=content)], session_state="session123"
+    ))
+    state = MagicMock(spec=StateBase)
+    state.get_state.return_value = context
+    return IntentAgent(state=state)
+
+
+@pytest.mark.asyncio
+async def test_fast_path_sets_intent_without_calling_the_agent():
+    # Arrange
+    agent = _agent("Is a reactor trip reportable under 10 CFR 50.72?")
+
+    # Act
+    with patch.dict(os.environ, {"INTENT_FAST_PATH": "on"}), patch.object(agent, "_get_agent") as mock_get_agent:
+        responses = [response async for response in await agent.invoke_stream()]
+
+    # Assert
+    state = agent._state.get_state()
+    assert responses == []
+    assert state.intent == Intent.REPORTABILITY
+    assert state.intent_source == "rules"
+    mock_get_agent.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_shadow_mode_keeps_prediction_and_calls_the_agent():
+    # Arrange
+    agent = _agent("Is a reactor trip reportable under 10 CFR 50.72?")
+
+    # Act
+    with patch.dict(os.environ, {"INTENT_FAST_PATH": "shadow"}), \
+            patch.object(agent, "_get_agent") as mock_get_agent, \
+            patch.object(agent, "_get_history_messages", return_value=[]):
+        await agent.invoke_stream()
+
+    # Assert
+    state = agent._state.get_state()
+    assert state.predicted_intent == Intent.REPORTABILITY
+    assert state.intent == ""
+    assert state.intent_source == "llm"
+    mock_get_agent.return_value.invoke_stream.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_fast_path_defers_uncertain_messages_to_the_agent():
+    # Arrange
+    agent = _agent("Hello there")
+
+    # Act
+    with patch.dict(os.environ, {"INTENT_FAST_PATH": "on"}), \
+            patch.object(agent, "_get_agent") as mock_get_agent, \
+            patch.object(agent, "_get_history_messages", return_value=[]):
+        await agent.invoke_stream()
+
+    # Assert
+    state = agent._state.get_state()
+    assert state.predicted_intent is None
+    assert state.intent_source == "llm"
+    mock_get_agent.return_value.invoke_stream.assert_called_once()
@@ -0,0 +1,38 @@
+import os
+import pytest
+from unittest.mock import MagicMock, patch
+
+from agents import AgentBase, NRCRecommendationAgent  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, ReportabilityContext  # noqa: E402
+from state import StateBase  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def patch_services():
+    AgentBase._templates.clear()
+    with patch("agents.AgentBase.ReportabilityServices.get_chat_completion_service", return_value=MagicMock()):
+        yield
+    AgentBase._templates.clear()
+
+
+def _state() -> StateBase:
+    context = ReportabilityContext(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Is a reactor trip reportable?")],
+        session_state="session123"
+    ))
+    state = MagicMock(spec=StateBase)
+    state.get_state.return_value = context
+    return state
+
+
+@pytest.mark.parametrize("search_all, plugin_names", [
+    ("false", ["NuregPlugin", "ReportabilityManualPlugin", "TSNaivePlugin", "UFSARNaivePlugin"]),
+    ("true", ["MultiIndexSearchPlugin"]),
+])
+def test_registers_either_per_index_search_or_search_all(search_all, plugin_names):
+    # Act
+    with patch.dict(os.environ, {"NRC_RECOMMENDATION_SEARCH_ALL": search_all}):
+        agent = NRCRecommendationAgent(state=_state())
+
+    # Assert
+    assert [plugin_name for _, plugin_name in agent._plugin_defs] == plugin_names
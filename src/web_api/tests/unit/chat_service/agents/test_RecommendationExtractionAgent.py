@@ -0,0 +1,68 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from agents import AgentBase, RecommendationExtractionAgent  # noqa: E402
+from caching import MemoryCache  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, Recommendation  # noqa: E402
+from state import PersistentState  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def patch_services():
+    AgentBase._templates.clear()
+    with patch("agents.AgentBase.ReportabilityServices.get_chat_completion_service", return_value=MagicMock()):
+        yield
+    AgentBase._templates.clear()
+
+
+def _request(content: str) -> AIChatRequest:
+    return AIChatRequest(messages=[AIChatMessage(role=AIChatRole.USER, content=content)], session_state="session-1")
+
+
+def _response(content: str) -> MagicMock:
+    response = MagicMock()
+    response.message.content = content
+    response.metadata = {}
+    return response
+
+
+async def _invoke(agent: RecommendationExtractionAgent, content: str) -> None:
+    with patch.object(agent, "_get_agent") as mock_get_agent:
+        mock_get_agent.return_value.get_response = AsyncMock(return_value=_response(content))
+        await agent.invoke()
+
+
+@pytest.mark.asyncio
+async def test_invoke_stores_recommendations_that_are_saved_with_the_session():
+    # Arrange
+    store = MemoryCache("session_state")
+    state = PersistentState(_request("Is a reactor trip reportable?"), store)
+    state.get_state().message_history.add_assistant_message("Reportable under 50.72(b)(2)(iv)(B).")
+    content = json.dumps([{"regulation_name": "50.72(b)(2)(iv)(B)", "confidence_score": 0.9, "reasoning": "RPS"}])
+
+    # Act
+    await _invoke(RecommendationExtractionAgent(state=state), content)
+    await state.save()
+
+    # Assert
+    assert state.get_state().recommendations == [
+        Recommendation(regulation_name="50.72(b)(2)(iv)(B)", confidence_score=0.9, reasoning="RPS")
+    ]
+    next_turn = PersistentState(_request("Why?"), store)
+    await next_turn.load()
+    assert next_turn.get_state().recommendations == state.get_state().recommendations
+
+
+@pytest.mark.asyncio
+async def test_invoke_rejects_items_that_are_not_recommendations():
+    # Arrange
+    state = PersistentState(_request("Is a reactor trip reportable?"), MemoryCache("session_state"))
+    state.get_state().message_history.add_assistant_message("Reportable.")
+
+    # Act
+    with pytest.raises(ValueError, match="not a list of recommendations"):
+        await _invoke(RecommendationExtractionAgent(state=state), json.dumps([{"regulation_name": "50.72"}]))
+
+    # Assert
+    assert state.get_state().recommendations == []
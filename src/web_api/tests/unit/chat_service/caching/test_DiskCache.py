@@ -0,0 +1,98 @@
+import itertools
+import pytest
+import threading
+from unittest.mock import patch
+
+from caching import DiskCache, create_cache  # noqa: E402
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "test.sqlite3")
+
+
+def test_values_round_trip_as_json(cache_path):
+    # Arrange
+    cache = DiskCache("test", cache_path)
+
+    # Act
+    cache.set("key", [{"id": "doc1", "score": 0.5}])
+
+    # Assert
+    assert cache.get("key") == [{"id": "doc1", "score": 0.5}]
+
+
+def test_entries_survive_reopening(cache_path):
+    # Arrange
+    DiskCache("test", cache_path).set("key", "value")
+
+    # Act
+    result = DiskCache("test", cache_path).get("key")
+
+    # Assert
+    assert result == "value"
+
+
+def test_least_recently_used_entry_is_evicted(cache_path):
+    # Arrange
+    cache = DiskCache("test", cache_path, max_entries=2)
+    with patch("caching.DiskCache.time.time", side_effect=itertools.count(1.0)):
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.set("c", 3)
+
+        # Assert
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+
+def test_expired_entry_is_not_returned(cache_path):
+    # Arrange
+    cache = DiskCache("test", cache_path, ttl_seconds=10)
+    with patch("caching.DiskCache.time.time", return_value=100.0):
+        cache.set("key", "value")
+
+    # Act
+    with patch("caching.DiskCache.time.time", return_value=111.0):
+        result = cache.get("key")
+
+    # Assert
+    assert result is None
+
+
+def test_create_cache_selects_backend(cache_path):
+    # Act / Assert
+    assert create_cache("test", "none", 10, 10) is None
+    assert isinstance(create_cache("test", "disk", 10, 10, cache_path), DiskCache)
+    with pytest.raises(ValueError):
+        create_cache("test", "disk", 10, 10)
+    with pytest.raises(ValueError):
+        create_cache("test", "redis", 10, 10)
+
+
+@pytest.mark.asyncio
+async def test_async_access_runs_off_the_event_loop(cache_path):
+    # Arrange
+    cache = DiskCache("test", cache_path)
+    threads = []
+    get = cache._get
+
+    def record_thread(key):
+        threads.append(threading.current_thread())
+        return get(key)
+
+    # Act
+    await cache.aset("key", {"id": "doc1"})
+    with patch.object(cache, "_get", side_effect=record_thread):
+        value = await cache.aget("key")
+        missing = await cache.aget("missing")
+
+    # Assert
+    assert value == {"id": "doc1"}
+    assert missing is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert threading.main_thread() not in threads
@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from caching import MemoryCache  # noqa: E402
+
+
+def test_get_returns_stored_value():
+    # Arrange
+    cache = MemoryCache("test")
+    cache.set("key", "value")
+
+    # Act
+    result = cache.get("key")
+
+    # Assert
+    assert result == "value"
+    assert cache.hits == 1
+    assert cache.misses == 0
+
+
+def test_get_counts_misses():
+    # Arrange
+    cache = MemoryCache("test")
+
+    # Act
+    result = cache.get("missing")
+
+    # Assert
+    assert result is None
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    # Arrange
+    cache = MemoryCache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    # Act
+    cache.set("c", 3)
+
+    # Assert
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_expired_entry_is_not_returned():
+    # Arrange
+    cache = MemoryCache("test", ttl_seconds=10)
+    with patch("caching.MemoryCache.time.monotonic", return_value=100.0):
+        cache.set("key", "value")
+
+    # Act
+    with patch("caching.MemoryCache.time.monotonic", return_value=111.0):
+        result = cache.get("key")
+
+    # Assert
+    assert result is None
+    assert len(cache) == 0
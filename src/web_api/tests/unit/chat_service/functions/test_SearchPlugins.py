@@ -1,9 +1,12 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from azure.search.documents.aio import SearchClient
+from azure.search.documents.models import VectorizedQuery
 
-from functions import SearchPluginsBase  # noqa: E402
-from models import ReportabilityContext  # noqa: E402
+from caching import MemoryCache  # noqa: E402
+from functions.SearchPlugins import Index, NuregPlugin, SearchPluginsBase  # noqa: E402
+from models import NaiveSearch, ReportabilityContext, SearchConfiguration, SearchType  # noqa: E402
 
 
 class DummyConfig:
@@ -19,6 +22,11 @@ class DummyConfig:
         self.threshold = 0.5
 
 
+class DummySearchPlugin(SearchPluginsBase):
+    async def get_documents(self, search_query: str) -> str:
+        return ""
+
+
 def get_mock_search_config():
     return {"nureg": DummyConfig(), "reportability_manual": DummyConfig()}
 
@@ -40,7 +48,7 @@ async def test_init_loads_config(mock_load_config, mock_context):
     dummy_config = {"nureg": MagicMock()}
     mock_load_config.return_value = dummy_config
     # Act
-    plugin = SearchPluginsBase(mock_context)
+    plugin = DummySearchPlugin(mock_context)
     # Assert
     assert plugin._search_configurations == dummy_config
     assert plugin._reportability_context == mock_context
@@ -48,14 +56,14 @@ async def test_init_loads_config(mock_load_config, mock_context):
 
 @patch("os.path.exists", return_value=False)
 def test_load_configuration_file_not_found(mock_exists):
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     with pytest.raises(FileNotFoundError):
         plugin._load_configuration()
 
 
 @pytest.mark.asyncio
 async def test_search_results_fulltext(mock_search_config):
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     search_client = AsyncMock(spec=SearchClient)
     search_client.search = AsyncMock(return_value="fulltext_results")
     config = mock_search_config["nureg"]
@@ -69,7 +77,7 @@ async def test_search_results_fulltext(mock_search_config):
 
 @pytest.mark.asyncio
 async def test_search_results_vector(mock_search_config):
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     search_client = AsyncMock(spec=SearchClient)
     search_client.search = AsyncMock(return_value="vector_results")
     config = mock_search_config["nureg"]
@@ -83,7 +91,7 @@ async def test_search_results_vector(mock_search_config):
 
 @pytest.mark.asyncio
 async def test_search_results_hybrid(mock_search_config):
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     search_client = AsyncMock(spec=SearchClient)
     search_client.search = AsyncMock(return_value="hybrid_results")
     config = mock_search_config["nureg"]
@@ -95,9 +103,27 @@ async def test_search_results_hybrid(mock_search_config):
     search_client.search.assert_awaited_once()
 
 
+@pytest.mark.asyncio
+async def test_search_results_uses_precomputed_vector(mock_search_config):
+    # Arrange
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
+    search_client = AsyncMock(spec=SearchClient)
+    search_client.search = AsyncMock(return_value="vector_results")
+    config = mock_search_config["nureg"]
+    config.search_type = SearchType.Hybrid
+
+    # Act
+    await plugin._search_results(search_client, config, "query", vector=[0.1, 0.2])
+
+    # Assert
+    vector_query = search_client.search.call_args.kwargs["vector_queries"][0]
+    assert isinstance(vector_query, VectorizedQuery)
+    assert vector_query.vector == [0.1, 0.2]
+
+
 @pytest.mark.asyncio
 async def test_search_results_invalid_type(mock_search_config):
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     search_client = AsyncMock(spec=SearchClient)
     config = mock_search_config["nureg"]
     config.search_type = "Invalid"
@@ -106,7 +132,7 @@ async def test_search_results_invalid_type(mock_search_config):
 
 
 def test_process_results_adds_new_results(mock_context):
-    plugin = SearchPluginsBase(mock_context, {})
+    plugin = DummySearchPlugin(mock_context, {})
     dummy_result = MagicMock()
     dummy_result.id = "doc1"
     dummy_result.to_search_result.return_value = MagicMock(document_id="doc1")
@@ -116,20 +142,176 @@ def test_process_results_adds_new_results(mock_context):
 
 
 def test_process_results_skips_existing(mock_context):
-    plugin = SearchPluginsBase(mock_context, {})
+    plugin = DummySearchPlugin(mock_context, {})
     dummy_result = MagicMock()
     dummy_result.id = "doc1"
     dummy_result.to_search_result.return_value = MagicMock(document_id="doc1")
-    mock_context.plugin_results.append(MagicMock(document_id="doc1"))
+    mock_context.add_plugin_result(MagicMock(id="doc1"))
     results = plugin._process_results([dummy_result], "query")
     assert results == []
 
 
+def test_process_results_returns_restored_results_once(mock_context):
+    plugin = DummySearchPlugin(mock_context, {})
+    restored = MagicMock(id="doc1")
+    mock_context.add_plugin_result(restored)
+    mock_context._restored_plugin_result_ids.add("doc1")
+    dummy_result = MagicMock()
+    dummy_result.id = "doc1"
+    first = plugin._process_results([dummy_result], "query")
+    second = plugin._process_results([dummy_result], "query")
+    assert first == [restored]
+    assert second == []
+
+
+def get_search_configuration():
+    return SearchConfiguration(
+        index_name_setting="NUREG_INDEX",
+        index_name="nureg-index",
+        search_type="Vector",
+        k_nearest_neighbors=3,
+        top=5,
+        search_fields=["field1"],
+        select_fields=["field1"],
+        vector_fields="vector",
+        threshold=0.5
+    )
+
+
+def test_normalize_query_ignores_case_whitespace_and_punctuation():
+    # Act
+    first = SearchPluginsBase._normalize_query("  Reactor   SCRAM on low level? ")
+    second = SearchPluginsBase._normalize_query("reactor scram on low level")
+
+    # Assert
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_get_search_results_uses_cached_results(mock_context):
+    # Arrange
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
+    plugin._search_configurations = {"nureg": get_search_configuration()}
+    plugin._reportability_context = mock_context
+    plugin._result_cache = MemoryCache("test")
+    plugin._query_embeddings = None
+    index = MagicMock(index_name="nureg")
+    index.model_class.model_validate.side_effect = lambda data: MagicMock(id=data["id"])
+    plugin._result_cache.set(
+        plugin._get_cache_key(index, plugin._search_configurations["nureg"], "Reactor scram"), [{"id": "doc1"}]
+    )
+
+    # Act
+    with patch("functions.SearchPlugins.ReportabilityServices.lease_ai_search_client") as mock_lease:
+        results = await plugin._get_search_results(index, "reactor  scram?")
+
+    # Assert
+    mock_lease.assert_not_called()
+    assert [result.id for result in results] == ["doc1"]
+    assert results[0].search_query == "reactor  scram?"
+
+
+@pytest.mark.asyncio
+async def test_get_search_results_populates_cache(mock_context):
+    # Arrange
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
+    plugin._search_configurations = {"nureg": get_search_configuration()}
+    plugin._reportability_context = mock_context
+    plugin._result_cache = MemoryCache("test")
+    plugin._query_embeddings = None
+    index = MagicMock(index_name="nureg")
+    result = MagicMock(id="doc1")
+    result.model_dump.return_value = {"id": "doc1"}
+    plugin._search_results = AsyncMock()
+    plugin._convert_results = AsyncMock(return_value=[result])
+
+    # Act
+    with patch("functions.SearchPlugins.ReportabilityServices.lease_ai_search_client") as mock_lease:
+        mock_lease.return_value.__aenter__.return_value = MagicMock()
+        await plugin._get_search_results(index, "reactor scram")
+
+    # Assert
+    mock_lease.assert_called_once_with("nureg-index")
+    assert len(plugin._result_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_all_merges_results_by_rank_within_each_index(mock_context):
+    # Arrange
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
+    # hybrid scores are far smaller than vector scores, so a raw score sort would put every manual result first
+    results_by_index = {
+        Index.NUREG: [MagicMock(id="nureg2", search_score=0.02), MagicMock(id="nureg1", search_score=0.03)],
+        Index.REPORTABILITY_MANUAL: [
+            MagicMock(id="manual1", search_score=0.9),
+            MagicMock(id="manual2", search_score=0.8),
+        ],
+    }
+
+    async def get_search_results(index, search_query):
+        return results_by_index[index]
+    plugin._get_search_results = AsyncMock(side_effect=get_search_results)
+
+    # Act
+    results = await plugin.search_all("reactor scram", indexes=list(results_by_index), timeout_seconds=1)
+
+    # Assert
+    assert [result.id for result in results] == ["nureg1", "manual1", "nureg2", "manual2"]
+
+
+@pytest.mark.asyncio
+async def test_search_all_skips_slow_and_failing_indexes(mock_context):
+    # Arrange
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
+
+    async def get_search_results(index, search_query):
+        if index == Index.NUREG:
+            await asyncio.sleep(5)
+        if index == Index.TS_NAIVE_SEARCH:
+            raise RuntimeError("index unavailable")
+        return [MagicMock(id=index.index_name, search_score=0.5)]
+    plugin._get_search_results = AsyncMock(side_effect=get_search_results)
+
+    # Act
+    results = await plugin.search_all("reactor scram", timeout_seconds=0.05)
+
+    # Assert
+    assert sorted(result.id for result in results) == ["reportability_manual", "ufsar_naive_search"]
+
+
+@pytest.mark.asyncio
+async def test_get_documents_removes_dropped_results_from_context(mock_context):
+    # Arrange
+    plugin = NuregPlugin.__new__(NuregPlugin)
+    plugin._search_configurations = {"nureg": get_search_configuration().model_copy(update={"max_tokens": 200})}
+    plugin._reportability_context = mock_context
+    results = [
+        NaiveSearch(id=f"doc{i}", chunk_id=f"doc{i}", title="Title", url="url", content="Content. " * 60,
+                    search_score=1 - i / 10)
+        for i in range(3)
+    ]
+    for result in results:
+        mock_context.add_plugin_result(result)
+    plugin._get_search_results = AsyncMock(return_value=results)
+
+    # Act
+    text = await plugin.get_documents("reactor scram")
+
+    # Assert
+    assert "Document Id: doc0" in text
+    assert "Document Id: doc2" not in text
+    assert [result.id for result in mock_context.plugin_results] == [
+        result.id for result in results if f"Document Id: {result.id}" in text
+    ]
+    assert not mock_context.has_plugin_result("doc2")
+
+
 @pytest.mark.asyncio
 async def test_convert_results_filters_by_threshold():
-    plugin = SearchPluginsBase.__new__(SearchPluginsBase)
+    plugin = DummySearchPlugin.__new__(DummySearchPlugin)
     dummy_model = MagicMock()
-    dummy_model.model_validate = MagicMock(return_value="model_instance")
+    model_instance = MagicMock()
+    dummy_model.model_validate = MagicMock(return_value=model_instance)
     dummy_result = {"@search.score": 0.8}
     dummy_result2 = {"@search.score": 0.3}
     results = [dummy_result, dummy_result2]
@@ -138,7 +320,8 @@ async def test_convert_results_filters_by_threshold():
         for r in results:
             yield r
     result = await plugin._convert_results(0.5, async_gen(), "query", dummy_model)
-    assert result == ["model_instance"]
+    assert result == [model_instance]
+    assert model_instance.search_score == 0.8
     dummy_model.model_validate.assert_called_once_with(dummy_result)
 
     if __name__ == "__main__":
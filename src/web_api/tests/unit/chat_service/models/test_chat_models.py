@@ -97,3 +97,13 @@ def test_aichatcompletiondelta_model_validation():
     # Act / Assert
     AIChatCompletionDelta.model_validate_json(json.dumps(manual_data))  # Should not raise an exception
     assert_missing_required_fields_raises(AIChatCompletionDelta, manual_data)
+
+
+def test_aichatrequest_get_user_id():
+    # Arrange
+    messages = [{"role": "user", "content": "Hello"}]
+
+    # Act / Assert
+    assert AIChatRequest.model_validate({"messages": messages, "context": {"user": {"id": 42}}}).get_user_id() == "42"
+    assert AIChatRequest.model_validate({"messages": messages, "context": {"user": {}}}).get_user_id() is None
+    assert AIChatRequest.model_validate({"messages": messages}).get_user_id() is None
@@ -0,0 +1,68 @@
+import pytest
+from pydantic import BaseModel
+
+from models import ChunkBuffer  # noqa: E402
+
+
+def test_chunk_buffer_joins_appended_chunks():
+    # Arrange
+    buffer = ChunkBuffer()
+
+    # Act
+    for chunk in ["The ", "reactor ", "", None, "scrammed."]:
+        buffer.append(chunk)
+
+    # Assert
+    assert str(buffer) == "The reactor scrammed."
+    assert len(buffer) == len("The reactor scrammed.")
+    assert buffer == "The reactor scrammed."
+
+
+def test_chunk_buffer_rejoins_after_append():
+    # Arrange
+    buffer = ChunkBuffer("first")
+    assert str(buffer) == "first"
+
+    # Act
+    buffer += " second"
+
+    # Assert
+    assert str(buffer) == "first second"
+
+
+def test_chunk_buffer_caps_size():
+    # Arrange
+    buffer = ChunkBuffer(max_chars=8)
+
+    # Act
+    buffer.append("12345")
+    buffer.append("6789")
+    buffer.append("0")
+
+    # Assert
+    assert str(buffer) == "12345678"
+    assert buffer.truncated
+
+
+def test_chunk_buffer_is_empty_by_default():
+    # Act
+    buffer = ChunkBuffer()
+
+    # Assert
+    assert not buffer
+    assert buffer == ""
+
+
+def test_chunk_buffer_validates_and_serializes_as_string():
+    # Arrange
+    class Model(BaseModel):
+        text: ChunkBuffer
+
+    # Act
+    model = Model.model_validate({"text": "streamed"})
+
+    # Assert
+    assert isinstance(model.text, ChunkBuffer)
+    assert model.model_dump() == {"text": "streamed"}
+    with pytest.raises(ValueError):
+        Model.model_validate({"text": 1})
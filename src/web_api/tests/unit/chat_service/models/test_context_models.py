@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from semantic_kernel.contents import ChatHistory
 from semantic_kernel.agents import ChatHistoryAgentThread
@@ -5,8 +6,11 @@ from models import (
     AIChatRequest,
     AIChatRole,
     AIChatMessage,
+    NaiveSearch,
+    Recommendation,
     ReportabilityContext,
 )
+from models.context_models import DOCUMENT_REFERENCE_METADATA
 
 
 @pytest.fixture
@@ -51,3 +55,227 @@ def test_reportability_context_get_agent_thread(ai_chat_request):
     # Assert
     assert isinstance(agent_thread, ChatHistoryAgentThread)
     assert agent_thread.id == "session123"
+
+
+def _naive_search(document_id: str) -> NaiveSearch:
+    return NaiveSearch(id=document_id, chunk_id=document_id, title="Title", url="url", content="content")
+
+
+def test_reportability_context_add_plugin_result_skips_duplicates():
+    # Arrange
+    context = ReportabilityContext()
+
+    # Act
+    added = [context.add_plugin_result(_naive_search(document_id)) for document_id in ("doc1", "doc2", "doc1")]
+
+    # Assert
+    assert added == [True, True, False]
+    assert [result.id for result in context.plugin_results] == ["doc1", "doc2"]
+    assert context.has_plugin_result("doc2")
+    assert context.get_plugin_result("doc3") is None
+
+
+def test_reportability_context_indexes_initial_plugin_results():
+    # Arrange
+    context = ReportabilityContext(plugin_results=[_naive_search("doc1")])
+
+    # Act
+    added = context.add_plugin_result(_naive_search("doc1"))
+
+    # Assert
+    assert not added
+    assert context.get_plugin_result("doc1") is context.plugin_results[0]
+
+
+def test_reportability_context_mark_plugin_results_cited():
+    # Arrange
+    context = ReportabilityContext()
+    for document_id in ("doc1", "doc2", "doc3"):
+        context.add_plugin_result(_naive_search(document_id))
+
+    # Act
+    context.mark_plugin_results_cited(["doc1", "doc3", "unknown"])
+
+    # Assert
+    assert [result.cited for result in context.get_plugin_results(NaiveSearch)] == [True, False, True]
+
+
+def test_reportability_context_truncate_plugin_results():
+    # Arrange
+    context = ReportabilityContext()
+    for document_id in ("doc1", "doc2", "doc3"):
+        context.add_plugin_result(_naive_search(document_id))
+
+    # Act
+    context.truncate_plugin_results(1)
+
+    # Assert
+    assert [result.id for result in context.plugin_results] == ["doc1"]
+    assert not context.has_plugin_result("doc2")
+    assert context.add_plugin_result(_naive_search("doc3"))
+
+
+class _TechSpecSearch(NaiveSearch):
+    pass
+
+
+def test_reportability_context_get_plugin_results_by_type():
+    # Arrange
+    context = ReportabilityContext(plugin_results=[_naive_search("doc1")])
+    context.add_plugin_result(_TechSpecSearch(id="doc2", chunk_id="doc2", title="Title", url="url", content="content"))
+    context.add_plugin_result(_naive_search("doc3"))
+    context.add_plugin_result(_naive_search("doc4"))
+
+    # Act
+    context.remove_plugin_results(["doc3"])
+    context.truncate_plugin_results(2)
+
+    # Assert
+    assert [result.id for result in context.get_plugin_results(_TechSpecSearch)] == ["doc2"]
+    assert [result.id for result in context.get_plugin_results(NaiveSearch)] == ["doc1", "doc2"]
+    assert [result.id for result in context._plugin_results_by_type[NaiveSearch]] == ["doc1"]
+    assert ReportabilityContext().get_plugin_results(NaiveSearch) == []
+
+
+@pytest.mark.asyncio
+async def test_reportability_context_wait_for_pending_tasks():
+    # Arrange
+    context = ReportabilityContext()
+
+    async def extract():
+        await asyncio.sleep(0)
+        context.recommendations.append("recommendation")
+
+    async def fail():
+        raise RuntimeError("extraction failed")
+    context.add_pending_task(asyncio.create_task(extract()))
+    context.add_pending_task(asyncio.create_task(fail()))
+
+    # Act
+    await context.wait_for_pending_tasks()
+
+    # Assert
+    assert context.recommendations == ["recommendation"]
+
+
+def test_reportability_context_remove_plugin_results():
+    # Arrange
+    context = ReportabilityContext()
+    for document_id in ("doc1", "doc2", "doc3"):
+        context.add_plugin_result(_naive_search(document_id))
+    context._restored_plugin_result_ids.add("doc2")
+
+    # Act
+    context.remove_plugin_results(["doc2", "unknown"])
+
+    # Assert
+    assert [result.id for result in context.plugin_results] == ["doc1", "doc3"]
+    assert not context.has_plugin_result("doc2")
+    assert context.take_restored_plugin_result("doc2") is None
+    assert context.add_plugin_result(_naive_search("doc2"))
+
+
+def test_reportability_context_snapshot_round_trip(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+    cited = _naive_search("doc1")
+    cited.cited = True
+    context.add_plugin_result(cited)
+    context.recommendations.append(Recommendation(regulation_name="50.72", confidence_score=0.9, reasoning="why"))
+    follow_up = AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="And then?")], session_state="session123"
+    )
+
+    # Act
+    restored = ReportabilityContext(chat_request=follow_up)
+    restored.restore_snapshot(context.to_snapshot())
+
+    # Assert
+    assert [message.content for message in restored.message_history.messages] == [
+        "Hello", "Hi, how can I help?", "And then?"
+    ]
+    assert isinstance(restored.get_plugin_result("doc1"), NaiveSearch)
+    assert restored.get_plugin_result("doc1").cited is False
+    assert restored.recommendations[0].regulation_name == "50.72"
+
+
+def test_reportability_context_snapshot_keeps_document_references(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+    context.add_document_to_history("NUREG Section 3.2 Entry: ...", "3.2.1 (id: doc1)")
+
+    # Act
+    restored = ReportabilityContext()
+    restored.restore_snapshot(context.to_snapshot())
+
+    # Assert
+    document_message = restored.message_history.messages[-1]
+    assert document_message.content == "NUREG Section 3.2 Entry: ..."
+    assert document_message.metadata[DOCUMENT_REFERENCE_METADATA] == "3.2.1 (id: doc1)"
+    assert DOCUMENT_REFERENCE_METADATA not in restored.message_history.messages[0].metadata
+
+
+def test_reportability_context_restore_snapshot_without_history(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+    context.add_plugin_result(_naive_search("doc1"))
+
+    # Act
+    restored = ReportabilityContext(chat_request=ai_chat_request)
+    restored.restore_snapshot(context.to_snapshot(), restore_history=False)
+
+    # Assert
+    assert len(restored.message_history.messages) == 2
+    assert restored.has_plugin_result("doc1")
+
+
+def test_reportability_context_take_restored_plugin_result_once(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+    context.add_plugin_result(_naive_search("doc1"))
+    restored = ReportabilityContext(chat_request=ai_chat_request)
+    restored.restore_snapshot(context.to_snapshot(), restore_history=False)
+    restored.add_plugin_result(_naive_search("doc2"))
+
+    # Act
+    first = restored.take_restored_plugin_result("doc1")
+    second = restored.take_restored_plugin_result("doc1")
+
+    # Assert
+    assert first is restored.get_plugin_result("doc1")
+    assert second is None
+    assert restored.take_restored_plugin_result("doc2") is None
+
+
+def test_reportability_context_snapshot_keeps_only_the_last_turns(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+    for turn in range(4):
+        context.add_plugin_result(_naive_search(f"doc{turn}"))
+        context.recommendations.append(
+            Recommendation(regulation_name=f"50.72 turn {turn}", confidence_score=0.9, reasoning="why")
+        )
+        # the first document is found again in every turn
+        context.take_restored_plugin_result("doc0")
+        snapshot = context.to_snapshot(max_turns=2)
+        context = ReportabilityContext(chat_request=ai_chat_request)
+        context.restore_snapshot(snapshot, restore_history=False)
+
+    # Act
+    snapshot = context.to_snapshot(max_turns=2)
+
+    # Assert
+    assert [result.id for result in context.plugin_results] == ["doc0", "doc2", "doc3"]
+    assert [entry["data"]["id"] for entry in snapshot["plugin_results"]] == ["doc0", "doc3"]
+    assert [entry["data"]["regulation_name"] for entry in snapshot["recommendations"]] == ["50.72 turn 3"]
+
+
+def test_reportability_context_ignores_snapshot_of_other_version(ai_chat_request):
+    # Arrange
+    context = ReportabilityContext(chat_request=ai_chat_request)
+
+    # Act
+    context.restore_snapshot({"version": 0, "messages": [], "plugin_results": [], "recommendations": []})
+
+    # Assert
+    assert len(context.message_history.messages) == 2
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from models import RequestBudget  # noqa: E402
+
+
+def test_budget_without_limits_is_never_exceeded():
+    # Arrange
+    budget = RequestBudget()
+
+    # Act
+    budget.add_token_usage(10 ** 6, 10 ** 6)
+    budget.add_tool_call()
+
+    # Assert
+    assert budget.exceeded() is None
+
+
+def test_budget_reports_the_limit_that_was_passed():
+    # Arrange
+    budget = RequestBudget(max_prompt_tokens=100, max_completion_tokens=10, max_tool_calls=2)
+
+    # Act
+    budget.add_token_usage(100, 10)
+    budget.add_tool_call()
+    budget.add_tool_call()
+    within_budget = budget.exceeded()
+    budget.add_tool_call()
+    over_tool_calls = budget.exceeded()
+    budget.add_token_usage(0, 1)
+    over_completion_tokens = budget.exceeded()
+
+    # Assert
+    assert within_budget is None
+    assert over_tool_calls == "tool_calls"
+    assert over_completion_tokens == "completion_tokens"
+
+
+def test_budget_reports_elapsed_time():
+    # Arrange
+    with patch("models.request_budget.time.monotonic", return_value=100.0):
+        budget = RequestBudget(max_seconds=30)
+
+    # Act
+    with patch("models.request_budget.time.monotonic", return_value=131.0):
+        reason = budget.exceeded()
+
+    # Assert
+    assert reason == "time"
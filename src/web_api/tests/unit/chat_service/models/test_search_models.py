@@ -68,7 +68,7 @@ def test_nureg_section32_to_agent_string(nureg_section32):
     # Act
     agent_str = section.to_agent_string()
     # Assert
-    assert "Section: 3.2" in agent_str
+    assert "Section Name: 3.2" in agent_str
     assert "10 CFR 50.72: a" in agent_str
     assert "Examples:" in agent_str
 
@@ -0,0 +1,200 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from models import AIChatMessage, AIChatRequest, AIChatRole, Intent, TokenUsage  # noqa: E402
+from orchestrators import ConcurrentAgentOrchestrator  # noqa: E402
+from state import MemoryState  # noqa: E402
+
+
+def _response(content: str) -> MagicMock:
+    response = MagicMock()
+    response.message.content = content
+    response.message.metadata = {}
+    return response
+
+
+@pytest.fixture
+def state():
+    chat_request = AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Hello")], session_state="session123"
+    )
+    return MemoryState(chat_request)
+
+
+def _knowledge_agent(state, trace_name: str, started: asyncio.Event, cancelled: asyncio.Event) -> MagicMock:
+    async def invoke_stream():
+        started.set()
+        state.get_state().token_usage.append(TokenUsage(agent_name=trace_name, prompt_tokens=10))
+        try:
+            await asyncio.sleep(10)
+            yield _response("knowledge")
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    agent = MagicMock(display_name=trace_name, trace_name=trace_name)
+    agent.invoke_stream = invoke_stream
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_discards_speculative_work_for_invalid_intent(state, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("ORCHESTRATOR_SPECULATIVE_START", "true")
+    started, cancelled = asyncio.Event(), asyncio.Event()
+    nureg_agent = _knowledge_agent(state, "NuregAgent", started, cancelled)
+    manual_agent = _knowledge_agent(state, "ReportabilityManualAgent", asyncio.Event(), asyncio.Event())
+
+    async def intent_stream():
+        await started.wait()
+        state.get_state().intent = Intent.INVALID
+        yield _response("Not a reportability question.")
+
+    intent_agent = MagicMock()
+    intent_agent.invoke_stream = AsyncMock(return_value=intent_stream())
+
+    with patch("orchestrators.ConcurrentAgentOrchestrator.IntentAgent", return_value=intent_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.NuregAgent", return_value=nureg_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.ReportabilityManualAgent", return_value=manual_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationExtractionAgent"):
+        orchestrator = ConcurrentAgentOrchestrator(state)
+
+        # Act
+        responses = [response.message.content async for response in orchestrator.invoke_stream()]
+
+    # Assert
+    assert responses == ["Not a reportability question."]
+    assert cancelled.is_set()
+    # the tokens were spent, so they stay reported, marked as speculative
+    assert sorted((usage.agent_name, usage.speculative) for usage in state.get_state().token_usage) == [
+        ("NuregAgent", True), ("ReportabilityManualAgent", True)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_combined_intent_skips_intent_agent(state):
+    # Arrange
+    async def manual_stream():
+        state.get_state().intent = Intent.REPORTABILITY
+        yield _response("manual")
+
+    async def nureg_stream():
+        yield _response("nureg")
+
+    async def recommendation_stream():
+        yield _response("recommendation")
+
+    manual_agent = MagicMock(display_name="Manual", trace_name="ReportabilityManualAgent")
+    manual_agent.invoke_stream = manual_stream
+    nureg_agent = MagicMock(display_name="Nureg", trace_name="NuregAgent")
+    nureg_agent.invoke_stream = nureg_stream
+    recommendation_agent = MagicMock()
+    recommendation_agent.invoke_stream = recommendation_stream
+    intent_agent = MagicMock()
+
+    with patch("orchestrators.ConcurrentAgentOrchestrator.IntentAgent", return_value=intent_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.NuregAgent", return_value=nureg_agent), \
+            patch(
+                "orchestrators.ConcurrentAgentOrchestrator.ReportabilityManualAgent", return_value=manual_agent
+            ) as mock_manual_agent, \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationAgent", return_value=recommendation_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationExtractionAgent"), \
+            patch.object(ConcurrentAgentOrchestrator, "_extract_recommendations", AsyncMock()):
+        orchestrator = ConcurrentAgentOrchestrator(state, combined_intent=True)
+
+        # Act
+        responses = [response.message.content async for response in orchestrator.invoke_stream()]
+
+    # Assert
+    assert sorted(responses[1:3]) == ["manual", "nureg"]
+    assert responses[3] == "recommendation"
+    assert state.get_state().message_history.messages[-1].content == "recommendation"
+    assert mock_manual_agent.call_args.kwargs["detect_intent"] is True
+    intent_agent.invoke_stream.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_combined_intent_confirms_invalid_intent(state):
+    # Arrange
+    started, cancelled = asyncio.Event(), asyncio.Event()
+    nureg_agent = _knowledge_agent(state, "NuregAgent", started, cancelled)
+
+    async def manual_stream():
+        await started.wait()
+        state.get_state().intent = Intent.INVALID
+        state.get_state().token_usage.append(TokenUsage(agent_name="ReportabilityManualAgent", prompt_tokens=10))
+        yield _response("[]")
+
+    manual_agent = MagicMock(display_name="Manual", trace_name="ReportabilityManualAgent")
+    manual_agent.invoke_stream = manual_stream
+
+    async def intent_stream():
+        state.get_state().intent = Intent.INVALID
+        yield _response("Not a reportability question.")
+
+    intent_agent = MagicMock()
+    intent_agent.invoke_stream = AsyncMock(return_value=intent_stream())
+
+    with patch("orchestrators.OrchestratorBase.IntentAgent", return_value=intent_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.IntentAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.NuregAgent", return_value=nureg_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.ReportabilityManualAgent", return_value=manual_agent), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationExtractionAgent"):
+        orchestrator = ConcurrentAgentOrchestrator(state, combined_intent=True)
+
+        # Act
+        responses = [response.message.content async for response in orchestrator.invoke_stream()]
+
+    # Assert
+    assert responses == ["Not a reportability question."]
+    assert cancelled.is_set()
+    assert state.get_state().intent == Intent.INVALID
+
+
+@pytest.mark.asyncio
+async def test_extract_recommendations_skipped_when_nothing_uses_them(state):
+    # Arrange
+    extraction_agent = MagicMock(invoke=AsyncMock())
+    with patch("orchestrators.ConcurrentAgentOrchestrator.IntentAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.NuregAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.ReportabilityManualAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationExtractionAgent"), \
+            patch("orchestrators.OrchestratorBase.ReportabilityServices") as mock_services:
+        orchestrator = ConcurrentAgentOrchestrator(state)
+
+        # Act
+        await orchestrator._extract_recommendations(extraction_agent)
+
+    # Assert
+    mock_services.get_background_task_pool.assert_not_called()
+    extraction_agent.invoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_extract_recommendations_registers_task_for_eval_requests(state):
+    # Arrange
+    state.get_state().include_eval_content = True
+    extraction_agent = MagicMock(invoke=AsyncMock())
+    task = asyncio.create_task(asyncio.sleep(0))
+    with patch("orchestrators.ConcurrentAgentOrchestrator.IntentAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.NuregAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.ReportabilityManualAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationAgent"), \
+            patch("orchestrators.ConcurrentAgentOrchestrator.RecommendationExtractionAgent"), \
+            patch("orchestrators.OrchestratorBase.ReportabilityServices") as mock_services:
+        mock_services.get_background_task_pool.return_value.submit.return_value = task
+        orchestrator = ConcurrentAgentOrchestrator(state)
+
+        # Act
+        await orchestrator._extract_recommendations(extraction_agent)
+
+    # Assert
+    mock_services.get_background_task_pool.return_value.submit.assert_called_once_with(
+        "recommendation_extraction", extraction_agent.invoke
+    )
+    assert state.get_state()._pending_tasks == [task]
+    await task
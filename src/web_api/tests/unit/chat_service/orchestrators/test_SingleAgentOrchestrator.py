@@ -1,20 +1,34 @@
 import pytest
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 from orchestrators import SingleAgentOrchestrator
-from models import ReportabilityContext  # noqa: E402
+from caching import MemoryCache  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole  # noqa: E402
 from agents import NRCRecommendationAgent  # noqa: E402
+from state import MemoryState, PersistentState  # noqa: E402
+
+
+def _state() -> MemoryState:
+    return MemoryState(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Is a reactor scram reportable?")],
+        session_state="session123",
+    ))
+
+
+def _response(content: str) -> SimpleNamespace:
+    return SimpleNamespace(message=SimpleNamespace(content=content))
 
 
 @pytest.mark.asyncio
 async def test_invoke_stream_yields_agent_responses():
     # Arrange
-    mock_state = ReportabilityContext()
+    mock_state = _state()
     orchestrator = SingleAgentOrchestrator(state=mock_state)
     mock_agent = AsyncMock(spec=NRCRecommendationAgent)
 
     async def async_gen():
         for r in ["response1", "response2"]:
-            yield r
+            yield _response(r)
     mock_agent.invoke_stream.return_value = async_gen()
 
     with patch("orchestrators.SingleAgentOrchestrator.NRCRecommendationAgent", return_value=mock_agent):
@@ -24,18 +38,18 @@ async def test_invoke_stream_yields_agent_responses():
             responses.append(r)
 
         # Assert
-        assert responses == ["response1", "response2"]
+        assert [r.message.content for r in responses] == ["response1", "response2"]
 
 
 @pytest.mark.asyncio
 async def test_invoke_stream_tracing_called():
     # Arrange
-    mock_state = ReportabilityContext()
+    mock_state = _state()
     orchestrator = SingleAgentOrchestrator(state=mock_state)
     mock_agent = AsyncMock(spec=NRCRecommendationAgent)
 
     async def async_gen():
-        yield "response"
+        yield _response("response")
     mock_agent.invoke_stream.return_value = async_gen()
     from unittest.mock import MagicMock
 
@@ -54,13 +68,13 @@ async def test_invoke_stream_tracing_called():
 
         # Assert
         mock_tracer.start_as_current_span.assert_called_with("SingleAgentOrchestrator.invoke_stream")
-        assert responses == ["response"]
+        assert [r.message.content for r in responses] == ["response"]
 
 
 @pytest.mark.asyncio
 async def test_invoke_stream_handles_empty_agent_response():
     # Arrange
-    mock_state = ReportabilityContext()
+    mock_state = _state()
     orchestrator = SingleAgentOrchestrator(state=mock_state)
     mock_agent = AsyncMock(spec=NRCRecommendationAgent)
 
@@ -77,3 +91,66 @@ async def test_invoke_stream_handles_empty_agent_response():
 
         # Assert
         assert responses == []
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_reports_exhausted_budget(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("REQUEST_BUDGET_MAX_TOOL_CALLS", "1")
+    mock_state = _state()
+    orchestrator = SingleAgentOrchestrator(state=mock_state)
+    mock_agent = AsyncMock(spec=NRCRecommendationAgent)
+
+    async def async_gen():
+        # the agent asked for more tools than the budget allows
+        mock_state.get_state().budget.add_tool_call()
+        mock_state.get_state().budget.add_tool_call()
+        yield _response("partial answer")
+    mock_agent.invoke_stream.return_value = async_gen()
+
+    with patch("orchestrators.SingleAgentOrchestrator.NRCRecommendationAgent", return_value=mock_agent):
+        # Act
+        responses = [r.message.content async for r in orchestrator.invoke_stream()]
+
+    # Assert
+    assert mock_state.get_state().budget is orchestrator._budget
+    assert responses[0] == "partial answer"
+    assert "budget" in responses[1]
+
+
+@pytest.mark.asyncio
+async def test_invoke_stream_answer_is_restored_in_the_next_turn():
+    # Arrange
+    store = MemoryCache("session_state")
+    first_turn = PersistentState(AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Is a reactor scram reportable?")],
+        session_state="session123",
+    ), store)
+    mock_agent = AsyncMock(spec=NRCRecommendationAgent)
+
+    async def async_gen():
+        for r in ["Yes, under ", "50.72(b)(2)(iv)(B)."]:
+            yield _response(r)
+    mock_agent.invoke_stream.return_value = async_gen()
+
+    with patch("orchestrators.SingleAgentOrchestrator.NRCRecommendationAgent", return_value=mock_agent), \
+            patch("orchestrators.SingleAgentOrchestrator.RecommendationExtractionAgent") as mock_extraction_agent, \
+            patch.object(SingleAgentOrchestrator, "_extract_recommendations", AsyncMock()) as mock_extract:
+        _ = [r async for r in SingleAgentOrchestrator(state=first_turn).invoke_stream()]
+    await first_turn.save()
+
+    # Act
+    second_turn = PersistentState(AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="Why?")], session_state="session123"
+    ), store)
+    await second_turn.load()
+
+    # Assert
+    assert [
+        (message.role.value, message.content) for message in second_turn.get_state().message_history.messages
+    ] == [
+        ("user", "Is a reactor scram reportable?"),
+        ("assistant", "Yes, under 50.72(b)(2)(iv)(B)."),
+        ("user", "Why?"),
+    ]
+    mock_extract.assert_awaited_once_with(mock_extraction_agent.return_value)
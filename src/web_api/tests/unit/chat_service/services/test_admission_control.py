@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+
+from services import AdmissionController, AdmissionRejectedError  # noqa: E402
+
+
+def _controller(**kwargs) -> AdmissionController:
+    settings = dict(
+        max_concurrent=2, max_concurrent_per_user=1, max_queued=1, queue_timeout_seconds=1, retry_after_seconds=7
+    )
+    settings.update(kwargs)
+    return AdmissionController(**settings)
+
+
+@pytest.mark.asyncio
+async def test_acquire_admits_requests_while_slots_are_free():
+    # Arrange
+    controller = _controller()
+
+    # Act
+    first = await controller.acquire("alice")
+    second = await controller.acquire("bob")
+
+    # Assert
+    assert controller.queued == 0
+    first.release()
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_acquire_queues_until_a_slot_is_released():
+    # Arrange
+    controller = _controller()
+    first = await controller.acquire("alice")
+    waiting = asyncio.create_task(controller.acquire("alice"))
+    await asyncio.sleep(0)
+    queued = controller.queued
+
+    # Act
+    first.release()
+    second = await waiting
+
+    # Assert
+    assert queued == 1
+    assert controller.queued == 0
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_acquire_rejects_when_queue_is_full():
+    # Arrange
+    controller = _controller(max_queued=0)
+    first = await controller.acquire("alice")
+
+    # Act
+    with pytest.raises(AdmissionRejectedError) as error:
+        await controller.acquire("alice")
+
+    # Assert
+    assert error.value.reason == "queue_full"
+    assert error.value.retry_after_seconds == 7
+    first.release()
+
+
+@pytest.mark.asyncio
+async def test_acquire_rejects_when_wait_times_out():
+    # Arrange
+    controller = _controller(queue_timeout_seconds=0.01)
+    first = await controller.acquire("alice")
+
+    # Act
+    with pytest.raises(AdmissionRejectedError) as error:
+        await controller.acquire("alice")
+
+    # Assert
+    assert error.value.reason == "timeout"
+    assert controller.queued == 0
+    first.release()
+    # the timed out request gave back its place, so the user can be admitted again
+    (await controller.acquire("alice")).release()
+
+
+@pytest.mark.asyncio
+async def test_acquire_limits_each_user_separately():
+    # Arrange
+    controller = _controller(max_queued=0)
+    alice = await controller.acquire("alice")
+
+    # Act
+    bob = await controller.acquire("bob")
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire("carol")
+
+    # Assert
+    alice.release()
+    bob.release()
+    assert controller._user_semaphores == {}
+
+
+@pytest.mark.asyncio
+async def test_acquire_without_user_is_only_limited_globally():
+    # Arrange
+    controller = _controller(max_queued=0)
+
+    # Act
+    first = await controller.acquire(None)
+    second = await controller.acquire(None)
+
+    # Assert
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire(None)
+    first.release()
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_release_is_idempotent():
+    # Arrange
+    controller = _controller(max_concurrent=1, max_queued=0)
+    ticket = await controller.acquire("alice")
+
+    # Act
+    ticket.release()
+    ticket.release()
+
+    # Assert
+    (await controller.acquire("bob")).release()
+    assert controller._semaphore._value == 1
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+from services import BackgroundTaskPool  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_submit_limits_concurrency():
+    # Arrange
+    pool = BackgroundTaskPool(concurrency=2, max_pending=10)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    # Act
+    tasks = [pool.submit("work", work) for _ in range(5)]
+    await asyncio.gather(*tasks)
+
+    # Assert
+    assert peak == 2
+    assert pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_full():
+    # Arrange
+    pool = BackgroundTaskPool(concurrency=1, max_pending=1)
+    release = asyncio.Event()
+    pool.submit("blocking", release.wait)
+
+    # Act
+    rejected = pool.submit("rejected", release.wait)
+
+    # Assert
+    assert rejected is None
+    release.set()
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_submit_logs_failures_instead_of_raising():
+    # Arrange
+    pool = BackgroundTaskPool(concurrency=1, max_pending=1)
+
+    async def fail():
+        raise RuntimeError("extraction failed")
+
+    # Act
+    result = await pool.submit("failing", fail)
+
+    # Assert
+    assert result is None
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_tasks_after_timeout():
+    # Arrange
+    pool = BackgroundTaskPool(concurrency=1, max_pending=1)
+    task = pool.submit("slow", lambda: asyncio.sleep(10))
+
+    # Act
+    await pool.close(timeout=0.01)
+
+    # Assert
+    assert task.cancelled()
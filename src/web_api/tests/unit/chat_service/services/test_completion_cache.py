@@ -0,0 +1,156 @@
+import pytest
+from functools import reduce
+from operator import add
+from unittest.mock import AsyncMock, patch
+
+from caching import DiskCache, MemoryCache  # noqa: E402
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage  # noqa: E402
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, AzureChatPromptExecutionSettings  # noqa: E402
+from semantic_kernel.contents import ChatHistory, ChatMessageContent, StreamingChatMessageContent  # noqa: E402
+from semantic_kernel.contents.utils.author_role import AuthorRole  # noqa: E402
+from services import CachingAzureChatCompletion  # noqa: E402
+
+
+def _service(cache) -> CachingAzureChatCompletion:
+    return CachingAzureChatCompletion(
+        cache=cache,
+        deployment_name="gpt-4o",
+        endpoint="https://example.openai.azure.com",
+        api_key="key",
+        api_version="2024-10-21",
+    )
+
+
+def _chat_history(question: str = "Is a reactor scram reportable?") -> ChatHistory:
+    chat_history = ChatHistory()
+    chat_history.add_system_message("You are a reportability assistant.")
+    chat_history.add_user_message(question)
+    return chat_history
+
+
+def _response() -> list[ChatMessageContent]:
+    return [ChatMessageContent(
+        role=AuthorRole.ASSISTANT,
+        content="Yes, under 50.72(b)(2)(iv)(B).",
+        metadata={"usage": CompletionUsage(prompt_tokens=120, completion_tokens=12)},
+    )]
+
+
+@pytest.mark.asyncio
+async def test_get_chat_message_contents_replays_cached_response(tmp_path):
+    # Arrange
+    service = _service(DiskCache("llm_completions", str(tmp_path / "cache.sqlite3")))
+    settings = AzureChatPromptExecutionSettings(temperature=0)
+    inner = AsyncMock(return_value=_response())
+
+    # Act
+    with patch.object(AzureChatCompletion, "_inner_get_chat_message_contents", inner):
+        first = await service._inner_get_chat_message_contents(_chat_history(), settings)
+        second = await service._inner_get_chat_message_contents(_chat_history(), settings)
+
+    # Assert
+    inner.assert_awaited_once()
+    assert second[0].content == first[0].content
+    assert second[0].role == AuthorRole.ASSISTANT
+    assert second[0].metadata["usage"].prompt_tokens == 120
+    assert second[0].metadata["usage"].completion_tokens == 12
+
+
+@pytest.mark.asyncio
+async def test_get_chat_message_contents_keys_on_history_and_tools():
+    # Arrange
+    service = _service(MemoryCache("llm_completions"))
+    tools = [{"type": "function", "function": {"name": "search_nureg", "parameters": {}}}]
+    inner = AsyncMock(return_value=_response())
+
+    # Act
+    with patch.object(AzureChatCompletion, "_inner_get_chat_message_contents", inner):
+        await service._inner_get_chat_message_contents(_chat_history(), AzureChatPromptExecutionSettings(temperature=0))
+        await service._inner_get_chat_message_contents(
+            _chat_history("Is a fire reportable?"), AzureChatPromptExecutionSettings(temperature=0)
+        )
+        await service._inner_get_chat_message_contents(
+            _chat_history(), AzureChatPromptExecutionSettings(temperature=0, tools=tools)
+        )
+
+    # Assert
+    assert inner.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_chat_message_contents_skips_cache_above_temperature_zero():
+    # Arrange
+    cache = MemoryCache("llm_completions")
+    service = _service(cache)
+    settings = AzureChatPromptExecutionSettings(temperature=0.7)
+    inner = AsyncMock(return_value=_response())
+
+    # Act
+    with patch.object(AzureChatCompletion, "_inner_get_chat_message_contents", inner):
+        await service._inner_get_chat_message_contents(_chat_history(), settings)
+        await service._inner_get_chat_message_contents(_chat_history(), settings)
+
+    # Assert
+    assert inner.await_count == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_streaming_chat_message_contents_replays_every_chunk():
+    # Arrange
+    service = _service(MemoryCache("llm_completions"))
+    settings = AzureChatPromptExecutionSettings(temperature=0)
+    calls = []
+
+    async def inner(self, chat_history, settings, function_invoke_attempt=0):
+        calls.append(chat_history)
+        for text in ("Yes, ", "under 50.72."):
+            yield [StreamingChatMessageContent(role=AuthorRole.ASSISTANT, choice_index=0, content=text)]
+        yield [StreamingChatMessageContent(
+            role=AuthorRole.ASSISTANT,
+            choice_index=0,
+            content="",
+            metadata={"usage": CompletionUsage(prompt_tokens=120, completion_tokens=4)},
+        )]
+
+    async def consume(attempt):
+        return [
+            messages async for messages in
+            service._inner_get_streaming_chat_message_contents(_chat_history(), settings, attempt)
+        ]
+
+    # Act
+    with patch.object(AzureChatCompletion, "_inner_get_streaming_chat_message_contents", inner):
+        first = await consume(0)
+        second = await consume(1)
+
+    # Assert
+    assert len(calls) == 1
+    assert [chunk[0].content for chunk in second] == [chunk[0].content for chunk in first]
+    assert str(reduce(add, (chunk[0] for chunk in second))) == "Yes, under 50.72."
+    assert second[-1][0].metadata["usage"].prompt_tokens == 120
+    assert all(chunk[0].function_invoke_attempt == 1 for chunk in second)
+
+
+@pytest.mark.asyncio
+async def test_get_streaming_chat_message_contents_survives_failed_cache_write():
+    # Arrange
+    cache = MemoryCache("llm_completions")
+    cache.aset = AsyncMock(side_effect=OSError("database is locked"))
+    service = _service(cache)
+    settings = AzureChatPromptExecutionSettings(temperature=0)
+
+    async def inner(self, chat_history, settings, function_invoke_attempt=0):
+        for text in ("Yes, ", "under 50.72."):
+            yield [StreamingChatMessageContent(role=AuthorRole.ASSISTANT, choice_index=0, content=text)]
+
+    # Act
+    with patch.object(AzureChatCompletion, "_inner_get_streaming_chat_message_contents", inner):
+        chunks = [
+            messages async for messages in
+            service._inner_get_streaming_chat_message_contents(_chat_history(), settings)
+        ]
+
+    # Assert
+    assert [chunk[0].content for chunk in chunks] == ["Yes, ", "under 50.72."]
+    cache.aset.assert_awaited_once()
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from caching import MemoryCache  # noqa: E402
+from services import QueryEmbeddings  # noqa: E402
+
+
+def _embedding_service(vector=(0.5, 0.25)):
+    async def generate_embeddings(texts):
+        await asyncio.sleep(0)
+        return [list(vector)]
+
+    service = AsyncMock()
+    service.generate_embeddings = AsyncMock(side_effect=generate_embeddings)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_caches_by_text():
+    # Arrange
+    service = _embedding_service()
+    query_embeddings = QueryEmbeddings(service, MemoryCache("test"))
+
+    # Act
+    first = await query_embeddings.get_embedding("reactor scram")
+    second = await query_embeddings.get_embedding("reactor scram")
+
+    # Assert
+    assert first == second == [0.5, 0.25]
+    service.generate_embeddings.assert_awaited_once_with(["reactor scram"])
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_shares_in_flight_requests():
+    # Arrange
+    service = _embedding_service()
+    query_embeddings = QueryEmbeddings(service, MemoryCache("test"))
+
+    # Act
+    results = await asyncio.gather(*(query_embeddings.get_embedding("reactor scram") for _ in range(4)))
+
+    # Assert
+    assert all(result == [0.5, 0.25] for result in results)
+    service.generate_embeddings.assert_awaited_once()
+    assert query_embeddings._pending == {}
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_does_not_cache_failures():
+    # Arrange
+    service = AsyncMock()
+    service.generate_embeddings = AsyncMock(side_effect=[Exception("throttled"), [[1.0]]])
+    query_embeddings = QueryEmbeddings(service, MemoryCache("test"))
+
+    # Act
+    with pytest.raises(Exception):
+        await query_embeddings.get_embedding("reactor scram")
+    result = await query_embeddings.get_embedding("reactor scram")
+
+    # Assert
+    assert result == [1.0]
+    assert service.generate_embeddings.await_count == 2
@@ -0,0 +1,109 @@
+import gc
+import pytest
+import weakref
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import SearchClientPool  # noqa: E402
+from services.search_client_pool import _observe  # noqa: E402
+
+
+@pytest.fixture
+def search_env(monkeypatch):
+    monkeypatch.setenv("AZURE_SEARCH_SERVICE_ENDPOINT", "https://search.example")
+    monkeypatch.setenv("AZURE_SEARCH_API_KEY", "key")  # pragma: allowlist secret
+
+
+@pytest.mark.asyncio
+@patch("services.search_client_pool.SearchClient")
+async def test_get_client_reuses_client_per_index(mock_search_client, search_env):
+    # Arrange
+    mock_search_client.side_effect = lambda **kwargs: MagicMock(index_name=kwargs["index_name"])
+    pool = SearchClientPool(connection_limit=10)
+
+    # Act
+    first = pool.get_client("nureg")
+    second = pool.get_client("nureg")
+    other = pool.get_client("manual")
+
+    # Assert
+    assert first is second
+    assert first is not other
+    assert mock_search_client.call_count == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+@patch("services.search_client_pool.SearchClient")
+async def test_clients_share_one_session(mock_search_client, search_env):
+    # Arrange
+    pool = SearchClientPool(connection_limit=10)
+
+    # Act
+    pool.get_client("nureg")
+    pool.get_client("manual")
+
+    # Assert
+    sessions = {call.kwargs["transport"].session for call in mock_search_client.call_args_list}
+    assert len(sessions) == 1
+    assert next(iter(sessions)).connector.limit == 10
+    await pool.close()
+
+
+@pytest.mark.asyncio
+@patch("services.search_client_pool.SearchClient")
+async def test_lease_tracks_occupancy(mock_search_client, search_env):
+    # Arrange
+    pool = SearchClientPool()
+
+    # Act / Assert
+    async with pool.lease("nureg") as client:
+        assert client is pool.get_client("nureg")
+        assert pool.leased == 1
+    assert pool.leased == 0
+    await pool.close()
+
+
+@pytest.mark.asyncio
+@patch("services.search_client_pool.SearchClient")
+async def test_close_closes_clients_and_session(mock_search_client, search_env):
+    # Arrange
+    client = MagicMock()
+    client.close = AsyncMock()
+    mock_search_client.return_value = client
+    pool = SearchClientPool()
+    await pool.open(["nureg"])
+    session = pool._session
+
+    # Act
+    await pool.close()
+
+    # Assert
+    client.close.assert_awaited_once()
+    assert session.closed
+
+
+def test_connection_limit_from_environment(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("AZURE_SEARCH_CONNECTION_LIMIT", "7")
+
+    # Act
+    pool = SearchClientPool()
+
+    # Assert
+    assert pool.connection_limit == 7
+
+
+def test_gauges_observe_the_current_pool_only():
+    # Arrange
+    old_pool = SearchClientPool(connection_limit=3)
+    old_pool_ref = weakref.ref(old_pool)
+    observe_limit = _observe(lambda pool: pool.connection_limit)
+
+    # Act
+    current_pool = SearchClientPool(connection_limit=5)
+    del old_pool
+    gc.collect()
+
+    # Assert
+    assert old_pool_ref() is None
+    assert [observation.value for observation in observe_limit(None)] == [current_pool.connection_limit]
@@ -0,0 +1,149 @@
+import pytest
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from services import ReportabilityServices  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_services():
+    _reset()
+    yield
+    _reset()
+
+
+def _reset():
+    ReportabilityServices._chat_completion_service = None
+    ReportabilityServices._text_embedding_service = None
+    ReportabilityServices._query_embeddings = None
+    ReportabilityServices._openai_client = None
+    ReportabilityServices._openai_http_client = None
+    ReportabilityServices._sas_token_cache = None
+    ReportabilityServices._sas_token_lifetime = None
+    ReportabilityServices._completion_cache = None
+    ReportabilityServices._completion_cache_loaded = False
+
+
+@patch("services.services.AsyncAzureOpenAI")
+@patch("services.services.AzureChatCompletion")
+def test_get_chat_completion_service_is_shared(mock_chat_completion, mock_async_client, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("AZURE_OPENAI_HTTP2", "false")
+
+    # Act
+    first = ReportabilityServices.get_chat_completion_service()
+    second = ReportabilityServices.get_chat_completion_service()
+
+    # Assert
+    assert first is second
+    mock_chat_completion.assert_called_once()
+    mock_async_client.assert_called_once()
+
+
+@patch("services.services.AsyncAzureOpenAI")
+@patch("services.services.AzureChatCompletion")
+def test_get_chat_completion_service_uses_connection_limit(mock_chat_completion, mock_async_client, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("AZURE_OPENAI_HTTP2", "false")
+    monkeypatch.setenv("AZURE_OPENAI_CONNECTION_LIMIT", "12")
+
+    # Act
+    ReportabilityServices.get_chat_completion_service()
+
+    # Assert
+    http_client = mock_async_client.call_args.kwargs["http_client"]
+    assert http_client is ReportabilityServices._openai_http_client
+    assert http_client._transport._pool._max_connections == 12
+
+
+@pytest.mark.asyncio
+async def test_warm_up_swallows_errors():
+    # Arrange
+    service = MagicMock()
+    service.get_chat_message_content = AsyncMock(side_effect=Exception("unreachable"))
+    ReportabilityServices._chat_completion_service = service
+
+    # Act
+    await ReportabilityServices.warm_up_chat_completion_service()
+
+    # Assert
+    service.get_chat_message_content.assert_awaited_once()
+
+
+@patch("services.services.AsyncAzureOpenAI")
+@patch("services.services.AzureTextEmbedding")
+@patch("services.services.AzureChatCompletion")
+def test_services_share_one_openai_client(mock_chat_completion, mock_text_embedding, mock_async_client, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("AZURE_OPENAI_HTTP2", "false")
+
+    # Act
+    ReportabilityServices.get_chat_completion_service()
+    ReportabilityServices.get_text_embedding_service()
+
+    # Assert
+    mock_async_client.assert_called_once()
+    assert (
+        mock_chat_completion.call_args.kwargs["async_client"]
+        is mock_text_embedding.call_args.kwargs["async_client"]
+    )
+
+
+def test_get_query_embeddings_disabled_by_default(monkeypatch):
+    # Arrange
+    monkeypatch.delenv("SEARCH_CLIENT_SIDE_VECTORIZATION", raising=False)
+
+    # Act
+    query_embeddings = ReportabilityServices.get_query_embeddings()
+
+    # Assert
+    assert query_embeddings is None
+
+
+@patch("services.services.generate_blob_sas", side_effect=lambda **kwargs: f"sig-{kwargs['blob_name']}")
+def test_get_sas_token_is_cached_per_blob(mock_generate_blob_sas, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("SAS_TOKEN_EXPIRATIONS_DAYS", "1")
+
+    # Act
+    first = ReportabilityServices.get_sas_token("account", "container", "a.pdf")
+    second = ReportabilityServices.get_sas_token("account", "container", "a.pdf")
+    other = ReportabilityServices.get_sas_token("account", "container", "b.pdf")
+
+    # Assert
+    assert first == second == "sig-a.pdf"
+    assert other == "sig-b.pdf"
+    assert mock_generate_blob_sas.call_count == 2
+
+
+@patch("services.services.generate_blob_sas", side_effect=["first", "second"])
+def test_get_sas_token_refreshes_before_expiry(mock_generate_blob_sas, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("SAS_TOKEN_EXPIRATIONS_DAYS", "1")
+    ReportabilityServices.get_sas_token("account", "container", "a.pdf")
+
+    # Act
+    with patch("caching.MemoryCache.time.monotonic", return_value=time.monotonic() + 0.95 * 86400):
+        token = ReportabilityServices.get_sas_token("account", "container", "a.pdf")
+
+    # Assert
+    assert token == "second"
+
+
+@patch("services.services.AsyncAzureOpenAI")
+@patch("services.services.CachingAzureChatCompletion")
+@patch("services.services.AzureChatCompletion")
+def test_get_chat_completion_service_uses_completion_cache(
+        mock_chat_completion, mock_caching_chat_completion, mock_async_client, monkeypatch
+):
+    # Arrange
+    monkeypatch.setenv("AZURE_OPENAI_HTTP2", "false")
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+
+    # Act
+    service = ReportabilityServices.get_chat_completion_service()
+
+    # Assert
+    assert service is mock_caching_chat_completion.return_value
+    assert mock_caching_chat_completion.call_args.kwargs["cache"] is ReportabilityServices.get_completion_cache()
+    mock_chat_completion.assert_not_called()
@@ -0,0 +1,183 @@
+import asyncio
+import pytest
+
+from services import StreamReplayLog, StreamReplayStore, StreamResumeError  # noqa: E402
+
+
+async def _frames(*frames, delay: float = 0):
+    for frame in frames:
+        await asyncio.sleep(delay)
+        yield frame
+
+
+async def _collect(replay_log: StreamReplayLog, after_seq: int = 0, heartbeat_seconds: float = None):
+    return [event async for event in replay_log.follow(after_seq, heartbeat_seconds)]
+
+
+@pytest.mark.asyncio
+async def test_follow_yields_recorded_and_live_events():
+    # Arrange
+    replay_log = StreamReplayLog()
+    follower = asyncio.create_task(_collect(replay_log))
+
+    # Act
+    await replay_log.record(_frames("a", "b", delay=0.01))
+    events = await follower
+
+    # Assert
+    assert events == [(replay_log.event_id(1), "a"), (replay_log.event_id(2), "b")]
+    assert replay_log.done
+
+
+@pytest.mark.asyncio
+async def test_follow_resumes_after_last_event():
+    # Arrange
+    replay_log = StreamReplayLog()
+    await replay_log.record(_frames("a", "b", "c"))
+
+    # Act
+    events = await _collect(replay_log, replay_log.parse_event_id(replay_log.event_id(1)))
+
+    # Assert
+    assert [data for _, data in events] == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_follow_raises_when_events_were_dropped():
+    # Arrange
+    replay_log = StreamReplayLog(max_events=2)
+    await replay_log.record(_frames("a", "b", "c"))
+
+    # Act / Assert
+    with pytest.raises(StreamResumeError):
+        await _collect(replay_log, 0)
+
+
+@pytest.mark.asyncio
+async def test_follow_yields_heartbeat_while_idle():
+    # Arrange
+    replay_log = StreamReplayLog()
+    follower = asyncio.create_task(_collect(replay_log, heartbeat_seconds=0.01))
+
+    # Act
+    await asyncio.sleep(0.05)
+    replay_log.append("a")
+    replay_log.finish()
+    events = await follower
+
+    # Assert
+    assert None in events
+    assert events[-1] == (replay_log.event_id(1), "a")
+
+
+def test_parse_event_id_rejects_other_streams():
+    # Arrange
+    replay_log = StreamReplayLog()
+    replay_log.append("a")
+
+    # Act / Assert
+    with pytest.raises(StreamResumeError):
+        replay_log.parse_event_id(StreamReplayLog().event_id(1))
+    with pytest.raises(StreamResumeError):
+        replay_log.parse_event_id(replay_log.event_id(2))
+
+
+@pytest.mark.asyncio
+async def test_record_adds_error_frames_when_response_fails():
+    # Arrange
+    replay_log = StreamReplayLog()
+
+    async def failing():
+        yield "a"
+        raise RuntimeError("boom")
+
+    async def on_error(e):
+        yield f"error: {e}"
+
+    # Act
+    await replay_log.record(failing(), on_error)
+
+    # Assert
+    assert [data for _, data in await _collect(replay_log)] == ["a", "error: boom"]
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_latest_response_per_session():
+    # Arrange
+    store = StreamReplayStore(max_sessions=10, max_events=10, ttl_seconds=60)
+
+    # Act
+    first = store.start("session", _frames("a"))
+    second = store.start("session", _frames("b"))
+    unkeyed = store.start(None, _frames("c"))
+    await asyncio.sleep(0.01)
+
+    # Assert
+    assert store.get("session") is second
+    assert store.get("session") is not first
+    assert store.get(None) is None
+    assert unkeyed.done
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_recording_after_follower_leaves():
+    # Arrange
+    store = StreamReplayStore(max_sessions=10, max_events=10, ttl_seconds=60)
+    replay_log = store.start("session", _frames("a", "b", delay=0.01))
+    follower = replay_log.follow()
+
+    # Act
+    first = await follower.__anext__()
+    await follower.aclose()
+    await asyncio.sleep(0.05)
+
+    # Assert
+    assert first[1] == "a"
+    assert replay_log.done
+    assert [data for _, data in await _collect(replay_log)] == ["a", "b"]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_store_cancels_response_nobody_resumes():
+    # Arrange
+    store = StreamReplayStore(max_sessions=10, max_events=10, ttl_seconds=60, resume_grace_seconds=0.01)
+    cancelled = asyncio.Event()
+
+    async def slow():
+        yield "a"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    replay_log = store.start("session", slow())
+    follower = replay_log.follow()
+
+    # Act
+    await follower.__anext__()
+    await follower.aclose()
+    await asyncio.sleep(0.05)
+
+    # Assert
+    assert cancelled.is_set()
+    assert replay_log.done
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_response_when_client_resumes_in_time():
+    # Arrange
+    store = StreamReplayStore(max_sessions=10, max_events=10, ttl_seconds=60, resume_grace_seconds=0.05)
+    replay_log = store.start("session", _frames("a", "b", delay=0.03))
+    first = replay_log.follow()
+    await first.__anext__()
+    await first.aclose()
+
+    # Act
+    events = await _collect(replay_log, 1)
+
+    # Assert
+    assert [data for _, data in events] == ["b"]
+    await store.close()
@@ -0,0 +1,91 @@
+import asyncio
+import gc
+import pytest
+
+from semantic_kernel.contents import ChatHistory  # noqa: E402
+from models import (  # noqa: E402
+    AIChatMessage,
+    AIChatRequest,
+    AIChatRole,
+    NaiveSearch,
+    Recommendation,
+    ReportabilityContext,
+    TokenUsage,
+)
+from state import MemoryState  # noqa: E402
+
+CONCURRENT_REQUESTS = 500
+
+
+def _request(request_number: int) -> AIChatRequest:
+    return AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content=f"question {request_number}")],
+        session_state=f"session-{request_number}",
+    )
+
+
+async def _handle_request(request_number: int) -> MemoryState:
+    state = MemoryState(chat_request=_request(request_number))
+    context = state.get_state()
+    # yield between every change so the requests interleave the way concurrent agents do
+    await asyncio.sleep(0)
+    context.add_plugin_result(NaiveSearch(
+        id=f"doc-{request_number}", chunk_id="chunk", title="Title", url="url", content="content"
+    ))
+    await asyncio.sleep(0)
+    context.token_usage.append(TokenUsage(agent_name=f"agent-{request_number}", prompt_tokens=1, completion_tokens=1))
+    await asyncio.sleep(0)
+    context.recommendations.append(
+        Recommendation(regulation_name=f"regulation-{request_number}", confidence_score=1.0, reasoning="reason")
+    )
+    await asyncio.sleep(0)
+    context.message_history.add_assistant_message(f"answer {request_number}")
+    context.all_chunks.append(f"answer {request_number}")
+    return state
+
+
+def _count_live(object_type: type) -> int:
+    gc.collect()
+    # compare types directly, isinstance on the lazy import proxies of some libraries imports their optional extras
+    return sum(1 for obj in gc.get_objects() if type(obj) is object_type)
+
+
+@pytest.mark.asyncio
+async def test_memory_state_isolates_concurrent_requests():
+    # Arrange
+    histories_before = _count_live(ChatHistory)
+
+    # Act
+    states = await asyncio.gather(*(_handle_request(i) for i in range(CONCURRENT_REQUESTS)))
+
+    # Assert
+    for request_number, state in enumerate(states):
+        context = state.get_state()
+        assert [result.id for result in context.plugin_results] == [f"doc-{request_number}"]
+        assert [usage.agent_name for usage in context.token_usage] == [f"agent-{request_number}"]
+        assert [r.regulation_name for r in context.recommendations] == [f"regulation-{request_number}"]
+        assert [m.content for m in context.message_history.messages] == [
+            f"question {request_number}", f"answer {request_number}"
+        ]
+        assert context.all_chunks == f"answer {request_number}"
+
+    contexts = [state.get_state() for state in states]
+    for field_name in ("message_history", "plugin_results", "token_usage", "recommendations", "all_chunks"):
+        assert len({id(getattr(context, field_name)) for context in contexts}) == CONCURRENT_REQUESTS
+    # one history per request, and none left over from copying a shared default
+    assert _count_live(ChatHistory) - histories_before == CONCURRENT_REQUESTS
+
+
+def test_reportability_context_defaults_are_not_shared():
+    # Act
+    first = ReportabilityContext()
+    first.plugin_results.append(NaiveSearch(id="doc", chunk_id="chunk", title="Title", url="url", content="content"))
+    first.token_usage.append(TokenUsage(agent_name="agent"))
+    first.message_history.add_user_message("hello")
+    second = ReportabilityContext()
+
+    # Assert
+    assert second.plugin_results == []
+    assert second.token_usage == []
+    assert second.recommendations == []
+    assert second.message_history.messages == []
@@ -0,0 +1,104 @@
+import pytest
+
+from caching import MemoryCache  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, NaiveSearch  # noqa: E402
+from state import PersistentState  # noqa: E402
+
+
+def _request(*contents: str, session_state: str = "session-1", user_id: str = None) -> AIChatRequest:
+    roles = [AIChatRole.USER, AIChatRole.ASSISTANT]
+    messages = [AIChatMessage(role=roles[i % 2], content=content) for i, content in enumerate(contents)]
+    context = {"user": {"id": user_id}} if user_id else None
+    return AIChatRequest(messages=messages, session_state=session_state, context=context)
+
+
+def _document(document_id: str) -> NaiveSearch:
+    return NaiveSearch(id=document_id, chunk_id=document_id, title="Title", url="url", content="content")
+
+
+@pytest.mark.asyncio
+async def test_persistent_state_continues_stored_session():
+    # Arrange
+    store = MemoryCache("session_state")
+    first_turn = PersistentState(_request("What is reportable?"), store)
+    first_turn.get_state().message_history.add_assistant_message("Section 3.2.1 applies.")
+    first_turn.get_state().add_plugin_result(_document("doc1"))
+    await first_turn.save()
+
+    # Act
+    second_turn = PersistentState(_request("Why?"), store)
+    await second_turn.load()
+
+    # Assert
+    state = second_turn.get_state()
+    assert [message.content for message in state.message_history.messages] == [
+        "What is reportable?", "Section 3.2.1 applies.", "Why?"
+    ]
+    assert state.has_plugin_result("doc1")
+
+
+@pytest.mark.asyncio
+async def test_persistent_state_uses_full_history_from_request():
+    # Arrange
+    store = MemoryCache("session_state")
+    first_turn = PersistentState(_request("What is reportable?"), store)
+    first_turn.get_state().add_plugin_result(_document("doc1"))
+    await first_turn.save()
+
+    # Act
+    second_turn = PersistentState(_request("What is reportable?", "Section 3.2.1 applies.", "Why?"), store)
+    await second_turn.load()
+
+    # Assert
+    state = second_turn.get_state()
+    assert len(state.message_history.messages) == 3
+    assert state.has_plugin_result("doc1")
+
+
+@pytest.mark.asyncio
+async def test_persistent_state_keeps_sessions_apart():
+    # Arrange
+    store = MemoryCache("session_state")
+    first_turn = PersistentState(_request("Hello"), store)
+    first_turn.get_state().add_plugin_result(_document("doc1"))
+    await first_turn.save()
+
+    # Act
+    other_session = PersistentState(_request("Hello", session_state="session-2"), store)
+    await other_session.load()
+
+    # Assert
+    assert other_session.get_state().plugin_results == []
+    assert len(other_session.get_state().message_history.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_persistent_state_keeps_users_apart():
+    # Arrange
+    store = MemoryCache("session_state")
+    first_turn = PersistentState(_request("Hello", user_id="user-1"), store)
+    first_turn.get_state().add_plugin_result(_document("doc1"))
+    await first_turn.save()
+
+    # Act
+    other_user = PersistentState(_request("Hello", user_id="user-2"), store)
+    await other_user.load()
+    anonymous = PersistentState(_request("Hello"), store)
+    await anonymous.load()
+
+    # Assert
+    assert other_user.get_state().plugin_results == []
+    assert anonymous.get_state().plugin_results == []
+
+
+@pytest.mark.asyncio
+async def test_persistent_state_without_session_is_not_stored():
+    # Arrange
+    store = MemoryCache("session_state")
+    state = PersistentState(AIChatRequest(messages=[AIChatMessage(role=AIChatRole.USER, content="Hi")]), store)
+
+    # Act
+    await state.save()
+
+    # Assert
+    assert len(store) == 0
@@ -1,8 +1,9 @@
+import asyncio
 import pytest
 from fastapi import Request
 from fastapi.responses import StreamingResponse
 from unittest.mock import AsyncMock, MagicMock
-from main import stream_openai_text
+from main import _save_state_when_done, stream_openai_text
 
 
 @pytest.mark.asyncio
@@ -18,7 +19,7 @@ async def test_stream_openai_text_success(monkeypatch):
     mock_orchestrator.invoke_stream.return_value = "stream_response"
     monkeypatch.setattr(
         "main.SingleAgentOrchestrator",
-        lambda state: mock_orchestrator
+        lambda state, combined_intent=None: mock_orchestrator
     )
 
     # Act
@@ -85,3 +86,89 @@ async def test_stream_openai_text_generic_exception(monkeypatch):
     # Assert
     assert isinstance(response, StreamingResponse)
     assert response.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_text_sse_records_response(monkeypatch):
+    # Arrange
+    mock_body = b'{"messages": [{"role": "user", "content": "Hello"}], "session_state": "session-1"}'
+    mock_headers = {'content-type': 'application/json'}
+    mock_request = MagicMock(spec=Request)
+    mock_request.headers = mock_headers
+    mock_request.query_params = {"streamFormat": "sse", "orchestrationType": "single"}
+    mock_request.body = AsyncMock(return_value=mock_body)
+
+    mock_orchestrator = MagicMock()
+    monkeypatch.setattr("main.SingleAgentOrchestrator", lambda state, combined_intent=None: mock_orchestrator)
+    mock_store = MagicMock()
+    monkeypatch.setattr("main.ReportabilityServices.get_stream_replay_store", lambda: mock_store)
+
+    # Act
+    response = await stream_openai_text(mock_request)
+
+    # Assert
+    assert isinstance(response, StreamingResponse)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert mock_store.start.call_args.args[0] == "session-1"
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_text_resume_without_recorded_response():
+    # Arrange
+    mock_body = b'{"messages": [{"role": "user", "content": "Hello"}], "session_state": "unknown-session"}'
+    mock_headers = {'content-type': 'application/json', 'last-event-id': 'abc-3'}
+    mock_request = MagicMock(spec=Request)
+    mock_request.headers = mock_headers
+    mock_request.body = AsyncMock(return_value=mock_body)
+
+    # Act
+    response = await stream_openai_text(mock_request)
+
+    # Assert
+    assert isinstance(response, StreamingResponse)
+    assert response.status_code == 410
+
+
+async def _frames():
+    yield "frame"
+
+
+@pytest.mark.asyncio
+async def test_save_state_when_done_waits_for_pending_tasks(monkeypatch):
+    # Arrange
+    extraction_done = asyncio.Event()
+    extraction = asyncio.create_task(extraction_done.wait())
+    state = MagicMock()
+    state.get_state.return_value.pop_pending_tasks.return_value = [extraction]
+    state.save = AsyncMock()
+    mock_pool = MagicMock()
+    monkeypatch.setattr("main.ReportabilityServices.get_background_task_pool", lambda: mock_pool)
+
+    # Act
+    frames = [frame async for frame in _save_state_when_done(_frames(), state)]
+    saved_before_extraction = mock_pool.submit.called
+    extraction_done.set()
+    await extraction
+    await asyncio.sleep(0)
+
+    # Assert
+    assert frames == ["frame"]
+    assert not saved_before_extraction
+    mock_pool.submit.assert_called_once_with("session_state_save", state.save)
+
+
+@pytest.mark.asyncio
+async def test_save_state_when_done_saves_abandoned_response():
+    # Arrange
+    state = MagicMock()
+    state.get_state.return_value.pop_pending_tasks.return_value = []
+    state.save = AsyncMock()
+    frames = _save_state_when_done(_frames(), state)
+
+    # Act
+    await frames.__anext__()
+    await frames.aclose()
+
+    # Assert
+    state.save.assert_awaited_once()
@@ -0,0 +1,89 @@
+from models import Example, NaiveSearch, NUREGSection32  # noqa: E402
+from util.context_packing import ContextPacker, DOCUMENT_SEPARATOR  # noqa: E402
+from util.token_counting import count_tokens  # noqa: E402
+
+SENTENCE = "The licensee declared an unusual event after the loss of offsite power. "
+
+
+def _naive_search(document_id: str, score: float, sentences: int = 2) -> NaiveSearch:
+    return NaiveSearch(
+        id=document_id, chunk_id=document_id, title=f"Title {document_id}", url="url", content=SENTENCE * sentences,
+        search_score=score
+    )
+
+
+def test_pack_orders_results_by_score():
+    # Arrange
+    results = [_naive_search("low", 0.2), _naive_search("high", 0.9)]
+
+    # Act
+    packed = ContextPacker(max_tokens=10000, max_field_tokens=1000).pack(results, "search_ts_naive")
+
+    # Assert
+    assert [result.id for result in packed.results] == ["high", "low"]
+    assert packed.text == DOCUMENT_SEPARATOR.join(result.to_agent_string() for result in packed.results)
+    assert packed.dropped_results == []
+    assert packed.dropped_tokens == 0
+    assert packed.packed_tokens == count_tokens(packed.text)
+
+
+def test_pack_truncates_long_fields_at_sentence_boundary():
+    # Arrange
+    result = _naive_search("long", 0.9, sentences=200)
+
+    # Act
+    packed = ContextPacker(max_tokens=10000, max_field_tokens=100).pack([result])
+
+    # Assert
+    content = packed.text.split("Content: \n", 1)[1]
+    assert content.rstrip().endswith(". [...]")
+    assert count_tokens(content) <= 101
+    assert packed.results == [result]
+    assert packed.packed_tokens + packed.dropped_tokens >= count_tokens(result.to_agent_string())
+    # the search result itself is left whole for the rest of the request
+    assert result.content == SENTENCE * 200
+
+
+def test_pack_drops_results_over_budget():
+    # Arrange
+    first = _naive_search("first", 0.9, sentences=20)
+    second = _naive_search("second", 0.5, sentences=20)
+    budget = count_tokens(first.to_agent_string()) + 10
+
+    # Act
+    packed = ContextPacker(max_tokens=budget, max_field_tokens=0).pack([second, first])
+
+    # Assert
+    assert packed.results == [first]
+    assert packed.dropped_results == [second]
+    assert packed.packed_tokens <= budget
+    assert packed.dropped_tokens >= count_tokens(second.to_agent_string())
+
+
+def test_pack_trims_example_lists():
+    # Arrange
+    result = NUREGSection32(
+        id="nureg1", section="3.2.1", lxxii=["(b)(2)(iv)(B)"], lxxiii=["(a)(2)(iv)(A)"], description="Description.",
+        discussion="Discussion.", examples=[Example(title=f"Example {i}", description=SENTENCE * 5) for i in range(20)],
+        search_score=0.9
+    )
+
+    # Act
+    packed = ContextPacker(max_tokens=10000, max_field_tokens=200).pack([result])
+
+    # Assert
+    assert "- Example 0:" in packed.text
+    assert "- Example 19:" not in packed.text
+    assert len(result.examples) == 20
+
+
+def test_pack_without_budget_returns_every_result():
+    # Arrange
+    results = [_naive_search("first", 0.2, sentences=50), _naive_search("second", 0.9, sentences=50)]
+
+    # Act
+    packed = ContextPacker(max_tokens=0).pack(results)
+
+    # Assert
+    assert packed.text == DOCUMENT_SEPARATOR.join(result.to_agent_string() for result in results)
+    assert packed.dropped_tokens == 0
@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from contextlib import aclosing
+
+from util import PrefetchingAsyncIterator, merge_async_iterators  # noqa: E402
+
+
+async def _produce(name: str, count: int, produced: list[str] = None, delay: float = 0):
+    for i in range(count):
+        await asyncio.sleep(delay)
+        if produced is not None:
+            produced.append(f"{name}{i}")
+        yield f"{name}{i}"
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_yields_every_item_in_source_order():
+    # Act
+    items = [item async for item in merge_async_iterators([_produce("a", 3), _produce("b", 2)])]
+
+    # Assert
+    assert sorted(items) == ["a0", "a1", "a2", "b0", "b1"]
+    assert [item for item in items if item.startswith("a")] == ["a0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_bounds_unconsumed_items_per_source():
+    # Arrange
+    produced = []
+
+    # Act
+    async with aclosing(merge_async_iterators([_produce("a", 10, produced)], max_buffered=2)) as merged:
+        first = await merged.__anext__()
+        await asyncio.sleep(0.01)
+
+    # Assert
+    assert first == "a0"
+    assert len(produced) <= 4
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_raises_source_errors_and_cancels_others():
+    # Arrange
+    cancelled = asyncio.Event()
+
+    async def failing():
+        yield "ok"
+        raise RuntimeError("agent failed")
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+            yield "never"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    # Act
+    with pytest.raises(RuntimeError, match="agent failed"):
+        async for _ in merge_async_iterators([failing(), slow()]):
+            pass
+
+    # Assert
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_cancels_sources_when_closed():
+    # Arrange
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            while True:
+                await asyncio.sleep(0)
+                yield "item"
+        finally:
+            closed.set()
+
+    # Act
+    async with aclosing(merge_async_iterators([endless()])) as merged:
+        await merged.__anext__()
+
+    # Assert
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_prefetching_async_iterator_starts_before_iteration():
+    # Arrange
+    produced = []
+    prefetched = PrefetchingAsyncIterator(_produce("a", 3, produced))
+
+    # Act
+    await asyncio.sleep(0.01)
+    started_early = list(produced)
+    items = [item async for item in prefetched]
+
+    # Assert
+    assert started_early == ["a0", "a1", "a2"]
+    assert items == ["a0", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_prefetching_async_iterator_cancels_source_when_closed():
+    # Arrange
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+            yield "never"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    prefetched = PrefetchingAsyncIterator(slow())
+    await asyncio.sleep(0)
+
+    # Act
+    await prefetched.aclose()
+
+    # Assert
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_prefetching_async_iterator_pauses_source_when_buffer_full():
+    # Arrange
+    produced = []
+    prefetched = PrefetchingAsyncIterator(_produce("a", 5, produced), max_buffered=2)
+
+    # Act
+    await asyncio.sleep(0.01)
+    produced_before_read = len(produced)
+    items = [item async for item in prefetched]
+
+    # Assert
+    assert produced_before_read <= 3
+    assert items == ["a0", "a1", "a2", "a3", "a4"]
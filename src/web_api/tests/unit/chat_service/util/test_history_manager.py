@@ -0,0 +1,144 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from caching import MemoryCache  # noqa: E402
+from models import AIChatMessage, AIChatRequest, AIChatRole, ReportabilityContext  # noqa: E402
+from util.history_manager import HistoryManager, SUMMARIZER_NAME, estimate_tokens  # noqa: E402
+
+DOCUMENT_TEXT = "NUREG Section 3.2 Entry: " + "discussion " * 400
+
+
+def _context_with_turns(turn_count: int) -> ReportabilityContext:
+    context = ReportabilityContext(chat_request=AIChatRequest(
+        messages=[AIChatMessage(role=AIChatRole.USER, content="question 0")], session_state="session123"
+    ))
+    for turn in range(turn_count):
+        context.add_document_to_history(DOCUMENT_TEXT, f"3.2.{turn} (id: doc-{turn})")
+        context.message_history.add_assistant_message(f"answer {turn}")
+        context.message_history.add_user_message(f"question {turn + 1}")
+    return context
+
+
+@pytest.fixture
+def chat_completion_service():
+    service = MagicMock()
+    service.get_chat_message_content = AsyncMock(return_value=SimpleNamespace(
+        content="The user asked about a scram.",
+        metadata={"usage": SimpleNamespace(prompt_tokens=300, completion_tokens=20)},
+    ))
+    with patch("util.history_manager.ReportabilityServices.get_chat_completion_service", return_value=service), \
+            patch("util.history_manager.ReportabilityServices.get_history_summary_cache",
+                  return_value=MemoryCache("history_summaries")):
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_get_window_keeps_short_history():
+    # Arrange
+    context = _context_with_turns(0)
+    manager = HistoryManager(max_tokens=1000, recent_turns=2, summarize=False)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    assert window.messages == context.message_history.messages
+    assert window.tokens_saved == 0
+
+
+@pytest.mark.asyncio
+async def test_get_window_replaces_older_documents_with_references():
+    # Arrange
+    context = _context_with_turns(3)
+    manager = HistoryManager(max_tokens=100000, recent_turns=2, summarize=False)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    contents = [message.content for message in window.messages]
+    assert len(contents) == len(context.message_history.messages)
+    assert "3.2.0 (id: doc-0)" in contents[1] and contents[1] != DOCUMENT_TEXT
+    assert "3.2.1 (id: doc-1)" in contents[4] and contents[4] != DOCUMENT_TEXT
+    # the last two turns are sent verbatim
+    assert window.messages[-4:] == context.message_history.messages[-4:]
+    assert window.tokens == estimate_tokens(window.messages)
+    assert window.tokens_saved == window.original_tokens - window.tokens > 0
+
+
+@pytest.mark.asyncio
+async def test_get_window_drops_oldest_turns_over_budget():
+    # Arrange
+    context = _context_with_turns(3)
+    recent_tokens = estimate_tokens(context.message_history.messages[-4:])
+    manager = HistoryManager(max_tokens=recent_tokens + 60, recent_turns=2, summarize=False)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    contents = [message.content for message in window.messages]
+    assert contents[0] == "question 1" and "doc-1" in contents[1] and contents[2] == "answer 1"
+    assert window.messages[-4:] == context.message_history.messages[-4:]
+    assert window.tokens <= recent_tokens + 60
+
+
+@pytest.mark.asyncio
+async def test_get_window_never_drops_recent_turns():
+    # Arrange
+    context = _context_with_turns(3)
+    manager = HistoryManager(max_tokens=10, recent_turns=2, summarize=False)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    assert window.messages == context.message_history.messages[-4:]
+
+
+@pytest.mark.asyncio
+async def test_get_window_summarizes_older_turns(chat_completion_service):
+    # Arrange
+    context = _context_with_turns(3)
+    manager = HistoryManager(max_tokens=10, recent_turns=1, summarize=True)
+
+    # Act
+    first = await manager.get_window(context)
+    second = await manager.get_window(context)
+
+    # Assert
+    assert first.messages[0].content.endswith("The user asked about a scram.")
+    assert first.messages[1:] == context.message_history.messages[-1:]
+    assert [message.content for message in second.messages] == [message.content for message in first.messages]
+    chat_completion_service.get_chat_message_content.assert_awaited_once()
+    assert [(usage.agent_name, usage.prompt_tokens) for usage in context.token_usage] == [(SUMMARIZER_NAME, 300)]
+
+
+@pytest.mark.asyncio
+async def test_get_window_drops_turns_when_summary_fails(chat_completion_service):
+    # Arrange
+    context = _context_with_turns(3)
+    chat_completion_service.get_chat_message_content.side_effect = Exception("service unavailable")
+    manager = HistoryManager(max_tokens=10, recent_turns=1, summarize=True)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    assert window.messages == context.message_history.messages[-1:]
+    assert context.token_usage == []
+
+
+@pytest.mark.asyncio
+async def test_get_window_without_budget_sends_full_history():
+    # Arrange
+    context = _context_with_turns(3)
+    manager = HistoryManager(max_tokens=0)
+
+    # Act
+    window = await manager.get_window(context)
+
+    # Assert
+    assert window.messages == context.message_history.messages
+    assert window.tokens_saved == 0
@@ -0,0 +1,47 @@
+from models import TokenUsage  # noqa: E402
+from util import request_cancellation  # noqa: E402
+from util.request_cancellation import TokenUsageBaseline  # noqa: E402
+
+
+class DummyReportabilityContext:
+    def __init__(self, *usages):
+        self.token_usage = list(usages)
+
+
+def test_baseline_estimates_nothing_before_a_request_finishes():
+    # Arrange
+    baseline = TokenUsageBaseline()
+
+    # Act / Assert
+    assert baseline.estimate_saved(100) == 0
+
+
+def test_baseline_estimates_tokens_left_against_average():
+    # Arrange
+    baseline = TokenUsageBaseline(smoothing=0.5)
+    baseline.record_completed(1000)
+    baseline.record_completed(2000)
+
+    # Act / Assert
+    assert baseline.average_tokens == 1500
+    assert baseline.estimate_saved(500) == 1000
+    assert baseline.estimate_saved(2000) == 0
+
+
+def test_record_cancelled_request_counts_tokens_saved(monkeypatch):
+    # Arrange
+    baseline = TokenUsageBaseline()
+    baseline.record_completed(1000)
+    monkeypatch.setattr(request_cancellation, "_baseline", baseline)
+    added = []
+    monkeypatch.setattr(request_cancellation.cancelled_requests_counter, "add", lambda n, attrs: added.append(n))
+    saved = []
+    monkeypatch.setattr(request_cancellation.tokens_saved_counter, "add", lambda n, attrs: saved.append(n))
+    context = DummyReportabilityContext(TokenUsage(agent_name="IntentAgent", prompt_tokens=150, completion_tokens=50))
+
+    # Act
+    request_cancellation.record_cancelled_request(context, "disconnect")
+
+    # Assert
+    assert added == [1]
+    assert saved == [800]
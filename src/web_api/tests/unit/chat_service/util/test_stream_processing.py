@@ -1,9 +1,17 @@
+import asyncio
 import pytest
 from pydantic import BaseModel
+from pydantic_core import PydanticSerializationError
+from services import StreamReplayLog
 from util import stream_processing
 from models import (
+    AIChatCompletionDelta,
     AIChatError,
     AIChatErrorResponse,
+    AIChatMessageDelta,
+    AIChatRole,
+    ChunkBuffer,
+    TokenUsage,
 )
 
 
@@ -30,19 +38,24 @@ class DummyPluginResult:
     def to_search_result(self):
         return self
 
+    def get_display_value(self):
+        return f"Section {self.document_id}"
+
 
 class DummyReportabilityContext:
     def __init__(self, plugin_results=None):
         self.plugin_results = plugin_results or []
-        self.all_chunks = ""
+        self.all_chunks = ChunkBuffer()
         self.recommendations = []
         self.intent = "Test Intent"
+        self.intent_source = "llm"
+        self.predicted_intent = None
         self.user_input_needed = False
-        self.token_usage = [{
-            "agent_name": "Test Agent",
-            "prompt_tokens": 20,
-            "completion_tokens": 10
-        }]
+        self.include_eval_content = True
+        self.token_usage = [TokenUsage(agent_name="Test Agent", prompt_tokens=20, completion_tokens=10)]
+
+    async def wait_for_pending_tasks(self):
+        pass
 
 
 @pytest.fixture
@@ -164,8 +177,222 @@ async def test_stream_processor_yields_context(monkeypatch, DummyMetadata):
     )
     assert results[1] == (
         '{"delta":{"role":"assistant","content":null,"context":null},"session_state":null,"context":'
-        '{"documents":[{"id":"doc1","url":"uri1","search_type":"dummy","search_query":"dummy query",'
-        '"cited":true},{"id":"doc2","url":"uri2","search_type":"dummy","search_query":"dummy query",'
-        '"cited":true}],"recommendations":[],"intent":"Test Intent","user_input_needed":false,'
-        '"token_usage":[{"agent_name":"Test Agent","prompt_tokens":20,"completion_tokens":10}]}}\r\n'
+        '{"documents":[{"id":"doc1","url":"uri1","section":"Section doc1","search_type":"dummy",'
+        '"search_query":"dummy query","cited":true},{"id":"doc2","url":"uri2","section":"Section doc2",'
+        '"search_type":"dummy","search_query":"dummy query","cited":true}],"recommendations":[],'
+        '"intent":"Test Intent","intent_source":"llm","predicted_intent":null,"user_input_needed":false,'
+        '"token_usage":[{"agent_name":"Test Agent","prompt_tokens":20,"completion_tokens":10,'
+        '"prompt_tokens_saved":0,"speculative":false}]}}\r\n'
     )
+
+
+@pytest.mark.asyncio
+async def test_stream_processor_flushes_slow_chunks_after_interval(monkeypatch, DummyMetadata):
+    # Arrange
+    monkeypatch.setenv("STREAM_BUFFER_SIZE", "10")
+    monkeypatch.setenv("STREAM_FLUSH_INTERVAL_MS", "10")
+    reportability_context = DummyReportabilityContext()
+
+    async def chunk_gen():
+        yield DummyChunk(DummyMessage("a", "user"), metadata=DummyMetadata)
+        await asyncio.sleep(0.1)
+        yield DummyChunk(DummyMessage("b", "user"), metadata=DummyMetadata)
+    # Act
+    gen = stream_processing.stream_processor(reportability_context, chunk_gen())
+    # Assert
+    results = [x async for x in gen]
+    assert len(results) == 3
+    assert '"content":"a"' in results[0]
+    assert '"content":"b"' in results[1]
+    assert reportability_context.all_chunks == "ab"
+
+
+@pytest.mark.asyncio
+async def test_stream_processor_flushes_when_byte_limit_reached(monkeypatch, DummyMetadata):
+    # Arrange
+    monkeypatch.setenv("STREAM_BUFFER_SIZE", "10")
+    monkeypatch.setenv("STREAM_FLUSH_BYTES", "4")
+    monkeypatch.setenv("STREAM_FLUSH_INTERVAL_MS", "0")
+    reportability_context = DummyReportabilityContext()
+    chunks = [
+        DummyChunk(DummyMessage("ab", "user"), metadata=DummyMetadata),
+        DummyChunk(DummyMessage("cd", "user"), metadata=DummyMetadata),
+        DummyChunk(DummyMessage("e", "user"), metadata=DummyMetadata),
+    ]
+
+    async def chunk_gen():
+        for c in chunks:
+            yield c
+    # Act
+    gen = stream_processing.stream_processor(reportability_context, chunk_gen())
+    # Assert
+    results = [x async for x in gen]
+    assert len(results) == 3
+    assert '"content":"abcd"' in results[0]
+    assert '"content":"e"' in results[1]
+
+
+def test_stream_flush_policy_reports_reason():
+    # Arrange
+    policy = stream_processing.StreamFlushPolicy(max_chunks=3, max_bytes=10, max_latency_ms=0)
+    # Act / Assert
+    assert policy.flush_reason(1, 5) is None
+    assert policy.flush_reason(3, 5) == "chunks"
+    assert policy.flush_reason(1, 10) == "bytes"
+    assert policy.time_until_flush(0.0) is None
+
+
+@pytest.mark.parametrize("content", [
+    "",
+    "plain text",
+    'quotes " and backslashes \\ and /slashes/',
+    "new\nlines\r\nand\ttabs",
+    "control \x00\x01\x08\x0c\x1f\x7f characters",
+    "unicode é ü 你好 \u2028\u2029 and emoji 🚀",
+    "<script>alert('x')</script> & more",
+    "token " * 340,
+])
+@pytest.mark.parametrize("role", [None, "user", "assistant", "system", AIChatRole.ASSISTANT])
+def test_content_delta_to_json_line_matches_model_serialization(content, role):
+    # Arrange
+    expected = stream_processing._object_to_json_line(
+        AIChatCompletionDelta(delta=AIChatMessageDelta(content=content, role=role))
+    )
+    # Act
+    result = stream_processing._content_delta_to_json_line(content, role)
+    # Assert
+    assert result == expected
+
+
+def test_content_delta_to_json_line_rejects_lone_surrogate_like_model_serialization():
+    # Arrange
+    content = "broken \ud800 surrogate"
+    with pytest.raises(PydanticSerializationError):
+        stream_processing._object_to_json_line(AIChatCompletionDelta(delta=AIChatMessageDelta(content=content)))
+
+    # Act / Assert
+    with pytest.raises(PydanticSerializationError):
+        stream_processing._content_delta_to_json_line(content, "assistant")
+
+
+def test_content_delta_to_json_line_rejects_unknown_role():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        stream_processing._content_delta_to_json_line("text", "tool")
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_processor_sends_ids_and_resumes():
+    # Arrange
+    replay_log = StreamReplayLog()
+    replay_log.append('{"delta":"a"}\r\n')
+    replay_log.append('{"delta":"b"}\r\n')
+    replay_log.finish()
+
+    # Act
+    events = [x async for x in stream_processing.sse_stream_processor(replay_log, heartbeat_seconds=0)]
+    resumed = [
+        x async for x in stream_processing.sse_stream_processor(
+            replay_log, last_event_id=replay_log.event_id(1), heartbeat_seconds=0)
+    ]
+
+    # Assert
+    assert events == [
+        f'id: {replay_log.event_id(1)}\ndata: {{"delta":"a"}}\n\n',
+        f'id: {replay_log.event_id(2)}\ndata: {{"delta":"b"}}\n\n',
+    ]
+    assert resumed == events[1:]
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_processor_sends_heartbeats_while_idle():
+    # Arrange
+    replay_log = StreamReplayLog()
+
+    async def finish_later():
+        await asyncio.sleep(0.05)
+        replay_log.finish()
+
+    # Act
+    finisher = asyncio.create_task(finish_later())
+    events = [x async for x in stream_processing.sse_stream_processor(replay_log, heartbeat_seconds=0.01)]
+    await finisher
+
+    # Assert
+    assert events
+    assert set(events) == {stream_processing.SSE_HEARTBEAT}
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_processor_sends_error_for_unknown_event_id():
+    # Arrange
+    replay_log = StreamReplayLog()
+    replay_log.finish()
+
+    # Act
+    events = [x async for x in stream_processing.sse_stream_processor(replay_log, last_event_id="other-1")]
+
+    # Assert
+    assert len(events) == 1
+    assert events[0].startswith('data: {"error":{"code":"stream_resume_error"')
+
+
+@pytest.mark.asyncio
+async def test_stream_processor_stops_when_client_disconnects(monkeypatch, DummyMetadata):
+    # Arrange
+    monkeypatch.setenv("CLIENT_DISCONNECT_POLL_SECONDS", "0.01")
+    cancelled_reasons = []
+    monkeypatch.setattr(
+        stream_processing, "record_cancelled_request", lambda context, reason: cancelled_reasons.append(reason)
+    )
+    reportability_context = DummyReportabilityContext()
+    source_cancelled = asyncio.Event()
+
+    async def chunk_gen():
+        yield DummyChunk(DummyMessage("a", "user"), metadata={**DummyMetadata, "flush": True})
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            source_cancelled.set()
+            raise
+        yield DummyChunk(DummyMessage("never", "user"), metadata=DummyMetadata)
+
+    async def is_disconnected():
+        return True
+
+    # Act
+    gen = stream_processing.stream_processor(reportability_context, chunk_gen(), is_disconnected=is_disconnected)
+    results = await asyncio.wait_for(_collect(gen), timeout=1)
+
+    # Assert
+    assert len(results) == 1
+    assert '"content":"a"' in results[0]
+    assert source_cancelled.is_set()
+    assert cancelled_reasons == ["disconnect"]
+
+
+@pytest.mark.asyncio
+async def test_stream_processor_records_cancelled_response(monkeypatch, DummyMetadata):
+    # Arrange
+    cancelled_reasons = []
+    monkeypatch.setattr(
+        stream_processing, "record_cancelled_request", lambda context, reason: cancelled_reasons.append(reason)
+    )
+    reportability_context = DummyReportabilityContext()
+
+    async def chunk_gen():
+        yield DummyChunk(DummyMessage("a", "user"), metadata={**DummyMetadata, "flush": True})
+        await asyncio.sleep(10)
+
+    gen = stream_processing.stream_processor(reportability_context, chunk_gen())
+
+    # Act
+    await gen.__anext__()
+    await gen.aclose()
+
+    # Assert
+    assert cancelled_reasons == ["cancelled"]
+
+
+async def _collect(gen):
+    return [x async for x in gen]
@@ -0,0 +1,48 @@
+from util.token_counting import TRUNCATION_MARKER, count_tokens, truncate_to_tokens  # noqa: E402
+
+TEXT = (
+    "The reactor tripped on low water level. Both recirculation pumps ran back as designed. "
+    "Operators entered the emergency operating procedures. No radioactive release occurred."
+)
+
+
+def test_count_tokens_of_empty_text():
+    # Act
+    tokens = count_tokens("")
+
+    # Assert
+    assert tokens == 0
+
+
+def test_truncate_to_tokens_keeps_text_that_fits():
+    # Act
+    truncated = truncate_to_tokens(TEXT, count_tokens(TEXT))
+
+    # Assert
+    assert truncated == TEXT
+
+
+def test_truncate_to_tokens_cuts_at_sentence_boundary():
+    # Arrange
+    two_sentences = "The reactor tripped on low water level. Both recirculation pumps ran back as designed."
+    max_tokens = count_tokens(two_sentences) + count_tokens(TRUNCATION_MARKER)
+
+    # Act
+    truncated = truncate_to_tokens(TEXT, max_tokens)
+
+    # Assert
+    assert truncated == two_sentences + TRUNCATION_MARKER
+    assert count_tokens(truncated) <= max_tokens
+
+
+def test_truncate_to_tokens_cuts_long_first_sentence():
+    # Arrange
+    sentence = "word " * 200
+
+    # Act
+    truncated = truncate_to_tokens(sentence, 20)
+
+    # Assert
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert sentence.startswith(truncated[:-len(TRUNCATION_MARKER)])
+    assert count_tokens(truncated) <= 20